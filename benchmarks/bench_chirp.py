@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la corrección de chirp (t0) por filas.
+
+Compara core_analysis.shift_rows_cubic (splines por bloques, evaluación
+vectorizada) con el bucle original de un interp1d(kind='cubic') por longitud
+de onda, en float64, float32 y repartiendo filas entre todos los núcleos,
+e informa de la diferencia máxima. También mide LazyCorrectedData: el coste
+de tener lista sólo una ventana visible de filas frente a la matriz completa.
+
+Uso:
+    python benchmarks/bench_chirp.py [n_wl] [n_td]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.interpolate import interp1d
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from core_analysis import LazyCorrectedData, shift_rows_cubic  # noqa: E402
+
+
+def legacy_shift_rows(TD, data, shifts):
+    """Bucle original de apply_t0_correction_nonlinear."""
+    corrected = data.copy()
+    for i, t0_val in enumerate(shifts):
+        if np.isfinite(t0_val):
+            f = interp1d(TD - t0_val, data[i, :], kind='cubic', bounds_error=False, fill_value='extrapolate')
+            corrected[i, :] = f(TD)
+    return corrected
+
+
+def timed(fn, *args, **kwargs):
+    t = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return time.perf_counter() - t, out
+
+
+def main():
+    n_wl = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_td = int(sys.argv[2]) if len(sys.argv) > 2 else 1500
+
+    rng = np.random.default_rng(0)
+    n_lin = n_td // 3
+    TD = np.concatenate([np.linspace(-2.0, 2.0, n_lin, endpoint=False),
+                         np.logspace(np.log10(2.0), 3.0, n_td - n_lin)])
+    WL = np.linspace(400.0, 800.0, n_wl)
+    t0 = 0.2 + 2e-5 * (WL - 600.0) ** 2
+    kin = np.exp(-np.clip(TD - 0.2, 0, None) / 50.0) * (TD > 0.2)
+    data = np.outer(np.sin(WL / 40.0), kin) + rng.normal(scale=1e-3, size=(n_wl, n_td))
+
+    print(f"Matriz {n_wl} WL x {n_td} TD")
+    t_old, ref = timed(legacy_shift_rows, TD, data, t0)
+    t_new, out = timed(shift_rows_cubic, TD, data, t0)
+    t_f32, out32 = timed(shift_rows_cubic, TD, data, t0, dtype=np.float32)
+    t_par, out_par = timed(shift_rows_cubic, TD, data, t0, workers=0)
+
+    scale = np.max(np.abs(ref))
+    print(f"  bucle interp1d        : {t_old:7.3f} s")
+    print(f"  shift_rows_cubic f64  : {t_new:7.3f} s  (x{t_old / t_new:.1f})"
+          f"  max|diff|/max = {np.max(np.abs(out - ref)) / scale:.1e}")
+    print(f"  shift_rows_cubic f32  : {t_f32:7.3f} s  (x{t_old / t_f32:.1f})"
+          f"  max|diff|/max = {np.max(np.abs(out32 - ref)) / scale:.1e}")
+    print(f"  shift_rows_cubic x{os.cpu_count()} hilos: {t_par:7.3f} s  (x{t_old / t_par:.1f})"
+          f"  max|diff|/max = {np.max(np.abs(out_par - ref)) / scale:.1e}")
+
+    # Ventana visible de ~10 % de las longitudes de onda (vista perezosa)
+    n_vis = max(1, n_wl // 10)
+    lo = (n_wl - n_vis) // 2
+    popt = np.polyfit(WL, t0, 4)
+    lazy = LazyCorrectedData('poly4', popt, WL, TD, data)
+    t_vis, vis = timed(lambda: lazy[lo:lo + n_vis, :])
+    t_rest, full = timed(lazy.finalize)
+    ref_poly = shift_rows_cubic(TD, data, np.polyval(popt, WL))
+    print(f"  lazy: ventana {n_vis} filas: {t_vis:7.3f} s  (x{t_new / t_vis:.1f} frente a la matriz completa)")
+    print(f"  lazy: resto al finalizar : {t_rest:7.3f} s"
+          f"  idéntico = {np.array_equal(full, ref_poly)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Precisión y coste de fit.convolved_exp.
+
+Compara la expresión original, 0.5·exp(arg1)·(1 - erf(arg2)) con arg1 recortado
+a ±700, con la versión actual basada en erfcx:
+- precisión: error relativo frente a la convolución calculada por cuadratura
+  (scipy.integrate.quad) en una rejilla de anchuras de IRF, tiempos de vida y
+  retardos que incluye IRF cortas y retardos largos
+- robustez: número de NaN/inf sobre una rejilla extrema de parámetros
+- coste: tiempo de evaluación sobre una matriz retardo x WL
+
+Uso:
+    python benchmarks/bench_convolved_exp.py [n_retardos] [n_wl]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import special
+from scipy.integrate import quad
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from fit import convolved_exp  # noqa: E402
+
+
+def legacy_convolved_exp(t, t0, tau, w):
+    """Expresión original de fit.convolved_exp."""
+    t = np.asarray(t)
+    tau = np.maximum(tau, 1e-12)
+    w = np.maximum(w, 1e-12)
+    arg1 = (w**2 - 2 * tau * (t - t0)) / (2 * tau**2)
+    arg2 = (w**2 - tau * (t - t0)) / (np.sqrt(2) * w * tau)
+    arg1 = np.clip(arg1, -700, 700)
+    return 0.5 * np.exp(arg1) * (1 - special.erf(arg2))
+
+
+def reference(s, tau, w):
+    """Convolución exp(-v/tau)·Gauss(s - v; w) integrada numéricamente."""
+    def integrand(v):
+        return np.exp(-v / tau - (s - v)**2 / (2 * w * w)) / (w * np.sqrt(2 * np.pi))
+
+    a, b = max(0.0, s - 40 * w), min(s + 40 * w, 745 * tau)
+    if b <= a:
+        return 0.0
+    points = [p for p in (s, w * w / tau) if a < p < b]
+    return quad(integrand, a, b, points=points or None, epsabs=0, epsrel=1e-13, limit=500)[0]
+
+
+def accuracy():
+    s = np.array([-1.0, -0.2, 0.0, 0.05, 0.3, 2.0, 20.0, 500.0, 5000.0])
+    print("Error relativo máximo frente a cuadratura (valores > 1e-290):")
+    print(f"  {'w':>6} {'tau':>8}  {'original':>9}  {'erfcx':>9}")
+    for w in (0.01, 0.12, 0.5):
+        for tau in (1e-3, 0.05, 1.0, 100.0, 1e5):
+            ref = np.array([reference(x, tau, w) for x in s])
+            mask = ref > 1e-290
+            errs = []
+            for fn in (legacy_convolved_exp, convolved_exp):
+                val = fn(s, 0.0, tau, w)
+                errs.append(np.max(np.abs(val[mask] - ref[mask]) / ref[mask]))
+            print(f"  {w:6.2f} {tau:8.0e}  {errs[0]:9.1e}  {errs[1]:9.1e}")
+
+
+def robustness():
+    t = np.linspace(-50.0, 1e4, 2001)
+    bad = {}
+    with np.errstate(all="ignore"):
+        for fn in (legacy_convolved_exp, convolved_exp):
+            n = 0
+            for w in np.logspace(-4, 1, 11):
+                for tau in np.logspace(-6, 6, 13):
+                    n += np.count_nonzero(~np.isfinite(fn(t, 0.0, tau, w)))
+            bad[fn.__name__] = n
+    print("Valores no finitos en la rejilla extrema:", bad)
+
+
+def timing(n_td, n_wl):
+    t = np.concatenate([np.linspace(-1.0, 3.0, n_td // 2), np.logspace(np.log10(3.1), 3.0, n_td - n_td // 2)])
+    t0 = np.linspace(0.0, 0.4, n_wl)[:, None]
+    for fn in (legacy_convolved_exp, convolved_exp):
+        tic = time.perf_counter()
+        for tau in (0.3, 5.0, 200.0):
+            fn(t[None, :], t0, tau, 0.12)
+        print(f"  {fn.__name__:<22}: {(time.perf_counter() - tic) / 3 * 1e3:7.2f} ms por exponencial")
+
+
+def main():
+    n_td = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    n_wl = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    accuracy()
+    robustness()
+    print(f"Coste sobre {n_td} retardos x {n_wl} WL:")
+    timing(n_td, n_wl)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del ajuste global.
+
+Compara el ajuste original (least_squares sobre todos los parámetros, con
+amplitudes incluidas, con Jacobiano por diferencias finitas densas o con
+patrón disperso, o analítico) con fit.fit_global (VARPRO: sólo w, t0 y taus
+son no lineales y las amplitudes se resuelven por mínimos cuadrados lineales)
+sobre datos sintéticos. Informa del coste de una evaluación del modelo y, para
+cada ajuste, del tiempo, del número de evaluaciones y del coste final.
+
+Uso:
+    python benchmarks/bench_global_fit.py [numWL] [numExp] [chirp: No|Yes]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.optimize import least_squares
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fit  # noqa: E402
+
+
+def synthetic(numWL, numExp, t0_choice, rng):
+    """Datos (numWL, T), retardos y parámetros verdaderos con el formato de eval_global_model."""
+    t = np.concatenate([np.linspace(-1.0, 2.0, 80), np.logspace(np.log10(2.1), 3.0, 80)])
+    taus = np.logspace(0, 2.5, numExp)
+    if t0_choice == "Yes":
+        x = [0.12, *taus]
+        for j in range(numWL):
+            x += [0.1 + 0.3 * j / numWL, *rng.normal(size=numExp)]
+    else:
+        x = [0.12, 0.1, *taus, *rng.normal(size=numWL * numExp)]
+    x = np.asarray(x, dtype=float)
+    F = fit.eval_global_model(x, t, numExp, numWL, t0_choice)
+    return F.T + rng.normal(scale=0.01, size=(numWL, t.size)), t, x
+
+
+def bounds(x, numExp, numWL, t0_choice):
+    lower = -np.inf * np.ones(x.size)
+    upper = np.inf * np.ones(x.size)
+    lower[0], upper[0] = 0.05, 2.0
+    i_tau = 1 if t0_choice == "Yes" else 2
+    lower[i_tau:i_tau + numExp], upper[i_tau:i_tau + numExp] = 0.001, 1e8
+    return lower, upper
+
+
+def main():
+    numWL = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    numExp = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    t0_choice = sys.argv[3] if len(sys.argv) > 3 else "No"
+
+    rng = np.random.default_rng(0)
+    data, t, x_true = synthetic(numWL, numExp, t0_choice, rng)
+    lower, upper = bounds(x_true, numExp, numWL, t0_choice)
+    x0 = x_true.copy()
+    nl = fit.nonlinear_indices(numExp, numWL, t0_choice)
+    x0[nl] *= 1.3
+    x0 = np.clip(x0, lower + 1e-9, upper - 1e-9)
+    data_flat = data.T.ravel()
+
+    print(f"numWL={numWL}, numExp={numExp}, chirp={t0_choice}, T={t.size}, parámetros={x0.size}")
+    mem = fit.jacobian_memory_report(numExp, numWL, t.size, t0_choice)
+    print(f"  Jacobiano: {mem['dense_bytes'] / 1e6:.1f} MB denso, {mem['sparse_bytes'] / 1e6:.1f} MB disperso")
+
+    n_eval = 20
+    tic = time.perf_counter()
+    for _ in range(n_eval):
+        fit.eval_global_model(x0, t, numExp, numWL, t0_choice)
+    print(f"  evaluación del modelo: {(time.perf_counter() - tic) / n_eval * 1e3:7.2f} ms")
+
+    tic = time.perf_counter()
+    res = fit.fit_global(data, t, numExp, x0, lower, upper, t0_choice_str=t0_choice)
+    print(f"  VARPRO              : {time.perf_counter() - tic:7.3f} s  nfev {res.nfev:5d}  coste {res.cost:.6g}")
+
+    tic = time.perf_counter()
+    res_full = least_squares(
+        lambda p: fit.eval_global_model(p, t, numExp, numWL, t0_choice).ravel() - data_flat,
+        x0, bounds=(lower, upper), method="trf")
+    print(f"  todos, dif. finitas : {time.perf_counter() - tic:7.3f} s  nfev {res_full.nfev:5d}  coste {res_full.cost:.6g}")
+
+    tic = time.perf_counter()
+    res_full = least_squares(
+        lambda p: fit.eval_global_model(p, t, numExp, numWL, t0_choice).ravel() - data_flat,
+        x0, jac_sparsity=fit.global_jac_sparsity(numExp, numWL, t.size, t0_choice),
+        bounds=(lower, upper), method="trf")
+    print(f"  todos, dif. f. disp.: {time.perf_counter() - tic:7.3f} s  nfev {res_full.nfev:5d}  coste {res_full.cost:.6g}")
+
+    tic = time.perf_counter()
+    res_full = least_squares(
+        lambda p: fit.eval_global_model(p, t, numExp, numWL, t0_choice).ravel() - data_flat,
+        x0, jac=lambda p: fit.global_fit_jacobian(p, t, numExp, numWL, t0_choice),
+        bounds=(lower, upper), method="trf")
+    print(f"  todos, J analítico  : {time.perf_counter() - tic:7.3f} s  nfev {res_full.nfev:5d}  coste {res_full.cost:.6g}")
+
+
+if __name__ == "__main__":
+    main()
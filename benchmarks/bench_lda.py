@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del análisis de densidad de tiempos de vida (LDA).
+
+Genera un mapa sintético con una distribución log-normal de tiempos de vida
+(centrada en 20 ps) en una banda y una componente discreta de 300 ps en otra,
+y mide fit.lifetime_density (Tikhonov y NNLS, λ por GCV) frente a un ajuste
+global de 2 exponenciales con fit.fit_global. Informa del tiempo, del RMSD y
+de la tau del máximo del mapa en el centro de cada banda.
+
+Uso:
+    python benchmarks/bench_lda.py [numWL] [n_taus]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fit  # noqa: E402
+
+
+def main():
+    numWL = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_taus = int(sys.argv[2]) if len(sys.argv) > 2 else 120
+
+    rng = np.random.default_rng(0)
+    t = np.concatenate([np.linspace(-1.0, 2.0, 150), np.logspace(np.log10(2.1), 3.5, 350)])
+    WL = np.linspace(400.0, 700.0, numWL)
+    w, t0 = 0.12, 0.1
+    taus = fit.lifetime_grid(0.05, 1e4, n_taus)
+    dist = np.exp(-0.5 * ((np.log10(taus) - np.log10(20.0)) / 0.15) ** 2)
+    band1 = np.exp(-0.5 * ((WL - 500.0) / 40.0) ** 2)
+    band2 = np.exp(-0.5 * ((WL - 600.0) / 50.0) ** 2)
+    K = fit.lifetime_kernel(t, taus, w, t0)
+    data = (band1[:, None] * (K @ dist)[None, :] / dist.sum()
+            + band2[:, None] * fit.convolved_exp(t, t0, 300.0, w)[None, :])
+    data += rng.normal(scale=0.01, size=data.shape)
+    i1, i2 = np.argmin(np.abs(WL - 500.0)), np.argmin(np.abs(WL - 600.0))
+
+    print(f"numWL={numWL}, T={t.size}, n_taus={n_taus}")
+    for method in ("tikhonov", "nnls"):
+        tic = time.perf_counter()
+        r = fit.lifetime_density(data, t, taus, w, t0, method=method)
+        elapsed = time.perf_counter() - tic
+        A = r['amplitudes']
+        peak = lambda i: taus[np.argmax(np.abs(A[i]))]  # noqa: E731
+        print(f"  LDA {method:<9}: {elapsed:7.3f} s  λ {r['lam']:.3g}  RMSD {r['rmsd']:.4f}  "
+              f"máximo 500 nm {peak(i1):.3g} ps, 600 nm {peak(i2):.3g} ps")
+
+    x0 = np.r_[0.15, 0.0, 5.0, 50.0, np.zeros(numWL * 2)]
+    lower = np.r_[0.05, -5.0, 0.001, 0.001, np.full(numWL * 2, -np.inf)]
+    upper = np.r_[2.0, 5.0, 1e8, 1e8, np.full(numWL * 2, np.inf)]
+    tic = time.perf_counter()
+    res = fit.fit_global(data, t, 2, x0, lower, upper)
+    rmsd = np.sqrt(2 * res.cost / data.size)
+    print(f"  VARPRO 2 exp. : {time.perf_counter() - tic:7.3f} s  RMSD {rmsd:.4f}  taus {res.x[2]:.3g}, {res.x[3]:.3g} ps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del escaneo del nº de componentes.
+
+Genera datos sintéticos con numExp componentes, ejecuta
+fit.scan_model_orders (1..max_orden con cada modelo cinético) en serie y en
+un pool de procesos, e imprime el tiempo de cada variante y la tabla con
+coste, RMSD, AIC/BIC y la estimación de rango por SVD.
+
+Uso:
+    python benchmarks/bench_model_scan.py [numWL] [numExp] [max_orden] [procesos] [chirp: No|Yes]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fit  # noqa: E402
+from bench_global_fit import synthetic  # noqa: E402
+
+
+def format_scan_table(scan):
+    """Tabla de texto con el resultado de scan_model_orders."""
+    rows = scan['rows']
+    lines = [f"SVD rank estimate: {scan['svd_rank']} (threshold {scan['svd_threshold']:.4g})",
+             f"{'model':<12} {'n':>2}  {'cost':>12}  {'RMSD':>10}  {'ΔAIC':>10}  {'ΔBIC':>10}  taus"]
+    if rows:
+        aic0 = rows[scan['best_aic']]['aic']
+        bic0 = rows[scan['best_bic']]['bic']
+    for i, r in enumerate(rows):
+        taus = ", ".join(f"{tau:.4g}" for tau in r['taus'])
+        mark = (" <AIC" if i == scan['best_aic'] else "") + (" <BIC" if i == scan['best_bic'] else "")
+        lines.append(f"{r['model']:<12} {r['numExp']:>2}  {r['cost']:>12.6g}  {r['rmsd']:>10.4g}  "
+                     f"{r['aic'] - aic0:>10.4g}  {r['bic'] - bic0:>10.4g}  {taus}{mark}")
+    for model, message in scan['errors'].items():
+        lines.append(f"{model:<12} failed: {message}")
+    return "\n".join(lines)
+
+
+def main():
+    numWL = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    numExp = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    max_order = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    t0_choice = sys.argv[5] if len(sys.argv) > 5 else "No"
+
+    rng = np.random.default_rng(0)
+    data, t, x_true = synthetic(numWL, numExp, t0_choice, rng)
+    print(f"numWL={numWL}, numExp={numExp}, chirp={t0_choice}, órdenes 1..{max_order}, "
+          f"modelos {list(fit.KINETIC_MODELS)}, procesos={fit.resolve_workers(workers)} (de {os.cpu_count()} núcleos)")
+
+    tic = time.perf_counter()
+    fit.scan_model_orders(data, t, max_order, t0_choice_str=t0_choice)
+    print(f"  serie : {time.perf_counter() - tic:7.3f} s")
+
+    tic = time.perf_counter()
+    scan = fit.scan_model_orders(data, t, max_order, t0_choice_str=t0_choice, workers=workers)
+    print(f"  pool  : {time.perf_counter() - tic:7.3f} s")
+    print(format_scan_table(scan))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del ajuste global multi-arranque.
+
+Ajusta datos sintéticos partiendo de las taus por defecto de la interfaz
+([0.5, 5, 50, 500, ...]) con un solo ajuste y con fit.fit_global_multistart
+en serie y en un pool de procesos (datos en memoria compartida). Informa del
+tiempo, del número de evaluaciones, del coste final y de la tabla de mínimos
+distintos encontrados.
+
+Uso:
+    python benchmarks/bench_multistart.py [numWL] [numExp] [n_arranques] [procesos]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fit  # noqa: E402
+from bench_global_fit import bounds  # noqa: E402
+
+
+def synthetic(numWL, numExp, rng):
+    """Datos (numWL, T) con taus alejadas de las semillas por defecto."""
+    t = np.concatenate([np.linspace(-1.0, 2.0, 80), np.logspace(np.log10(2.1), 3.5, 100)])
+    taus = np.logspace(-0.7, 3.2, numExp)
+    x = np.asarray([0.12, 0.1, *taus, *rng.normal(size=numWL * numExp)], dtype=float)
+    F = fit.eval_global_model(x, t, numExp, numWL, "No")
+    return F.T + rng.normal(scale=0.01, size=(numWL, t.size)), t, x
+
+
+def report(label, res, numExp, elapsed):
+    taus = ", ".join(f"{tau:.4g}" for tau in np.sort(res.x[fit.tau_indices(numExp, "No")]))
+    print(f"  {label:<22}: {elapsed:7.3f} s  nfev {res.nfev:5d}  coste {res.cost:.6g}  taus {taus}")
+
+
+def format_minima_table(minima):
+    """Tabla de texto con los mínimos de distinct_minima."""
+    lines = [f"{'#':>3}  {'cost':>12}  {'Δcost':>10}  {'starts':>6}  taus"]
+    for k, m in enumerate(minima, 1):
+        taus = ", ".join(f"{tau:.4g}" for tau in m['taus'])
+        lines.append(f"{k:>3}  {m['cost']:>12.6g}  {m['cost'] - minima[0]['cost']:>10.3g}  {m['count']:>6}  {taus}")
+    return "\n".join(lines)
+
+
+def main():
+    numWL = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    numExp = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    n_starts = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+
+    rng = np.random.default_rng(0)
+    data, t, x_true = synthetic(numWL, numExp, rng)
+    lower, upper = bounds(x_true, numExp, numWL, "No")
+    x0 = x_true.copy()
+    x0[0], x0[1] = 0.15, 0.0
+    x0[fit.tau_indices(numExp, "No")] = [0.5, 5.0, 50.0, 500.0, 2000.0, 5000.0][:numExp]
+
+    print(f"numWL={numWL}, numExp={numExp}, T={t.size}, arranques={n_starts}, "
+          f"procesos={fit.resolve_workers(workers)} (de {os.cpu_count()} núcleos)")
+    print("  taus verdaderas      : " + ", ".join(f"{tau:.4g}" for tau in x_true[2:2 + numExp]))
+
+    tic = time.perf_counter()
+    res = fit.fit_global(data, t, numExp, x0, lower, upper)
+    report("un ajuste", res, numExp, time.perf_counter() - tic)
+
+    tic = time.perf_counter()
+    res = fit.fit_global_multistart(data, t, numExp, x0, lower, upper, n_starts=n_starts, seed=0)
+    report("multi-arranque, serie", res, numExp, time.perf_counter() - tic)
+
+    tic = time.perf_counter()
+    res = fit.fit_global_multistart(data, t, numExp, x0, lower, upper, n_starts=n_starts, seed=0, workers=workers)
+    report("multi-arranque, pool", res, numExp, time.perf_counter() - tic)
+    print(format_minima_table(res.minima))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del parser de matrices (primera fila = delays, primera columna = WL).
+
+Compara core_analysis.read_matrix_file con las dos rutas anteriores basadas en
+pandas (read_csv_file y la carga de TASAnalyzer.load_file) sobre un CSV
+sintético del tamaño de una medida TAS típica.
+
+Uso:
+    python benchmarks/bench_parser.py [n_wl] [n_td]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from core_analysis import read_matrix_file  # noqa: E402
+
+
+def legacy_read_csv_file(path):
+    """Ruta original de core_analysis.read_csv_file."""
+    df = pd.read_csv(path)
+    WL_raw = pd.to_numeric(df.iloc[:, 0], errors='coerce')
+    valid_rows = WL_raw.notna()
+    WL = WL_raw[valid_rows].to_numpy()
+    TD = []
+    valid_cols = []
+    for col in df.columns[1:]:
+        try:
+            TD.append(float(col))
+            valid_cols.append(col)
+        except Exception:
+            continue
+    TD = np.array(TD)
+    data = df.loc[valid_rows, valid_cols].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy()
+    return WL, TD, data
+
+
+def legacy_tas_load(path):
+    """Ruta original de TASAnalyzer.load_file."""
+    raw = pd.read_csv(path, header=None)
+    raw = raw.apply(pd.to_numeric, errors="coerce").dropna(how="any")
+    raw = raw.values.astype(float)
+    data = raw[1:, 1:]
+    data[np.isnan(data)] = 0
+    return raw[1:, 0], raw[0, 1:], data
+
+
+def write_synthetic_csv(path, n_wl, n_td, seed=0):
+    rng = np.random.default_rng(seed)
+    M = np.zeros((n_wl + 1, n_td + 1))
+    M[0, 1:] = np.linspace(-1.0, 1000.0, n_td)
+    M[1:, 0] = np.linspace(400.0, 800.0, n_wl)
+    M[1:, 1:] = rng.normal(scale=1e-3, size=(n_wl, n_td))
+    np.savetxt(path, M, delimiter=",", fmt="%.5E")
+
+
+def best_of(fn, path, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn(path)
+        times.append(time.perf_counter() - t)
+    return min(times), out
+
+
+def main():
+    n_wl = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_td = int(sys.argv[2]) if len(sys.argv) > 2 else 1500
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.csv")
+        write_synthetic_csv(path, n_wl, n_td)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"Matriz {n_wl} WL x {n_td} TD ({size_mb:.1f} MB)")
+
+        t_new, (WL, TD, data) = best_of(read_matrix_file, path)
+        t_csv, (WL_old, TD_old, data_old) = best_of(legacy_read_csv_file, path)
+        t_tas, (_, _, data_tas) = best_of(legacy_tas_load, path)
+
+        print(f"  read_matrix_file      : {t_new:7.3f} s")
+        print(f"  read_csv_file (pandas): {t_csv:7.3f} s  (x{t_csv / t_new:.1f})")
+        print(f"  TAS load_file (pandas): {t_tas:7.3f} s  (x{t_tas / t_new:.1f})")
+
+        # Mismo resultado que las rutas anteriores
+        assert np.array_equal(WL, WL_old)
+        assert np.array_equal(data, data_tas)
+        common = np.isin(TD, TD_old)
+        assert np.array_equal(data[:, common], data_old)
+        print("  Resultados idénticos a las rutas pandas.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de los errores por remuestreo.
+
+Ajusta datos sintéticos con fit.fit_global y compara el error de las taus y
+de las amplitudes que da la covarianza (fit.covariance_diagonal) con el del
+bootstrap de residuos y el del jackknife por WL de fit.resample_uncertainty,
+en serie y en un pool de procesos.
+
+Uso:
+    python benchmarks/bench_resampling.py [numWL] [numExp] [réplicas] [procesos] [chirp: No|Yes]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fit  # noqa: E402
+from bench_global_fit import bounds, synthetic  # noqa: E402
+
+
+def main():
+    numWL = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    numExp = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    n_rep = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    t0_choice = sys.argv[5] if len(sys.argv) > 5 else "No"
+
+    rng = np.random.default_rng(0)
+    data, t, x_true = synthetic(numWL, numExp, t0_choice, rng)
+    lower, upper = bounds(x_true, numExp, numWL, t0_choice)
+    best = fit.fit_global(data, t, numExp, x_true, lower, upper, t0_choice_str=t0_choice)
+    tau_idx = fit.tau_indices(numExp, t0_choice)
+    amp_idx = fit.amplitude_indices(numExp, numWL, t0_choice).ravel()
+
+    var = fit.covariance_diagonal(best.jac, numExp, numWL, t0_choice)
+    se = np.sqrt(var * 2 * best.cost / (data.size - best.x.size))
+    print(f"numWL={numWL}, numExp={numExp}, chirp={t0_choice}, réplicas={n_rep}, "
+          f"procesos={fit.resolve_workers(workers)} (de {os.cpu_count()} núcleos)")
+    print("  taus           : " + ", ".join(f"{best.x[i]:.4g}" for i in tau_idx))
+    print("  covarianza     : err taus " + ", ".join(f"{se[i]:.3g}" for i in tau_idx))
+
+    for method in ("bootstrap", "jackknife"):
+        for w in (None, workers):
+            tic = time.perf_counter()
+            rs = fit.resample_uncertainty(data, t, numExp, best.x, lower, upper, t0_choice_str=t0_choice,
+                                          method=method, n_replicates=n_rep, seed=0, workers=w)
+            elapsed = time.perf_counter() - tic
+            ratio = np.median(rs['err'][amp_idx] / se[amp_idx])
+            label = f"{method} {'pool' if fit.resolve_workers(w) > 1 else 'serie'}"
+            print(f"  {label:<15}: {elapsed:7.3f} s  err taus "
+                  + ", ".join(f"{rs['err'][i]:.3g}" for i in tau_idx)
+                  + f"  err A / covarianza (mediana) {ratio:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la resta de solvente de TASAnalyzer.update_am_sf.
+
+Compara el cálculo original (RegularGridInterpolator + meshgrid en cada
+movimiento de slider) con core_analysis.SolventShifter, tanto al cambiar el
+shift (sf) como al cambiar sólo la amplitud (am), con rejillas de λ iguales y
+distintas, e informa de la diferencia máxima. Mide también
+SolventShifter.fit_scaling (búsqueda automática de am y sf).
+
+Uso:
+    python benchmarks/bench_solvent.py [n_wl] [n_td] [n_pasos]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from core_analysis import SolventShifter  # noqa: E402
+
+
+def legacy_subtract(WLSol, TDSol, solvent, WL, TD, medida, am, sf):
+    """Cálculo original de update_am_sf."""
+    interpSol = RegularGridInterpolator((WLSol, TDSol), solvent, bounds_error=False, fill_value=0)
+    WL_grid, TD_grid = np.meshgrid(WL, TD, indexing="ij")
+    points = np.column_stack([WL_grid.ravel(), (TD_grid - sf).ravel()])
+    return medida - interpSol(points).reshape(len(WL), len(TD)) * am
+
+
+def main():
+    n_wl = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_td = int(sys.argv[2]) if len(sys.argv) > 2 else 1500
+    n_steps = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    rng = np.random.default_rng(0)
+    TD = np.concatenate([np.linspace(-2.0, 2.0, n_td // 3, endpoint=False),
+                         np.logspace(np.log10(2.0), 3.0, n_td - n_td // 3)])
+    WL = np.linspace(400.0, 800.0, n_wl)
+    medida = rng.normal(size=(n_wl, n_td))
+    shifts = np.linspace(-0.5, 0.5, n_steps)
+    amps = np.linspace(0.8, 1.2, n_steps)
+
+    print(f"Matriz {n_wl} WL x {n_td} TD, {n_steps} pasos de slider")
+    for label, WLSol in (("rejillas iguales", WL), ("rejillas distintas", np.linspace(395.0, 805.0, n_wl + 7))):
+        solvent = rng.normal(size=(WLSol.size, n_td))
+
+        t = time.perf_counter()
+        ref = [legacy_subtract(WLSol, TD, solvent, WL, TD, medida, 1.0, sf) for sf in shifts]
+        t_old = (time.perf_counter() - t) / n_steps
+
+        t = time.perf_counter()
+        shifter = SolventShifter(WLSol, TD, solvent, WL, TD)
+        t_init = time.perf_counter() - t
+
+        t = time.perf_counter()
+        out = [shifter.subtract(medida, 1.0, sf) for sf in shifts]
+        t_sf = (time.perf_counter() - t) / n_steps
+
+        t = time.perf_counter()
+        for am in amps:
+            shifter.subtract(medida, am, shifts[-1])
+        t_am = (time.perf_counter() - t) / n_steps
+
+        diff = max(np.max(np.abs(a - b)) for a, b in zip(ref, out))
+        print(f"  {label}:")
+        print(f"    RegularGridInterpolator por paso : {t_old:7.3f} s")
+        print(f"    SolventShifter (una vez por carga): {t_init:7.3f} s")
+        print(f"    SolventShifter, cambio de sf     : {t_sf:7.3f} s  (x{t_old / t_sf:.0f})")
+        print(f"    SolventShifter, cambio de am     : {t_am:7.3f} s  (x{t_old / t_am:.0f})"
+              f"  max|diff| = {diff:.1e}")
+
+        # Búsqueda automática de (am, sf) sobre una medida con solvente conocido
+        sample = 0.83 * shifter.shifted(0.137) + rng.normal(scale=0.01, size=medida.shape)
+        t = time.perf_counter()
+        am, sf, _ = shifter.fit_scaling(sample, (-1.0, 0.5), sf_bounds=(-1.0, 1.0))
+        t_fit = time.perf_counter() - t
+        print(f"    fit_scaling                      : {t_fit:7.3f} s  am = {am:.4f} (0.83), sf = {sf:.4f} (0.137)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del ajuste global comprimido por SVD.
+
+Ejecuta fit.compare_svd_fit sobre datos sintéticos: ajusta con fit.fit_global
+sobre todas las WL y con fit.fit_global_svd sobre las k componentes temporales
+de la SVD, e imprime tiempos, evaluaciones, coste y diferencias de taus y DAS.
+
+Uso:
+    python benchmarks/bench_svd_fit.py [numWL] [numExp] [k: 0 = rango estimado]
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fit  # noqa: E402
+from bench_global_fit import bounds, synthetic  # noqa: E402
+
+
+def main():
+    numWL = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    numExp = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    rng = np.random.default_rng(0)
+    data, t, x_true = synthetic(numWL, numExp, "No", rng)
+    lower, upper = bounds(x_true, numExp, numWL, "No")
+    x0 = x_true.copy()
+    x0[fit.nonlinear_indices(numExp, numWL, "No")] *= 1.3
+    x0 = np.clip(x0, lower + 1e-9, upper - 1e-9)
+
+    rank = fit.svd_rank_estimate(data)[0]
+    print(f"numWL={numWL}, numExp={numExp}, T={t.size}, rango SVD estimado {rank}")
+    print(fit.format_svd_comparison(fit.compare_svd_fit(data, t, numExp, x0, lower, upper, k=k or None)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del ajuste no lineal de t0(λ).
+
+Compara el ajuste original (curve_fit con derivadas por diferencias finitas y
+una única semilla) con core_analysis.fit_t0_model (Jacobiano analítico, con
+una y con varias semillas) sobre un conjunto grande de puntos como el que
+devuelve la detección automática, e informa del tiempo, del residuo y de
+cuántas repeticiones con ruido distinto terminan en un ajuste válido.
+
+Uso:
+    python benchmarks/bench_t0_fit.py [n_puntos] [n_repeticiones]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.optimize import curve_fit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from core_analysis import _t0_model_seeds, fit_t0_model, t0_model  # noqa: E402
+
+
+def legacy_fit(w, t0):
+    """Ajuste original de fit_t0: semilla manual y Jacobiano numérico."""
+    seeds, bounds = _t0_model_seeds(w, t0, 1)
+    popt, _ = curve_fit(t0_model, w, t0, p0=seeds[0], bounds=bounds, maxfev=20000, method="trf")
+    return popt
+
+
+def run(label, fn, w, datasets):
+    t = time.perf_counter()
+    costs = []
+    for t0 in datasets:
+        try:
+            popt = fn(w, t0)
+            resid = t0_model(w, *popt) - t0
+            costs.append(np.sqrt(np.mean(resid**2)) if np.all(np.isfinite(resid)) else np.inf)
+        except RuntimeError:
+            costs.append(np.inf)
+    elapsed = time.perf_counter() - t
+    costs = np.asarray(costs)
+    ok = np.isfinite(costs)
+    rms = np.median(costs[ok]) if ok.any() else np.nan
+    print(f"  {label:<28}: {elapsed:7.3f} s  válidos {ok.sum()}/{costs.size}  rms mediano {rms * 1e3:.2f} fs")
+
+
+def main():
+    n_points = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_rep = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    rng = np.random.default_rng(0)
+    w = np.linspace(420.0, 780.0, n_points)
+    p_true = (1.2, 1.05 / 400.0**2, 1.6 / 400.0**2, -0.8)
+    clean = t0_model(w, *p_true)
+    datasets = [clean + rng.normal(scale=0.01, size=w.size) for _ in range(n_rep)]
+
+    print(f"{n_points} puntos, {n_rep} repeticiones")
+    run("diferencias finitas, 1 sem.", legacy_fit, w, datasets)
+    run("Jacobiano analítico, 1 sem.", lambda x, y: fit_t0_model(x, y), w, datasets)
+    run("Jacobiano analítico, 8 sem.", lambda x, y: fit_t0_model(x, y, n_starts=8, workers=0), w, datasets)
+
+
+if __name__ == "__main__":
+    main()
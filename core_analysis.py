@@ -1,293 +1,1194 @@
-# core_analysis.py
-import numpy as np
-import pandas as pd
-from scipy.interpolate import interp1d
-from scipy.optimize import curve_fit
-
-def read_csv_file(path):
-    """Lee y limpia los datos del CSV.
-    Devuelve: WL (1D numpy), TD (1D numpy), data (2D numpy shape (n_wl, n_td))
-    """
-    df = pd.read_csv(path)
-    WL_raw = pd.to_numeric(df.iloc[:, 0], errors='coerce')
-    valid_rows = WL_raw.notna()
-    WL = WL_raw[valid_rows].to_numpy()
-    TD = []
-    valid_cols = []
-    for col in df.columns[1:]:
-        try:
-            TD.append(float(col))
-            valid_cols.append(col)
-        except Exception:
-            continue
-    TD = np.array(TD)
-    data = df.loc[valid_rows, valid_cols].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy()
-
-    return WL, TD, data
-
-
-def load_from_paths(data_path, wl_path, td_path):
-    """
-    Carga datos desde tres archivos separados: data, wl, td.
-    - data: matriz 2D
-    - wl: vector de longitudes de onda
-    - td: vector de tiempos de retardo
-    
-    La función detecta automáticamente la orientación de la matriz y ajusta
-    filas/columnas según wl y td. Si las dimensiones no coinciden, rellena
-    con ceros o trunca según sea necesario.
-    
-    Devuelve:
-        data_arr: np.array shape (n_wl, n_td)
-        wl: np.array 1D
-        td: np.array 1D
-    """
-    
-    # ---- Cargar archivos ----
-    # Intentar leer como CSV o txt
-    try:
-        df = pd.read_csv(data_path, header=None, sep=None, engine='python')
-        data = df.values
-    except Exception:
-        data = np.loadtxt(data_path)
-    
-    wl = np.loadtxt(wl_path)
-    td = np.loadtxt(td_path)
-    
-    # Reemplazar NaNs con 0
-    data = np.nan_to_num(data, nan=0.0)
-    wl = np.nan_to_num(wl, nan=0.0)
-    td = np.nan_to_num(td, nan=0.0)
-    
-    # ---- Detectar orientación ----
-    nwl, ntd = wl.size, td.size
-    if data.shape == (nwl, ntd):
-        data_arr = data.copy()
-    elif data.shape == (ntd, nwl):
-        data_arr = data.T.copy()
-    else:
-        # Intentar reshaping si coincide el número total de elementos
-        if data.size == nwl * ntd:
-            data_arr = data.reshape((nwl, ntd))
-        else:
-            # Rellenar/truncar según sea necesario
-            data_arr = np.zeros((nwl, ntd))
-            r = min(data.shape[0], nwl)
-            c = min(data.shape[1], ntd)
-            data_arr[:r, :c] = data[:r, :c]
-            print(f"Warning: data shape {data.shape} no coincide con (n_wl, n_td); se rellenó/truncó a {(nwl, ntd)}.")
-    
-    return data_arr, wl, td
-
-def load_data(auto_path=None, data_path=None, wl_path=None, td_path=None):
-    """
-    Carga datos desde un CSV único o desde tres archivos separados.
-    - auto_path: path al CSV completo
-    - data_path, wl_path, td_path: paths a los tres archivos
-    Devuelve: data (2D), WL (1D), TD (1D)
-    """
-    import os
-
-    if auto_path is not None and os.path.isfile(auto_path):
-        try:
-            WL, TD, data = read_csv_file(auto_path)
-            return data, WL, TD
-        except Exception:
-            pass  # fall back a tres archivos
-
-    if data_path and wl_path and td_path:
-        data, WL, TD = load_from_paths(data_path, wl_path, td_path)
-        return data, WL, TD
-
-    raise ValueError("No se proporcionaron archivos válidos o no se pudieron leer.")
-
-
-# ---------------------------------------------------------------------
-# Modelos y funciones de corrección
-# ---------------------------------------------------------------------
-def eV_a_nm(E_eV):
-    E_eV_safe = np.where(E_eV == 0,1 , E_eV)
-    return 1239.841984 / E_eV_safe
-def t0_model(w, a, b, c, d):
-    """
-    Modelo no lineal propuesto:
-    t0 = a * sqrt((b*w^2 - 1) / (c*w^2 - 1)) + d
-    Devuelve nan donde la expresión no es válida.
-    """
-    w = np.asarray(w, dtype=float)
-    num = b * w**2 - 1.0
-    den = c * w**2 - 1.0
-    out = np.full_like(w, np.nan, dtype=float)
-    with np.errstate(divide='ignore', invalid='ignore'):
-        ratio = num / den
-        valid = (den != 0) & (ratio >= 0)
-        out[valid] = a * np.sqrt(ratio[valid]) + d
-    return out
-
-def apply_t0_correction_poly(popt, WL, TD, data):
-    """Corrige datos usando un polinomio de grado 4.
-    popt puede ser array-like con 5 coeficientes [c4,c3,c2,c1,c0] (como np.polyfit devuelve).
-    Devuelve: corrected (same shape as data), t0_lambda (1D over WL)
-    """
-    # Acepta tanto coeficientes de np.polyfit (length 5) como exactamente (c4..c0)
-    coeffs = np.asarray(popt)
-    if coeffs.size != 5:
-        raise ValueError("Polynomial coefficients must have length 5.")
-    # np.polyval expects highest-first, so if user passed as [c4,c3,c2,c1,c0] that's ok
-    t0_lambda = np.polyval(coeffs, WL)
-    corrected = np.zeros_like(data)
-    for i, wl in enumerate(WL):
-        delay_corr = TD - t0_lambda[i]
-        f = interp1d(delay_corr, data[i, :], kind='cubic', bounds_error=False, fill_value='extrapolate')
-        corrected[i, :] = f(TD)
-    return corrected, t0_lambda
-
-
-def apply_t0_correction_nonlinear(popt, WL, TD, data):
-    """Corrige datos usando los parámetros popt del modelo no lineal t0_model.
-    Donde t0_model(WL) devuelve NaN, los datos se mantienen sin corregir.
-    Devuelve: corrected, t0_lambda
-    """
-    t0_lambda = t0_model(WL, *popt)  # puede contener NaNs
-    corrected = data.copy()
-    for i, t0_val in enumerate(t0_lambda):
-        if np.isfinite(t0_val):
-            delay_corr = TD - t0_val
-            f = interp1d(delay_corr, data[i, :], kind='cubic', bounds_error=False, fill_value='extrapolate')
-            corrected[i, :] = f(TD)
-        else:
-            corrected[i, :] = data[i, :]
-    return corrected, t0_lambda
-
-
-def fit_t0(w_points, t0_points, WL, TD, data, min_points_nonlinear=4, mode='auto'):
-    """
-    Ajusta t0 a partir de puntos (w_points,t0_points) seleccionados por el usuario.
-    Intentará ajustar el modelo no lineal (t0_model) si hay suficientes puntos; si falla,
-    cae a un ajuste polinómico de grado 4 (requiere >=5 puntos). 
-
-    Parámetros:
-      - w_points: array-like de longitudes de onda (nm) de los puntos elegidos
-      - t0_points: array-like de retardos (ps) correspondientes
-      - WL, TD, data: arrays tal como devuelve read_csv_file
-      - min_points_nonlinear: mínimo número de puntos para intentar modelo no lineal
-      - mode: 'auto' (default), 'nonlinear' (forzar modelo no lineal) o 'poly' (forzar polinómico)
-    """
-    w = np.asarray(w_points, dtype=float)
-    t0 = np.asarray(t0_points, dtype=float)
-
-    if w.size < 2:
-        raise ValueError("Se necesitan al menos 2 puntos para ajustar (mejor >=4 para modelo no lineal).")
-
-    fit_x = np.linspace(np.min(w), np.max(w), 400)
-
-    # =======================================================
-    # --- Modo forzado: polinómico --------------------------
-    # =======================================================
-    if mode == 'poly':
-        if w.size < 5:
-            deg = min(4, max(1, w.size - 1))
-        else:
-            deg = 4
-        coeffs = np.polyfit(w, t0, deg)
-        if coeffs.size < 5:
-            coeffs = np.concatenate([np.zeros(5 - coeffs.size), coeffs])
-        fit_y = np.polyval(coeffs, fit_x)
-        corrected, t0_lambda = apply_t0_correction_poly(coeffs, WL, TD, data)
-        return {
-            'method': f'poly{deg}',
-            'popt': coeffs,
-            'fit_x': fit_x,
-            'fit_y': fit_y,
-            'corrected': corrected,
-            't0_lambda': t0_lambda
-        }
-
-    # =======================================================
-    # --- Modo forzado: no lineal ---------------------------
-    # =======================================================
-    if mode == 'nonlinear':
-        try:
-            wmin = np.min(w)
-            a0 = (np.nanmax(t0) - np.nanmin(t0)) / 2.0 if np.isfinite(t0).any() else 0.0
-            d0 = np.nanmedian(t0)
-            min_required = 1.0 / (wmin**2) if wmin != 0 else 1e-8
-            b0 = min_required * 1.1
-            c0 = min_required * 1.2
-            p0 = [a0, b0, c0, d0]
-            bounds = ([-np.inf, min_required, min_required, -np.inf],
-                      [np.inf, np.inf, np.inf, np.inf])
-            popt, pcov = curve_fit(
-                t0_model, w, t0,
-                p0=p0, bounds=bounds,
-                maxfev=20000, method="trf"
-            )
-            fit_y = t0_model(fit_x, *popt)
-            corrected, t0_lambda = apply_t0_correction_nonlinear(popt, WL, TD, data)
-            return {
-                'method': 'nonlinear',
-                'popt': popt,
-                'fit_x': fit_x,
-                'fit_y': fit_y,
-                'corrected': corrected,
-                't0_lambda': t0_lambda
-            }
-        except Exception as e:
-            raise RuntimeError(f"Ajuste no lineal falló: {e}")
-
-    # =======================================================
-    # --- Modo automático (comportamiento original) ---------
-    # =======================================================
-    try_nl = (w.size >= min_points_nonlinear)
-    if try_nl:
-        try:
-            wmin = np.min(w)
-            a0 = (np.nanmax(t0) - np.nanmin(t0)) / 2.0 if np.isfinite(t0).any() else 0.0
-            d0 = np.nanmedian(t0)
-            min_required = 1.0 / (wmin**2) if wmin != 0 else 1e-8
-            b0 = min_required * 1.1
-            c0 = min_required * 1.2
-            p0 = [a0, b0, c0, d0]
-            bounds = ([-np.inf, min_required, min_required, -np.inf],
-                      [np.inf, np.inf, np.inf, np.inf])
-            popt, pcov = curve_fit(
-                t0_model, w, t0,
-                p0=p0, bounds=bounds,
-                maxfev=20000, method="trf"
-            )
-            fit_y = t0_model(fit_x, *popt)
-            if np.all(np.isfinite(fit_y)):
-                corrected, t0_lambda = apply_t0_correction_nonlinear(popt, WL, TD, data)
-                return {
-                    'method': 'nonlinear',
-                    'popt': popt,
-                    'fit_x': fit_x,
-                    'fit_y': fit_y,
-                    'corrected': corrected,
-                    't0_lambda': t0_lambda
-                }
-        except Exception:
-            pass  # Si falla, usa fallback polinómico
-
-    # --- Fallback polinómico (original) ---
-    if w.size < 5:
-        deg = min(3, max(1, w.size - 1))
-    else:
-        deg = 4
-
-    coeffs = np.polyfit(w, t0, deg)
-    if coeffs.size < 5:
-        coeffs = np.concatenate([np.zeros(5 - coeffs.size), coeffs])
-    fit_y = np.polyval(coeffs, fit_x)
-    corrected, t0_lambda = apply_t0_correction_poly(coeffs, WL, TD, data)
-    return {
-        'method': f'poly{deg}',
-        'popt': coeffs,
-        'fit_x': fit_x,
-        'fit_y': fit_y,
-        'corrected': corrected,
-        't0_lambda': t0_lambda
-    }
-
-
-
+# core_analysis.py
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.interpolate import CubicSpline
+from scipy.ndimage import uniform_filter1d
+from scipy.optimize import least_squares, minimize_scalar
+import data_cache
+
+def _sniff_delimiter(line):
+    """Detecta el separador de una línea de texto (',', ';', tab o espacios)."""
+    for delim in (',', ';', '\t'):
+        if delim in line:
+            return delim
+    return ' '
+
+
+def _parse_row_tolerant(line, delimiter, n_cols):
+    """Parseo lento de una fila: los campos vacíos o no numéricos pasan a NaN."""
+    fields = line.split() if delimiter == ' ' else line.split(delimiter)
+    row = np.full(n_cols, np.nan)
+    for j, field in enumerate(fields[:n_cols]):
+        try:
+            row[j] = float(field)
+        except ValueError:
+            continue
+    return row
+
+
+def read_matrix_file(path, delimiter=None, nan_value=0.0):
+    """Lee una matriz con el formato documentado (primera fila = delays,
+    primera columna = longitudes de onda) en una sola pasada.
+
+    Todas las filas se vuelcan en un array float64 preasignado; solo las filas
+    con campos vacíos o no numéricos pasan por el parseo lento campo a campo.
+    Se descartan las filas sin longitud de onda válida y las columnas sin
+    delay válido; el resto de NaNs se sustituyen por `nan_value`.
+
+    Devuelve: WL (1D numpy), TD (1D numpy), data (2D numpy shape (n_wl, n_td))
+    """
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        lines = [ln for ln in f.read().splitlines() if ln.strip()]
+    if len(lines) < 2:
+        raise ValueError(f"El archivo {path} no contiene datos suficientes.")
+
+    if delimiter is None:
+        delimiter = _sniff_delimiter(lines[0])
+    # Exportaciones tipo Excel dejan un separador al final de cada línea
+    strip_tail = delimiter != ' ' and lines[0].rstrip().endswith(delimiter)
+    if strip_tail:
+        lines = [ln.rstrip().rstrip(delimiter) for ln in lines]
+
+    n_cols = len(lines[0].split() if delimiter == ' ' else lines[0].split(delimiter))
+    if n_cols < 2:
+        raise ValueError(f"No se pudo detectar el formato de la matriz en {path}.")
+
+    TD = _parse_row_tolerant(lines[0], delimiter, n_cols)[1:]
+    WL = np.empty(len(lines) - 1, dtype=np.float64)
+    data = np.empty((len(lines) - 1, n_cols - 1), dtype=np.float64)
+
+    with warnings.catch_warnings():
+        # np.fromstring solo avisa (DeprecationWarning) si la fila está incompleta
+        warnings.simplefilter('error', DeprecationWarning)
+        for i, line in enumerate(lines[1:]):
+            try:
+                row = np.fromstring(line, dtype=np.float64, sep=delimiter)
+            except (ValueError, DeprecationWarning):
+                row = None
+            if row is None or row.size != n_cols:
+                row = _parse_row_tolerant(line, delimiter, n_cols)
+            WL[i] = row[0]
+            data[i] = row[1:]
+
+    valid_rows = np.isfinite(WL)
+    valid_cols = np.isfinite(TD)
+    if not (valid_rows.all() and valid_cols.all()):
+        data = data[np.ix_(valid_rows, valid_cols)]
+        WL = WL[valid_rows]
+        TD = TD[valid_cols]
+    if nan_value is not None:
+        np.nan_to_num(data, copy=False, nan=nan_value)
+
+    return WL, TD, data
+
+
+def read_csv_file(path):
+    """Lee y limpia los datos del CSV.
+    Devuelve: WL (1D numpy), TD (1D numpy), data (2D numpy shape (n_wl, n_td))
+    """
+    return read_matrix_file(path)
+
+
+def load_from_paths(data_path, wl_path, td_path):
+    """
+    Carga datos desde tres archivos separados: data, wl, td.
+    - data: matriz 2D
+    - wl: vector de longitudes de onda
+    - td: vector de tiempos de retardo
+    
+    La función detecta automáticamente la orientación de la matriz y ajusta
+    filas/columnas según wl y td. Si las dimensiones no coinciden, rellena
+    con ceros o trunca según sea necesario.
+    
+    Devuelve:
+        data_arr: np.array shape (n_wl, n_td)
+        wl: np.array 1D
+        td: np.array 1D
+    """
+    
+    # ---- Cargar archivos ----
+    # Intentar leer como CSV o txt
+    try:
+        df = pd.read_csv(data_path, header=None, sep=None, engine='python')
+        data = df.values
+    except Exception:
+        data = np.loadtxt(data_path)
+    
+    wl = np.loadtxt(wl_path)
+    td = np.loadtxt(td_path)
+    
+    # Reemplazar NaNs con 0
+    data = np.nan_to_num(data, nan=0.0)
+    wl = np.nan_to_num(wl, nan=0.0)
+    td = np.nan_to_num(td, nan=0.0)
+    
+    # ---- Detectar orientación ----
+    nwl, ntd = wl.size, td.size
+    if data.shape == (nwl, ntd):
+        data_arr = data.copy()
+    elif data.shape == (ntd, nwl):
+        data_arr = data.T.copy()
+    else:
+        # Intentar reshaping si coincide el número total de elementos
+        if data.size == nwl * ntd:
+            data_arr = data.reshape((nwl, ntd))
+        else:
+            # Rellenar/truncar según sea necesario
+            data_arr = np.zeros((nwl, ntd))
+            r = min(data.shape[0], nwl)
+            c = min(data.shape[1], ntd)
+            data_arr[:r, :c] = data[:r, :c]
+            print(f"Warning: data shape {data.shape} no coincide con (n_wl, n_td); se rellenó/truncó a {(nwl, ntd)}.")
+    
+    return data_arr, wl, td
+
+def load_data(auto_path=None, data_path=None, wl_path=None, td_path=None, use_cache=True):
+    """
+    Carga datos desde un CSV único o desde tres archivos separados.
+    - auto_path: path al CSV completo
+    - data_path, wl_path, td_path: paths a los tres archivos
+    - use_cache: reutiliza la versión binaria ya parseada (ver data_cache)
+    Devuelve: data (2D), WL (1D), TD (1D)
+    """
+    import os
+
+    csv_error = None
+    if auto_path is not None and os.path.isfile(auto_path):
+        def _parse_single():
+            WL, TD, data = read_csv_file(auto_path)
+            return data, WL, TD
+
+        try:
+            if use_cache:
+                return data_cache.cached_load([auto_path], _parse_single)
+            return _parse_single()
+        except Exception as e:
+            csv_error = e  # fall back a tres archivos
+
+    if data_path and wl_path and td_path:
+        def _parse_three():
+            return load_from_paths(data_path, wl_path, td_path)
+
+        if use_cache:
+            return data_cache.cached_load([data_path, wl_path, td_path], _parse_three)
+        return _parse_three()
+
+    if csv_error is not None:
+        raise ValueError(f"No se pudo leer {auto_path}: {csv_error}") from csv_error
+    raise ValueError("No se proporcionaron archivos válidos o no se pudieron leer.")
+
+
+# ---------------------------------------------------------------------
+# Contenedor de resultados (sin pickle, con memoria mapeada)
+# ---------------------------------------------------------------------
+RESULTS_MANIFEST = "manifest.json"
+
+
+def save_results(path, arrays, meta=None):
+    """
+    Guarda un diccionario de arrays como una carpeta con un .npy por clave y un
+    manifest.json pequeño (formas, dtypes y metadatos opcionales).
+    A diferencia de np.save(dict), no usa pickle y cada array puede abrirse con
+    mmap_mode='r'. Los valores None (p. ej. errores no calculados) no se guardan.
+    Si la carpeta ya tenía resultados, se borran los .npy del manifest anterior
+    que no se han vuelto a escribir. Devuelve la ruta de la carpeta.
+    """
+    import json
+    import os
+
+    os.makedirs(path, exist_ok=True)
+    manifest_path = os.path.join(path, RESULTS_MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            old_files = {info["file"] for info in json.load(f)["arrays"].values()}
+    except (OSError, ValueError, KeyError, TypeError):
+        old_files = set()
+
+    manifest = {"format": "ultrafast-results", "version": 1, "arrays": {}, "meta": meta or {}}
+    for name, arr in arrays.items():
+        if arr is None:
+            continue
+        arr = np.ascontiguousarray(arr)
+        if arr.dtype == object:
+            raise TypeError(f"'{name}' no es un array numérico; no se puede guardar sin pickle.")
+        fname = f"{name}.npy"
+        np.save(os.path.join(path, fname), arr, allow_pickle=False)
+        manifest["arrays"][name] = {"file": fname, "shape": list(arr.shape), "dtype": arr.dtype.str}
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+
+    # load_results sólo lee lo que lista el manifest; esto evita dejar arrays obsoletos
+    new_files = {info["file"] for info in manifest["arrays"].values()}
+    for fname in old_files - new_files:
+        try:
+            os.remove(os.path.join(path, os.path.basename(fname)))
+        except OSError:
+            pass
+    return path
+
+
+def load_results(path, mmap_mode='r'):
+    """
+    Carga resultados guardados con save_results (carpeta o su manifest.json).
+    Por compatibilidad también acepta los .npy antiguos con un dict pickled
+    (en ese caso los arrays se cargan en RAM). Devuelve un dict de arrays.
+    """
+    import json
+    import os
+
+    if os.path.basename(path) == RESULTS_MANIFEST:
+        path = os.path.dirname(path)
+
+    if os.path.isdir(path):
+        with open(os.path.join(path, RESULTS_MANIFEST)) as f:
+            manifest = json.load(f)
+        return {
+            name: np.load(os.path.join(path, info["file"]), mmap_mode=mmap_mode, allow_pickle=False)
+            for name, info in manifest["arrays"].items()
+        }
+
+    # Formato antiguo: np.save(dict) -> requiere pickle
+    obj = np.load(path, allow_pickle=True)
+    if obj.dtype == object and obj.shape == ():
+        return dict(obj.item())
+    raise ValueError(f"{path} no es un archivo de resultados reconocido.")
+
+
+# ---------------------------------------------------------------------
+# Modelos y funciones de corrección
+# ---------------------------------------------------------------------
+def eV_a_nm(E_eV):
+    E_eV_safe = np.where(E_eV == 0,1 , E_eV)
+    return 1239.841984 / E_eV_safe
+
+
+def _linear_weights(grid, x):
+    """Índices, fracciones y máscara de interior para interpolar linealmente en `grid` (creciente) en x."""
+    idx = np.searchsorted(grid, x, side='right') - 1
+    np.clip(idx, 0, grid.size - 2, out=idx)
+    frac = (x - grid[idx]) / (grid[idx + 1] - grid[idx])
+    inside = (x >= grid[0]) & (x <= grid[-1])
+    return idx, frac, inside
+
+
+class SolventShifter:
+    """
+    Solvente interpolado a la rejilla (WL, TD) de la medida y desplazado en el tiempo.
+
+    Equivale a RegularGridInterpolator((WLSol, TDSol), solvent, bounds_error=False,
+    fill_value=0) evaluado en (WL, TD - sf). Como la interpolación bilineal es
+    separable, el paso en λ se hace una sola vez al crear el objeto (y se omite si
+    las rejillas coinciden); cada shift es sólo una interpolación lineal 1-D en el
+    eje temporal, con índices y pesos comunes a todas las filas. El último shift
+    se guarda, así que cambiar sólo la amplitud no reinterpola.
+    """
+
+    def __init__(self, WLSol, TDSol, solvent, WL, TD):
+        WLSol = np.asarray(WLSol, dtype=float)
+        TDSol = np.asarray(TDSol, dtype=float)
+        solvent = np.asarray(solvent, dtype=float)
+        WL = np.asarray(WL, dtype=float)
+        if np.any(np.diff(TDSol) <= 0):
+            order = np.argsort(TDSol, kind='stable')
+            TDSol, solvent = TDSol[order], solvent[:, order]
+
+        if WLSol.shape == WL.shape and np.allclose(WLSol, WL):
+            rows = np.array(solvent, copy=True)
+        else:
+            if np.any(np.diff(WLSol) <= 0):
+                order = np.argsort(WLSol, kind='stable')
+                WLSol, solvent = WLSol[order], solvent[order]
+            idx, frac, inside = _linear_weights(WLSol, WL)
+            rows = solvent[idx] * (1.0 - frac)[:, None] + solvent[idx + 1] * frac[:, None]
+            rows[~inside] = 0.0
+        self._rows = np.ascontiguousarray(rows)
+        self.TDSol = TDSol
+        self.TD = np.asarray(TD, dtype=float)
+        self._last = None   # (sf, solvente desplazado); una sola tupla para poder leerla desde otro hilo
+
+    def shifted(self, sf):
+        """Solvente en la rejilla de la medida evaluado en TD - sf (0 fuera de rango)."""
+        sf = float(sf)
+        last = self._last
+        if last is not None and sf == last[0]:
+            return last[1]
+        idx, frac, inside = _linear_weights(self.TDSol, self.TD - sf)
+        out = self._rows.take(idx, axis=1)
+        out *= 1.0 - frac
+        out += self._rows.take(idx + 1, axis=1) * frac
+        out[:, ~inside] = 0.0
+        self._last = (sf, out)
+        return out
+
+    def subtract(self, medida, am, sf):
+        """medida - am * solvente(TD - sf), en un array nuevo."""
+        base = self.shifted(sf) * (-float(am))
+        base += medida
+        return base
+
+    def fit_scaling(self, medida, t_window, sf_bounds=(-1.0, 1.0), n_grid=201, rows=None):
+        """
+        Busca (am, sf) que minimizan ||medida - am·solvente(TD - sf)||² en la ventana
+        temporal t_window = (t_min, t_max) (típicamente antes de t0 / tiempos cortos,
+        donde domina el artefacto del solvente) y en las filas `rows` (None = todas).
+
+        Para cada sf la amplitud óptima es cerrada: am = <M,S>/<S,S>. Los productos
+        escalares de todos los sf candidatos salen de S^T·M y de la diagonal y
+        subdiagonal de S^T·S sobre las columnas del solvente implicadas, así que la
+        búsqueda en rejilla (n_grid valores en sf_bounds) no construye ninguna
+        matriz desplazada. El mejor sf se refina con minimize_scalar.
+        Devuelve (am, sf, rss) con rss el residuo en la ventana.
+        """
+        TD, TDSol = self.TD, self.TDSol
+        cols = np.flatnonzero((TD >= t_window[0]) & (TD <= t_window[1]))
+        if cols.size == 0:
+            raise ValueError("La ventana temporal no contiene retardos.")
+        sf_lo, sf_hi = float(min(sf_bounds)), float(max(sf_bounds))
+        S = self._rows if rows is None else self._rows[rows]
+        M = np.asarray(medida, dtype=float)[:, cols] if rows is None else np.asarray(medida, dtype=float)[rows][:, cols]
+        t = TD[cols]
+
+        # Columnas del solvente que pueden intervenir para algún sf del intervalo
+        j0 = max(0, np.searchsorted(TDSol, t.min() - sf_hi, side='right') - 2)
+        j1 = min(TDSol.size, np.searchsorted(TDSol, t.max() - sf_lo, side='left') + 2)
+        Sj = S[:, j0:j1]
+        P = Sj.T @ M                                   # <S_j, M_c>
+        q0 = np.einsum('rj,rj->j', Sj, Sj)             # <S_j, S_j>
+        q1 = np.einsum('rj,rj->j', Sj[:, :-1], Sj[:, 1:])   # <S_j, S_j+1>
+        mm = float(np.einsum('rc,rc->', M, M))
+        grid = TDSol[j0:j1]
+        if grid.size < 2:
+            raise ValueError("La ventana queda fuera del rango temporal del solvente.")
+        c_idx = np.arange(cols.size)
+
+        def _terms(sf):
+            sf = np.atleast_1d(np.asarray(sf, dtype=float))
+            idx, frac, inside = _linear_weights(grid, t[None, :] - sf[:, None])
+            a = np.where(inside, 1.0 - frac, 0.0)
+            b = np.where(inside, frac, 0.0)
+            ms = (a * P[idx, c_idx] + b * P[idx + 1, c_idx]).sum(axis=1)
+            ss = (a * a * q0[idx] + 2.0 * a * b * q1[idx] + b * b * q0[idx + 1]).sum(axis=1)
+            return ms, ss
+
+        def _rss(sf):
+            ms, ss = _terms(sf)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(ss > 0, mm - ms * ms / ss, mm)
+
+        shifts = np.linspace(sf_lo, sf_hi, max(3, int(n_grid)))
+        rss = _rss(shifts)
+        k = int(np.argmin(rss))
+        step = shifts[1] - shifts[0]
+        lo, hi = max(sf_lo, shifts[k] - step), min(sf_hi, shifts[k] + step)
+        res = minimize_scalar(lambda x: float(_rss(x)[0]), bounds=(lo, hi), method='bounded',
+                              options={'xatol': 1e-4 * max(step, 1e-12)})
+        sf_best = float(res.x) if res.fun <= rss[k] else float(shifts[k])
+        ms, ss = _terms(sf_best)
+        am_best = float(ms[0] / ss[0]) if ss[0] > 0 else 0.0
+        return am_best, sf_best, float(_rss(sf_best)[0])
+
+
+def t0_model(w, a, b, c, d):
+    """
+    Modelo no lineal propuesto:
+    t0 = a * sqrt((b*w^2 - 1) / (c*w^2 - 1)) + d
+    Devuelve nan donde la expresión no es válida.
+    """
+    w = np.asarray(w, dtype=float)
+    num = b * w**2 - 1.0
+    den = c * w**2 - 1.0
+    out = np.full_like(w, np.nan, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = num / den
+        valid = (den != 0) & (ratio >= 0)
+        out[valid] = a * np.sqrt(ratio[valid]) + d
+    return out
+
+
+def t0_model_jac(w, a, b, c, d):
+    """
+    Jacobiano analítico de t0_model respecto a (a, b, c, d), forma (len(w), 4).
+    Con W = w², N = bW - 1, D = cW - 1 y S = sqrt(N/D):
+      ∂/∂a = S,  ∂/∂b = a·W / (2·S·D),  ∂/∂c = -a·S·W / (2·D),  ∂/∂d = 1
+    Donde el modelo no es válido las derivadas son 0.
+    """
+    w = np.asarray(w, dtype=float)
+    W = w**2
+    num = b * W - 1.0
+    den = c * W - 1.0
+    jac = np.zeros(w.shape + (4,))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = num / den
+        valid = (den != 0) & (ratio >= 0)
+        S = np.sqrt(np.where(valid, ratio, 0.0))
+        S_safe = np.maximum(S, np.sqrt(np.finfo(float).eps))
+        jac[..., 0] = S
+        jac[..., 1] = a * W / (2.0 * S_safe * den)
+        jac[..., 2] = -a * S * W / (2.0 * den)
+        jac[..., 3] = 1.0
+    jac[~valid] = 0.0
+    jac[~valid, 3] = 1.0
+    return jac
+
+
+def _t0_model_seeds(w, t0, n_starts, seed=0):
+    """Semillas (a, b, c, d) para t0_model: la estimación manual original y, si n_starts > 1,
+    variaciones aleatorias reproducibles dentro de las cotas del ajuste."""
+    wmin = np.min(w)
+    a0 = (np.nanmax(t0) - np.nanmin(t0)) / 2.0 if np.isfinite(t0).any() else 0.0
+    d0 = np.nanmedian(t0)
+    min_required = 1.0 / (wmin**2) if wmin != 0 else 1e-8
+    seeds = [[a0, min_required * 1.1, min_required * 1.2, d0]]
+    rng = np.random.default_rng(seed)
+    span = max(abs(a0), 1e-3)
+    for _ in range(max(0, int(n_starts) - 1)):
+        b0, c0 = min_required * (1.0 + 10.0 ** rng.uniform(-3, 1, size=2))
+        a = rng.choice([-1.0, 1.0]) * span * 10.0 ** rng.uniform(-1, 1)
+        seeds.append([a, b0, c0, d0 + rng.uniform(-1, 1) * span])
+    bounds = ([-np.inf, min_required, min_required, -np.inf],
+              [np.inf, np.inf, np.inf, np.inf])
+    return seeds, bounds
+
+
+def fit_t0_model(w, t0, sigma=None, n_starts=1, workers=None, maxfev=20000, screen_nfev=50):
+    """
+    Ajusta t0_model a los puntos (w, t0) con Jacobiano analítico (least_squares 'trf').
+
+    - sigma: incertidumbre de cada punto (None = todos iguales)
+    - n_starts: nº de semillas; la primera es la estimación manual y el resto
+      variaciones aleatorias (reproducibles). Todas se iteran en paralelo en
+      `workers` hilos con un presupuesto corto (`screen_nfev` evaluaciones) y sólo
+      la de menor residuo ponderado se lleva a convergencia.
+    Devuelve popt o lanza RuntimeError si el ajuste no converge.
+    """
+    w = np.asarray(w, dtype=float)
+    t0 = np.asarray(t0, dtype=float)
+    seeds, bounds = _t0_model_seeds(w, t0, n_starts)
+    inv_sigma = np.ones_like(t0) if sigma is None else 1.0 / np.asarray(sigma, dtype=float)
+
+    def residuals(p):
+        return (t0_model(w, *p) - t0) * inv_sigma
+
+    def jac(p):
+        return t0_model_jac(w, *p) * inv_sigma[:, None]
+
+    def _run(p0, max_nfev):
+        try:
+            res = least_squares(residuals, p0, jac=jac, bounds=bounds, method='trf', max_nfev=max_nfev)
+        except (ValueError, np.linalg.LinAlgError) as e:
+            return None, e
+        if not np.isfinite(res.cost):
+            return None, RuntimeError("residuo no finito")
+        return res, None
+
+    if len(seeds) > 1:
+        n_workers = min(resolve_workers(workers), len(seeds))
+        if n_workers > 1:
+            with ThreadPoolExecutor(max_workers=n_workers) as pool:
+                screened = list(pool.map(lambda p0: _run(p0, screen_nfev), seeds))
+        else:
+            screened = [_run(p0, screen_nfev) for p0 in seeds]
+        candidates = [r for r, _ in screened if r is not None]
+        if not candidates:
+            raise RuntimeError(f"ninguna semilla es válida ({screened[0][1]})")
+        start = min(candidates, key=lambda r: r.cost).x
+    else:
+        start = seeds[0]
+
+    res, err = _run(start, maxfev)
+    if res is None:
+        raise RuntimeError(str(err))
+    if res.status <= 0:
+        raise RuntimeError(f"el ajuste no convergió en {maxfev} evaluaciones")
+    return res.x
+
+
+def resolve_workers(workers):
+    """Traduce el parámetro `workers` a un nº de hilos/procesos (None/1 = serie, 0 o <0 = todos los núcleos)."""
+    import os
+
+    if workers is None:
+        return 1
+    workers = int(workers)
+    if workers <= 0:
+        return max(1, os.cpu_count() or 1)
+    return workers
+
+
+def _shift_block_cubic(TD, block, shifts, out, dtype):
+    """Evalúa el spline cúbico (not-a-knot) de cada fila de `block` en TD + shift."""
+    n_rows, n_td = block.shape
+    spline = CubicSpline(TD, block.T, axis=0, bc_type='not-a-knot', extrapolate=True)
+    # Coeficientes por fila y contiguos: (4, n_rows*(n_td-1))
+    coeffs = np.ascontiguousarray(spline.c.transpose(0, 2, 1), dtype=dtype).reshape(4, -1)
+    x_eval = TD[None, :] + shifts[:, None]
+    idx = np.searchsorted(TD, x_eval, side='right') - 1
+    np.clip(idx, 0, n_td - 2, out=idx)                      # fuera de rango -> extrapola
+    dx = (x_eval - TD[idx]).astype(dtype, copy=False)
+    flat_idx = idx + np.arange(n_rows)[:, None] * (n_td - 1)
+    res = coeffs[0].take(flat_idx)
+    for k in range(1, 4):
+        res *= dx
+        res += coeffs[k].take(flat_idx)
+    out[...] = res
+
+
+def shift_rows_cubic(TD, data, shifts, dtype=None, chunk_rows=64, workers=None):
+    """
+    Desplaza cada fila de `data` en el eje temporal compartido TD:
+    corrected[i, :] = S_i(TD + shifts[i]), con S_i el spline cúbico de la fila i.
+    Equivale a interp1d(TD - shifts[i], data[i], kind='cubic',
+    fill_value='extrapolate')(TD) fila a fila, pero construye los splines de
+    `chunk_rows` filas a la vez y evalúa todo de forma vectorizada.
+
+    Las filas con shift no finito se copian sin corregir.
+    dtype: tipo de trabajo/salida (por defecto el de data; np.float32 reduce memoria a la mitad).
+    workers: nº de hilos que procesan bloques de filas en paralelo (None/1 = serie, 0 = todos los núcleos).
+    """
+    TD = np.asarray(TD, dtype=float)
+    data = np.asarray(data)
+    shifts = np.asarray(shifts, dtype=float)
+    dtype = np.dtype(dtype) if dtype is not None else (data.dtype if data.dtype.kind == 'f' else np.dtype(float))
+    if shifts.shape != (data.shape[0],):
+        raise ValueError("shifts debe tener un valor por fila de data.")
+
+    # El spline necesita TD creciente; el resultado se devuelve en el orden original
+    order = None
+    if np.any(np.diff(TD) <= 0):
+        order = np.argsort(TD, kind='stable')
+        TD = TD[order]
+        data = data[:, order]
+
+    corrected = np.empty(data.shape, dtype=dtype)
+    finite = np.isfinite(shifts)
+    if not finite.all():
+        corrected[~finite] = data[~finite]
+
+    def _process(sel):
+        if finite.all():
+            # Bloque contiguo: se escribe directamente en la salida
+            block = slice(sel[0], sel[-1] + 1)
+            _shift_block_cubic(TD, data[block], shifts[block], corrected[block], dtype)
+        else:
+            out = np.empty((sel.size, data.shape[1]), dtype=dtype)
+            _shift_block_cubic(TD, data[sel], shifts[sel], out, dtype)
+            corrected[sel] = out
+
+    rows = np.flatnonzero(finite)
+    chunks = [rows[start:start + chunk_rows] for start in range(0, rows.size, chunk_rows)]
+    n_workers = min(resolve_workers(workers), len(chunks))
+    if n_workers > 1:
+        # Hilos sobre la misma memoria: cada tarea escribe su bloque de filas
+        # en `corrected` y no se copia la matriz completa por tarea
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            list(pool.map(_process, chunks))
+    else:
+        for sel in chunks:
+            _process(sel)
+
+    if order is not None:
+        restored = np.empty_like(corrected)
+        restored[:, order] = corrected
+        corrected = restored
+    return corrected
+
+
+def apply_t0_correction_poly(popt, WL, TD, data, dtype=None, workers=None):
+    """Corrige datos usando un polinomio de grado 4.
+    popt puede ser array-like con 5 coeficientes [c4,c3,c2,c1,c0] (como np.polyfit devuelve).
+    dtype: tipo de trabajo de la corrección (p. ej. np.float32 para matrices grandes).
+    workers: nº de hilos para repartir las filas (ver shift_rows_cubic).
+    Devuelve: corrected (same shape as data), t0_lambda (1D over WL)
+    """
+    # Acepta tanto coeficientes de np.polyfit (length 5) como exactamente (c4..c0)
+    coeffs = np.asarray(popt)
+    if coeffs.size != 5:
+        raise ValueError("Polynomial coefficients must have length 5.")
+    # np.polyval expects highest-first, so if user passed as [c4,c3,c2,c1,c0] that's ok
+    t0_lambda = np.polyval(coeffs, WL)
+    corrected = shift_rows_cubic(TD, data, t0_lambda, dtype=dtype, workers=workers)
+    return corrected, t0_lambda
+
+
+def apply_t0_correction_nonlinear(popt, WL, TD, data, dtype=None, workers=None):
+    """Corrige datos usando los parámetros popt del modelo no lineal t0_model.
+    Donde t0_model(WL) devuelve NaN, los datos se mantienen sin corregir.
+    Devuelve: corrected, t0_lambda
+    """
+    t0_lambda = t0_model(WL, *popt)  # puede contener NaNs
+    corrected = shift_rows_cubic(TD, data, t0_lambda, dtype=dtype, workers=workers)
+    return corrected, t0_lambda
+
+
+def apply_t0_correction(method, popt, WL, TD, data, dtype=None, workers=None):
+    """Aplica la corrección correspondiente a `method` ('nonlinear' o 'polyN')."""
+    if str(method).startswith('poly'):
+        return apply_t0_correction_poly(popt, WL, TD, data, dtype=dtype, workers=workers)
+    return apply_t0_correction_nonlinear(popt, WL, TD, data, dtype=dtype, workers=workers)
+
+
+def evaluate_t0_curve(method, popt, WL):
+    """t0(λ) del modelo ajustado ('nonlinear' o 'polyN') sobre WL."""
+    if str(method).startswith('poly'):
+        coeffs = np.asarray(popt)
+        if coeffs.size != 5:
+            raise ValueError("Polynomial coefficients must have length 5.")
+        return np.polyval(coeffs, WL)
+    return t0_model(WL, *popt)
+
+
+class LazyCorrectedData:
+    """
+    Matriz corregida en t0 que se calcula por filas bajo demanda.
+
+    Se comporta como un array 2D (WL x TD) de solo lectura: al indexar un rango
+    de filas (p. ej. la ventana visible del mapa) sólo se corrigen esas filas.
+    start_background() rellena el resto en un hilo, y finalize() / np.asarray()
+    completan lo que falte y devuelven el ndarray completo (p. ej. al guardar).
+    El resultado es idéntico fila a fila al de apply_t0_correction.
+    Guarda una vista de solo lectura de data, sin copiarla: quien la crea no debe
+    modificar la matriz original en sitio mientras queden filas pendientes (la
+    interfaz copia antes de editar). add_done_callback() avisa al terminar.
+    """
+
+    def __init__(self, method, popt, WL, TD, data, dtype=None, chunk_rows=64, workers=None):
+        self.method = method
+        self.popt = np.asarray(popt, dtype=float)
+        self.TD = np.asarray(TD, dtype=float)
+        self._data = np.asarray(data).view()
+        self._data.flags.writeable = False
+        self.t0_lambda = evaluate_t0_curve(method, self.popt, np.asarray(WL, dtype=float))
+        src_dtype = np.asarray(data[:1]).dtype
+        dtype = np.dtype(dtype) if dtype is not None else (src_dtype if src_dtype.kind == 'f' else np.dtype(float))
+        self.chunk_rows = int(chunk_rows)
+        self.workers = workers
+        self._out = np.empty(data.shape, dtype=dtype)
+        self._view = self._out.view()
+        self._view.flags.writeable = False
+        self._done = np.zeros(data.shape[0], dtype=bool)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._callbacks = []
+
+    # --- interfaz tipo ndarray ---
+    @property
+    def shape(self):
+        return self._out.shape
+
+    @property
+    def dtype(self):
+        return self._out.dtype
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def nbytes(self):
+        return self._out.nbytes
+
+    @property
+    def held_nbytes(self):
+        """Bytes retenidos: la salida más la matriz de entrada mientras queden filas pendientes."""
+        data = self._data
+        return self._out.nbytes + (data.nbytes if data is not None else 0)
+
+    @property
+    def flags(self):
+        return self._view.flags
+
+    def __len__(self):
+        return self._out.shape[0]
+
+    @property
+    def is_complete(self):
+        return bool(self._done.all())
+
+    def __getitem__(self, key):
+        rows = key[0] if isinstance(key, tuple) else key
+        if isinstance(rows, slice):
+            start, stop, step = rows.indices(len(self))
+            if step > 0:
+                self.ensure_rows(start, stop)
+            else:
+                self.finalize()
+        elif isinstance(rows, (int, np.integer)):
+            idx = int(rows) % len(self)
+            self.ensure_rows(idx, idx + 1)
+        else:
+            self.finalize()
+        return self._view[key]
+
+    def __array__(self, dtype=None, copy=None):
+        arr = self.finalize()
+        if dtype is not None and np.dtype(dtype) != arr.dtype:
+            return arr.astype(dtype)
+        return arr.copy() if copy else arr
+
+    # --- cálculo ---
+    def _compute_chunk(self, start, stop):
+        with self._lock:
+            pending = np.flatnonzero(~self._done[start:stop]) + start
+            if pending.size == 0:
+                return
+            block = slice(pending[0], pending[-1] + 1)
+            self._out[block] = shift_rows_cubic(self.TD, self._data[block], self.t0_lambda[block],
+                                                dtype=self._out.dtype, chunk_rows=self.chunk_rows,
+                                                workers=self.workers)
+            self._done[block] = True
+            callbacks = []
+            if self._done.all():
+                callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+    def add_done_callback(self, fn):
+        """Llama a fn(self) cuando todas las filas estén corregidas: en el hilo que
+        termina la última tanda, o ahora mismo si ya está completa."""
+        with self._lock:
+            if not self._done.all():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def ensure_rows(self, start, stop):
+        """Garantiza que las filas [start, stop) estén corregidas."""
+        start = max(0, int(start))
+        stop = min(len(self), int(stop))
+        for s in range(start, stop, self.chunk_rows):
+            self._compute_chunk(s, min(s + self.chunk_rows, stop))
+
+    def _fill(self):
+        for s in range(0, len(self), self.chunk_rows):
+            if self._stop.is_set():
+                return
+            self._compute_chunk(s, s + self.chunk_rows)
+
+    def start_background(self):
+        """Corrige en un hilo las filas que aún falten (de una en una tanda)."""
+        if self._thread is None and not self.is_complete:
+            self._thread = threading.Thread(target=self._fill, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop_background(self):
+        self._stop.set()
+
+    def finalize(self):
+        """Completa todas las filas y devuelve la matriz corregida (ndarray de solo lectura)."""
+        self.ensure_rows(0, len(self))
+        self._data = None if self.is_complete else self._data
+        return self._view
+
+
+class CorrectionCache:
+    """
+    Caché LRU de matrices corregidas, indexada por (versión del dataset, método, popt).
+
+    La versión del dataset la decide quien llama (p. ej. un contador de cargas o
+    los valores de amplitud/shift del solvente): debe cambiar siempre que cambie
+    `data`. Las entradas se expulsan por orden de uso cuando la suma de bytes
+    supera `max_bytes`. Los arrays guardados se marcan como solo lectura para
+    que nadie modifique en sitio una entrada compartida.
+    """
+
+    def __init__(self, max_bytes=512 * 1024**2):
+        self.max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def make_key(data_version, method, popt):
+        family = 'poly' if str(method).startswith('poly') else 'nonlinear'
+        return (data_version, family, np.asarray(popt, dtype=float).tobytes())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, corrected, t0_lambda):
+        # Una LazyCorrectedData retiene también la matriz de entrada hasta completarse
+        size = getattr(corrected, 'held_nbytes', corrected.nbytes) + np.asarray(t0_lambda).nbytes
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[2]
+        if isinstance(corrected, np.ndarray):
+            corrected.flags.writeable = False
+        self._entries[key] = (corrected, t0_lambda, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, _, old_size) = self._entries.popitem(last=False)
+            self.nbytes -= old_size
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def correct(self, data_version, method, popt, WL, TD, data, dtype=None, workers=None, lazy=False):
+        """Devuelve (corrected, t0_lambda) desde la caché o calculándolo y guardándolo.
+        Con lazy=True una entrada nueva se guarda como LazyCorrectedData."""
+        key = self.make_key(data_version, method, popt)
+        hit = self.get(key)
+        if hit is not None:
+            return hit[0], hit[1]
+        if lazy:
+            corrected = LazyCorrectedData(method, popt, WL, TD, data, dtype=dtype, workers=workers)
+            t0_lambda = corrected.t0_lambda
+        else:
+            corrected, t0_lambda = apply_t0_correction(method, popt, WL, TD, data, dtype=dtype, workers=workers)
+        self.put(key, corrected, t0_lambda)
+        return corrected, t0_lambda
+
+
+def detect_t0_onset(WL, TD, data, method='half_rise', t_window=None, smooth=5, min_snr=3.0, wl_step=1):
+    """
+    Estima automáticamente el inicio de la señal (t0) en todas las longitudes de onda a la vez.
+
+    Para cada fila se suaviza la cinética (media móvil de `smooth` puntos), se resta
+    la línea base (mediana del primer 10 % de la ventana) y se orienta la señal para
+    que su extremo sea positivo. Después:
+      - method='half_rise': t0 es el cruce (interpolado) del 50 % del máximo antes del pico
+      - method='max_derivative': t0 es el máximo de la derivada antes del pico (con
+        refinamiento parabólico)
+
+    Parámetros:
+      - t_window: (t_min, t_max) en ps donde buscar el inicio (None = todo TD)
+      - min_snr: se descartan las λ cuya amplitud/ruido de base sea menor
+      - wl_step: usar sólo una de cada `wl_step` longitudes de onda
+
+    Devuelve (w_points, t0_points, weights), listos para fit_t0(..., weights=weights).
+    Los pesos son proporcionales a la relación señal/ruido (máximo 1).
+    """
+    WL = np.asarray(WL, dtype=float)
+    TD = np.asarray(TD, dtype=float)
+    if method not in ('half_rise', 'max_derivative'):
+        raise ValueError(f"Método de detección desconocido: {method}")
+
+    rows = np.arange(0, WL.size, max(1, int(wl_step)))
+    if t_window is None:
+        cols = np.argsort(TD, kind='stable')
+    else:
+        cols = np.flatnonzero((TD >= t_window[0]) & (TD <= t_window[1]))
+        cols = cols[np.argsort(TD[cols], kind='stable')]
+    if cols.size < 5:
+        raise ValueError("La ventana temporal contiene menos de 5 retardos.")
+    t = TD[cols]
+    n_t = t.size
+
+    trace = np.asarray(data[rows][:, cols], dtype=float)
+    if smooth and int(smooth) > 1:
+        trace = uniform_filter1d(trace, size=int(smooth), axis=1, mode='nearest')
+
+    n_base = max(3, n_t // 10)
+    base = np.median(trace[:, :n_base], axis=1)
+    noise = 1.4826 * np.median(np.abs(trace[:, :n_base] - base[:, None]), axis=1)
+    sig = trace - base[:, None]
+
+    r = np.arange(rows.size)
+    peak = np.argmax(np.abs(sig), axis=1)
+    amp = sig[r, peak]
+    sig *= np.where(amp < 0, -1.0, 1.0)[:, None]   # flanco de subida siempre positivo
+    amp = np.abs(amp)
+    before_peak = np.arange(n_t)[None, :] <= peak[:, None]
+
+    if method == 'half_rise':
+        half = 0.5 * amp
+        below = (sig < half[:, None]) & before_peak
+        valid = below.any(axis=1)
+        j = n_t - 1 - np.argmax(below[:, ::-1], axis=1)    # último punto bajo la mitad
+        valid &= j < peak
+        j = np.minimum(j, n_t - 2)
+        y0, y1 = sig[r, j], sig[r, j + 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = np.where(y1 != y0, (half - y0) / (y1 - y0), 0.0)
+        t0 = t[j] + np.clip(frac, 0.0, 1.0) * (t[j + 1] - t[j])
+    else:
+        deriv = np.gradient(sig, t, axis=1)
+        k = np.argmax(np.where(before_peak, deriv, -np.inf), axis=1)
+        valid = peak > 0
+        k = np.clip(k, 1, n_t - 2)
+        dm, d0, dp = deriv[r, k - 1], deriv[r, k], deriv[r, k + 1]
+        den = dm - 2.0 * d0 + dp
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = np.where(den < 0, 0.5 * (dm - dp) / den, 0.0)
+        t0 = t[k] + np.clip(delta, -0.5, 0.5) * 0.5 * (t[k + 1] - t[k - 1])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        snr = np.where(noise > 0, amp / noise, np.inf)
+    valid &= np.isfinite(t0) & (snr >= min_snr) & (amp > 0)
+    if not valid.any():
+        return np.empty(0), np.empty(0), np.empty(0)
+
+    snr = snr[valid]
+    finite = np.isfinite(snr)
+    ref = snr[finite].max() if finite.any() else 1.0
+    weights = np.where(finite, snr / ref, 1.0)
+    return WL[rows][valid], t0[valid], weights
+
+
+def _artifact_rss(t, y, centers, sigma):
+    """Residuo del modelo de artefacto (G, G', G'', offset) para cada fila de y y cada centro candidato."""
+    u = (t[None, None, :] - centers[:, :, None]) / sigma                 # (R, K, T)
+    g = np.exp(-0.5 * u * u)
+    basis = np.stack([g, -u * g, (u * u - 1.0) * g, np.ones_like(g)], axis=-2)   # (R, K, 4, T)
+    gram = basis @ basis.swapaxes(-1, -2) + 1e-12 * np.eye(4)
+    proj = basis @ y[:, None, :, None]                                    # (R, K, 4, 1)
+    coef = np.linalg.solve(gram, proj)
+    return np.einsum('rt,rt->r', y, y)[:, None] - (coef * proj).sum(axis=(-2, -1))
+
+
+def _parabolic_min(f, k):
+    """Desplazamiento (en pasos de rejilla, |δ|<=1) del mínimo de la parábola por f[k-1], f[k], f[k+1]."""
+    r = np.arange(k.size)
+    fm, f0, fp = f[r, k - 1], f[r, k], f[r, k + 1]
+    den = fm - 2.0 * f0 + fp
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = np.where(den > 0, 0.5 * (fm - fp) / den, 0.0)
+    return np.clip(delta, -1.0, 1.0)
+
+
+def extract_t0_from_solvent(WL, TD, solvent, t_window=None, width=None, n_grid=21, min_snr=5.0,
+                            wl_step=1, chunk_rows=64):
+    """
+    Obtiene t0(λ) a partir del artefacto coherente de la medida del solvente.
+
+    En cada longitud de onda el artefacto se modela como combinación lineal de una
+    gaussiana centrada en t0 y sus dos primeras derivadas (más un offset):
+        s(t) ≈ a0·G + a1·G' + a2·G'' + c,   G = exp(-(t - t0)² / (2σ²))
+    Para cada fila se prueban `n_grid` centros en ±2σ alrededor del máximo de la
+    envolvente y después una rejilla fina alrededor del mejor; las amplitudes salen
+    por mínimos cuadrados cerrados (ecuaciones normales 4x4 de todas las filas a la
+    vez) y el centro con menor residuo se refina con una parábola.
+    σ es común a todas las λ: `width` (ps) o, si es None, el que mejor ajusta las
+    filas con más señal.
+
+    Devuelve (w_points, t0_points, weights) como detect_t0_onset, con pesos
+    proporcionales a la relación señal/ruido del artefacto ajustado.
+    """
+    WL = np.asarray(WL, dtype=float)
+    TD = np.asarray(TD, dtype=float)
+    rows = np.arange(0, WL.size, max(1, int(wl_step)))
+    if t_window is None:
+        cols = np.argsort(TD, kind='stable')
+    else:
+        cols = np.flatnonzero((TD >= t_window[0]) & (TD <= t_window[1]))
+        cols = cols[np.argsort(TD[cols], kind='stable')]
+    if cols.size < 8:
+        raise ValueError("La ventana temporal contiene menos de 8 retardos.")
+    t = TD[cols]
+
+    y = np.asarray(solvent[rows][:, cols], dtype=float)
+    n_base = max(3, t.size // 10)
+    base = np.median(y[:, :n_base], axis=1)
+    noise = 1.4826 * np.median(np.abs(y[:, :n_base] - base[:, None]), axis=1)
+    y -= base[:, None]
+    yy = np.einsum('rt,rt->r', y, y)
+
+    # Estimación inicial del centro: máximo de la envolvente (señal² suavizada)
+    env = uniform_filter1d(y * y, size=3, axis=1, mode='nearest')
+    peak = np.argmax(env, axis=1)
+    t_c = t[peak]
+    dt_min = np.min(np.diff(t))
+    n_grid = max(5, int(n_grid))
+    unit = np.linspace(-2.0, 2.0, n_grid)
+
+    if width is None:
+        # Anchura rms de la envolvente como punto de partida; se elige el σ que
+        # minimiza el residuo relativo en las filas con más señal
+        env_rel = env / np.maximum(env.max(axis=1, keepdims=True), np.finfo(float).tiny)
+        w_env = np.where(env_rel > 0.1, env_rel, 0.0)
+        spread = np.sqrt((w_env * (t[None, :] - t_c[:, None]) ** 2).sum(axis=1) / w_env.sum(axis=1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            strength = np.sqrt(env[np.arange(rows.size), peak]) / noise
+        best_rows = np.argsort(np.nan_to_num(strength, nan=0.0, posinf=np.finfo(float).max))[-32:]
+        sig0 = max(np.median(spread[best_rows]), 1.5 * dt_min)
+        candidates = sig0 * np.geomspace(0.3, 3.0, 13)
+        candidates = candidates[candidates >= 1.5 * dt_min]
+        score = [
+            np.sum(_artifact_rss(t, y[best_rows], t_c[best_rows, None] + sig * unit[None, :], sig).min(axis=1)
+                   / np.maximum(yy[best_rows], np.finfo(float).tiny))
+            for sig in candidates
+        ]
+        score = np.asarray(score)
+        j = int(np.argmin(score))
+        width = candidates[j]
+        if 0 < j < candidates.size - 1:
+            # refinamiento parabólico en log σ
+            step = np.log(candidates[1] / candidates[0])
+            width *= np.exp(step * _parabolic_min(score[None, :], np.array([j]))[0])
+    sigma = max(float(width), 1.5 * dt_min)
+
+    coarse = sigma * unit
+    fine = (coarse[1] - coarse[0]) * np.linspace(-1.0, 1.0, 11)
+    t0 = np.full(rows.size, np.nan)
+    rss_best = np.zeros(rows.size)
+    for start in range(0, rows.size, chunk_rows):
+        blk = slice(start, start + chunk_rows)
+        yb = y[blk]
+        # 1) rejilla gruesa en ±2σ
+        centers = t_c[blk, None] + coarse[None, :]
+        rss = _artifact_rss(t, yb, centers, sigma)
+        k = np.argmin(rss, axis=1)
+        inner = (k > 0) & (k < n_grid - 1)      # mínimo en el borde: no fiable
+        # 2) rejilla fina alrededor del mejor centro + refinamiento parabólico
+        centers = centers[np.arange(k.size), k][:, None] + fine[None, :]
+        rss = _artifact_rss(t, yb, centers, sigma)
+        k = np.clip(np.argmin(rss, axis=1), 1, fine.size - 2)
+        r = np.arange(k.size)
+        t0_blk = centers[r, k] + _parabolic_min(rss, k) * (fine[1] - fine[0])
+        t0[blk] = np.where(inner, t0_blk, np.nan)
+        rss_best[blk] = rss[r, k]
+
+    rms_fit = np.sqrt(np.clip(yy - rss_best, 0.0, None) / t.size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        snr = np.where(noise > 0, rms_fit / noise, np.inf)
+    valid = np.isfinite(t0) & (snr >= min_snr)
+    if not valid.any():
+        return np.empty(0), np.empty(0), np.empty(0)
+    snr = snr[valid]
+    finite = np.isfinite(snr)
+    ref = snr[finite].max() if finite.any() else 1.0
+    weights = np.where(finite, snr / ref, 1.0)
+    return WL[rows][valid], t0[valid], weights
+
+
+def fit_t0(w_points, t0_points, WL, TD, data, min_points_nonlinear=4, mode='auto', dtype=None,
+           workers=None, cache=None, data_version=None, lazy=False, weights=None, n_starts=1):
+    """
+    Ajusta t0 a partir de puntos (w_points,t0_points) seleccionados por el usuario.
+    Intentará ajustar el modelo no lineal (t0_model) si hay suficientes puntos; si falla,
+    cae a un ajuste polinómico de grado 4 (requiere >=5 puntos). 
+
+    Parámetros:
+      - w_points: array-like de longitudes de onda (nm) de los puntos elegidos
+      - t0_points: array-like de retardos (ps) correspondientes
+      - WL, TD, data: arrays tal como devuelve read_csv_file
+      - min_points_nonlinear: mínimo número de puntos para intentar modelo no lineal
+      - mode: 'auto' (default), 'nonlinear' (forzar modelo no lineal) o 'poly' (forzar polinómico)
+      - dtype: tipo de trabajo de la corrección (None = el de data; np.float32 ahorra memoria)
+      - workers: nº de hilos para la corrección (None/1 = serie, 0 = todos los núcleos)
+      - cache, data_version: CorrectionCache opcional y versión actual de `data`; si se
+        dan ambos, repetir un ajuste con el mismo resultado no recalcula la corrección
+      - lazy: si es True, 'corrected' es un LazyCorrectedData que corrige filas bajo demanda
+      - weights: confianza de cada punto (p. ej. de detect_t0_onset); se ignoran los puntos
+        con peso <= 0. Actúa como 1/sigma en el ajuste.
+      - n_starts: nº de semillas del ajuste no lineal (ver fit_t0_model)
+    """
+    w = np.asarray(w_points, dtype=float)
+    t0 = np.asarray(t0_points, dtype=float)
+    sigma = None
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)
+        keep = np.isfinite(weights) & (weights > 0)
+        w, t0, weights = w[keep], t0[keep], weights[keep]
+        sigma = 1.0 / weights
+
+    def _correct(method, popt):
+        if cache is not None and data_version is not None:
+            return cache.correct(data_version, method, popt, WL, TD, data,
+                                 dtype=dtype, workers=workers, lazy=lazy)
+        if lazy:
+            corrected = LazyCorrectedData(method, popt, WL, TD, data, dtype=dtype, workers=workers)
+            return corrected, corrected.t0_lambda
+        return apply_t0_correction(method, popt, WL, TD, data, dtype=dtype, workers=workers)
+
+    if w.size < 2:
+        raise ValueError("Se necesitan al menos 2 puntos para ajustar (mejor >=4 para modelo no lineal).")
+
+    fit_x = np.linspace(np.min(w), np.max(w), 400)
+
+    # =======================================================
+    # --- Modo forzado: polinómico --------------------------
+    # =======================================================
+    if mode == 'poly':
+        if w.size < 5:
+            deg = min(4, max(1, w.size - 1))
+        else:
+            deg = 4
+        coeffs = np.polyfit(w, t0, deg, w=weights)
+        if coeffs.size < 5:
+            coeffs = np.concatenate([np.zeros(5 - coeffs.size), coeffs])
+        fit_y = np.polyval(coeffs, fit_x)
+        corrected, t0_lambda = _correct('poly', coeffs)
+        return {
+            'method': f'poly{deg}',
+            'popt': coeffs,
+            'fit_x': fit_x,
+            'fit_y': fit_y,
+            'corrected': corrected,
+            't0_lambda': t0_lambda
+        }
+
+    # =======================================================
+    # --- Modo forzado: no lineal ---------------------------
+    # =======================================================
+    if mode == 'nonlinear':
+        try:
+            popt = fit_t0_model(w, t0, sigma=sigma, n_starts=n_starts, workers=workers)
+            fit_y = t0_model(fit_x, *popt)
+            corrected, t0_lambda = _correct('nonlinear', popt)
+            return {
+                'method': 'nonlinear',
+                'popt': popt,
+                'fit_x': fit_x,
+                'fit_y': fit_y,
+                'corrected': corrected,
+                't0_lambda': t0_lambda
+            }
+        except Exception as e:
+            raise RuntimeError(f"Ajuste no lineal falló: {e}")
+
+    # =======================================================
+    # --- Modo automático (comportamiento original) ---------
+    # =======================================================
+    try_nl = (w.size >= min_points_nonlinear)
+    if try_nl:
+        try:
+            popt = fit_t0_model(w, t0, sigma=sigma, n_starts=n_starts, workers=workers)
+            fit_y = t0_model(fit_x, *popt)
+            if np.all(np.isfinite(fit_y)):
+                corrected, t0_lambda = _correct('nonlinear', popt)
+                return {
+                    'method': 'nonlinear',
+                    'popt': popt,
+                    'fit_x': fit_x,
+                    'fit_y': fit_y,
+                    'corrected': corrected,
+                    't0_lambda': t0_lambda
+                }
+        except Exception:
+            pass  # Si falla, usa fallback polinómico
+
+    # --- Fallback polinómico (original) ---
+    if w.size < 5:
+        deg = min(3, max(1, w.size - 1))
+    else:
+        deg = 4
+
+    coeffs = np.polyfit(w, t0, deg, w=weights)
+    if coeffs.size < 5:
+        coeffs = np.concatenate([np.zeros(5 - coeffs.size), coeffs])
+    fit_y = np.polyval(coeffs, fit_x)
+    corrected, t0_lambda = _correct('poly', coeffs)
+    return {
+        'method': f'poly{deg}',
+        'popt': coeffs,
+        'fit_x': fit_x,
+        'fit_y': fit_y,
+        'corrected': corrected,
+        't0_lambda': t0_lambda
+    }
+
+
+
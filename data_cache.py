@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Caché binaria en disco para los datasets ya parseados.
+
+Cada entrada es una carpeta con los arrays (data, WL, TD) guardados como .npy
+sin comprimir y un meta.json con las fuentes. La carpeta se nombra con un hash
+de la ruta, tamaño, mtime y contenido (sha256) de cada archivo de origen, de
+modo que cualquier cambio en los archivos invalida la entrada automáticamente.
+El sha256 se recuerda en hashes.json por (ruta, tamaño, mtime): sólo se vuelve
+a leer el archivo completo si cambia su tamaño o fecha. Al reabrir, los arrays
+se cargan con memoria mapeada de sólo lectura, así que el coste no depende del
+tamaño del dataset.
+
+La carpeta de caché se limita a MAX_CACHE_BYTES expulsando las entradas usadas
+hace más tiempo (LRU según el mtime de su meta.json). En Windows un .npy
+mapeado no se puede borrar mientras el array siga vivo: esa entrada se salta y
+se reintenta en la siguiente expulsión.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+
+CACHE_DIR = os.environ.get(
+    "USA_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".ultrafast_analyzer_cache"),
+)
+MAX_CACHE_BYTES = int(os.environ.get("USA_CACHE_MAX_BYTES", 2 * 1024**3))
+
+_ARRAY_NAMES = ("data", "WL", "TD")
+_META_NAME = "meta.json"
+_HASH_INDEX = "hashes.json"
+
+logger = logging.getLogger(__name__)
+
+
+def file_fingerprint(path, known_hashes=None, chunk_size=1 << 22):
+    """
+    Devuelve ruta absoluta, tamaño, mtime (ns) y sha256 del contenido.
+    known_hashes: dict opcional {"ruta|tamaño|mtime": sha256}; si el archivo
+    está ahí no se vuelve a leer, y si no, se añade el hash calculado.
+    """
+    st = os.stat(path)
+    abs_path = os.path.abspath(path)
+    stamp = f"{abs_path}|{st.st_size}|{st.st_mtime_ns}"
+    sha = known_hashes.get(stamp) if known_hashes is not None else None
+    if sha is None:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        sha = digest.hexdigest()
+        if known_hashes is not None:
+            # Una sola entrada por ruta: las de versiones anteriores ya no sirven
+            for old in [k for k in known_hashes if k.rsplit("|", 2)[0] == abs_path]:
+                del known_hashes[old]
+            known_hashes[stamp] = sha
+    return {
+        "path": abs_path,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": sha,
+    }
+
+
+def _load_hash_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, _HASH_INDEX)) as f:
+            index = json.load(f)
+        return index if isinstance(index, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_hash_index(cache_dir, index):
+    # Los archivos que ya no existen no volverán a consultarse
+    index = {k: v for k, v in index.items() if os.path.exists(k.rsplit("|", 2)[0])}
+    path = os.path.join(cache_dir, _HASH_INDEX)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("No se pudo guardar el índice de hashes de la caché: %s", e)
+
+
+def _entry_key(fingerprints):
+    blob = json.dumps(fingerprints, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:32]
+
+
+def _entry_size(entry_dir):
+    total = 0
+    for name in os.listdir(entry_dir):
+        try:
+            total += os.path.getsize(os.path.join(entry_dir, name))
+        except OSError:
+            pass
+    return total
+
+
+def _read_entry(entry_dir):
+    """Abre una entrada con memoria mapeada (sólo lectura); None si está incompleta o dañada."""
+    meta_path = os.path.join(entry_dir, _META_NAME)
+    if not os.path.isfile(meta_path):
+        return None
+    try:
+        arrays = tuple(
+            np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+            for name in _ARRAY_NAMES
+        )
+    except (OSError, ValueError):
+        return None
+    # Marcar como usada recientemente (orden LRU)
+    try:
+        os.utime(meta_path, None)
+    except OSError:
+        pass
+    return arrays
+
+
+def _write_entry(cache_dir, key, arrays, fingerprints):
+    """Escribe la entrada en una carpeta temporal y la renombra al final."""
+    final_dir = os.path.join(cache_dir, key)
+    tmp_dir = f"{final_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        for name, arr in zip(_ARRAY_NAMES, arrays):
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(arr), allow_pickle=False)
+        with open(os.path.join(tmp_dir, _META_NAME), "w") as f:
+            json.dump({"sources": fingerprints, "created": time.time()}, f, indent=1)
+        os.replace(tmp_dir, final_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _remove_entry(entry_dir):
+    """
+    Borra una entrada; devuelve False si no se pudo (p. ej. un .npy aún mapeado
+    en Windows). Los .npy se borran antes que meta.json, así que una entrada
+    que no se pudo borrar sigue listada y evict la reintenta más adelante.
+    """
+    try:
+        for name in [f"{n}.npy" for n in _ARRAY_NAMES] + [_META_NAME]:
+            try:
+                os.remove(os.path.join(entry_dir, name))
+            except FileNotFoundError:
+                pass
+        shutil.rmtree(entry_dir)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.info("Entrada de caché en uso, se reintentará: %s (%s)", entry_dir, e)
+        return False
+    return True
+
+
+def evict(cache_dir=None, max_bytes=None, keep=()):
+    """
+    Borra las entradas menos usadas hasta que la caché ocupe <= max_bytes.
+    Devuelve las claves que había que borrar pero siguen en uso.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(cache_dir):
+        return []
+
+    entries = []
+    for key in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, key)
+        meta_path = os.path.join(entry_dir, _META_NAME)
+        if not os.path.isfile(meta_path):
+            continue
+        entries.append((os.path.getmtime(meta_path), key, _entry_size(entry_dir)))
+
+    total = sum(size for _, _, size in entries)
+    busy = []
+    for _, key, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if key in keep:
+            continue
+        if _remove_entry(os.path.join(cache_dir, key)):
+            total -= size
+        else:
+            busy.append(key)
+    return busy
+
+
+def clear(cache_dir=None):
+    """Vacía por completo la carpeta de caché."""
+    shutil.rmtree(cache_dir or CACHE_DIR, ignore_errors=True)
+
+
+def cached_load(paths, loader, cache_dir=None, max_bytes=None):
+    """
+    Devuelve (data, WL, TD) para los archivos `paths`, usando la caché si es posible.
+
+    - paths: lista de archivos de los que depende el resultado
+    - loader: función sin argumentos que parsea los archivos y devuelve (data, WL, TD)
+
+    Si la caché no está disponible (permisos, disco lleno...) simplemente se
+    llama a `loader` y el motivo queda en el log del módulo; los errores del
+    propio `loader` se propagan. Desde la caché los arrays son memmaps de sólo
+    lectura: quien necesite editarlos debe copiarlos antes.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+
+    known_hashes = _load_hash_index(cache_dir)
+    before = dict(known_hashes)
+    try:
+        fingerprints = [file_fingerprint(p, known_hashes) for p in paths]
+    except OSError as e:
+        logger.warning("Caché de datos no disponible para %s: %s", paths, e)
+        return loader()
+    if known_hashes != before:
+        _save_hash_index(cache_dir, known_hashes)
+
+    key = _entry_key(fingerprints)
+    entry_dir = os.path.join(cache_dir, key)
+    if os.path.isdir(entry_dir):
+        arrays = _read_entry(entry_dir)
+        if arrays is not None:
+            return arrays
+        _remove_entry(entry_dir)
+
+    data, WL, TD = loader()
+    arrays = (np.asarray(data, dtype=float), np.asarray(WL, dtype=float), np.asarray(TD, dtype=float))
+
+    nbytes = sum(a.nbytes for a in arrays)
+    if nbytes <= max_bytes:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            _write_entry(cache_dir, key, arrays, fingerprints)
+            evict(cache_dir, max_bytes, keep=(key,))
+        except OSError as e:
+            logger.warning("No se pudo escribir la caché de datos: %s", e)
+
+    return arrays
@@ -1,195 +1,1532 @@
-# -*- coding: utf-8 -*-
-import numpy as np
-import os
-from PyQt5.QtWidgets import QFileDialog
-from scipy import special as _special
-
-def load_npy(parent=None, normalize_per_wl=True):
-    """
-    Carga el archivo .npy, corrige baseline y devuelve matrices limpias.
-    """
-    file_path, _ = QFileDialog.getOpenFileName(parent, "Select treated data file", "", "NumPy files (*.npy)")
-    if not file_path:
-        raise ValueError("No file selected")
-    
-    data = np.load(file_path, allow_pickle=True).item()
-    data_c = data['data_c'].astype(float) 
-    
-    WL = data['WL'].flatten()
-    TD = data['TD'].flatten()
-    base_dir = os.path.dirname(file_path)
-    
-    return data_c, TD, WL, base_dir
-
-def crop_spectrum(data_c, WL, WLmin, WLmax):
-    mask = (WL >= WLmin) & (WL <= WLmax)
-    return data_c[:, mask], WL[mask] 
-
-def crop_kinetics(data_c, TD, TDmin, TDmax):
-    mask = (TD >= TDmin) & (TD <= TDmax)
-    return data_c[:, mask], TD[mask] 
-
-def binning(data_c, WL, bin_size):
-    numWL = len(WL) // bin_size
-    datacAVG = np.zeros((numWL, data_c.shape[1]))
-    WLAVG = np.zeros(numWL)
-    for i in range(numWL):
-        datacAVG[i, :] = np.mean(data_c[i*bin_size:(i+1)*bin_size, :], axis=0)
-        WLAVG[i] = np.mean(WL[i*bin_size:(i+1)*bin_size])
-    return datacAVG, WLAVG
-
-def convolved_exp(t, t0, tau, w):
-    """
-    Analytical expression for convolution of single-exponential decay
-    with Gaussian IRF.
-    """
-    t = np.asarray(t)
-    tau = np.maximum(tau, 1e-12) # Evitar división por cero
-    w = np.maximum(w, 1e-12)
-    
-    arg1 = (w**2 - 2 * tau * (t - t0)) / (2 * tau**2)
-    arg2 = (w**2 - tau * (t - t0)) / (np.sqrt(2) * w * tau)
-    # --- PROTECCIÓN CONTRA OVERFLOW ---
-
-    arg1 = np.clip(arg1, -700, 700)
-    return 0.5 * np.exp(arg1) * (1 - _special.erf(arg2))
-
-def eval_global_model(x, t, numExp, numWL, t0_choice_str):
-    """
-    Calcula la matriz del modelo.
-    Estructura de x:
-    - Si t0 variable (Chirp): [w, tau_1..tau_n,  (t0_wl1, A1_wl1..An_wl1), (t0_wl2...)...]
-    - Si t0 fijo (Global):    [w, t0, tau_1..tau_n, (A1_wl1..An_wl1), (A1_wl2...)...]
-    """
-    F = np.zeros((len(t), numWL))
-    
-    if t0_choice_str == 'Yes': # CHIRP CORRECTION MODE (t0 varía por WL)
-        w = x[0]
-        taus = x[1:1+numExp]
-        base_idx = 1 + numExp
-        
-        for j in range(numWL):
-            idx = base_idx + j*(numExp+1)
-            t0 = x[idx]
-            Amps = x[idx+1 : idx+1+numExp]
-            
-            # Suma de exponenciales para esta longitud de onda
-            kinetics = np.zeros_like(t)
-            for n in range(numExp):
-                kinetics += Amps[n] * convolved_exp(t, t0, taus[n], w)
-            F[:, j] = kinetics
-
-    else: # STANDARD GLOBAL FIT (t0 único global) 
-        w = x[0]
-        t0 = x[1]
-        taus = x[2:2+numExp]
-        A_base = 2 + numExp
-        
-        # 1. Pre-calcular las bases cinéticas (Time x NumExp)
-        # Esto se hace una sola vez para todas las WLs
-        basis_functions = np.zeros((len(t), numExp))
-        for n in range(numExp):
-            basis_functions[:, n] = convolved_exp(t, t0, taus[n], w)
-            
-        # 2. Extraer todas las amplitudes en una matriz (NumExp x NumWL)
-        # x tiene [A1_wl1, A2_wl1, ..., A1_wl2, A2_wl2...]
-        all_Amps = x[A_base:].reshape(numWL, numExp).T 
-        
-        # 3. Multiplicación matricial: [T, Exp] @ [Exp, WL] -> [T, WL]
-        F = basis_functions @ all_Amps
-        
-    return F
-
-def get_sequential_populations(t, t0, w, taus):
-    """ Calculates populations for a sequential model A -> B -> C... """
-    k = 1.0 / np.asarray(taus) # Rates
-    pops = []
-    
-    E = [convolved_exp(t, t0, tau, w) for tau in taus]
-    
-    # --- Species 1 ---
-    pops.append(E[0])
-    
-    # --- Species 2 ---
-    if len(taus) >= 2:
-        denom = k[1] - k[0]
-        if abs(denom) < 1e-9: denom = 1e-9 
-        factor = k[0] / denom
-        p2 = factor * (E[0] - E[1])
-        pops.append(p2)
-        
-    # --- Species 3 ---
-    if len(taus) >= 3:
-        k0, k1, k2 = k[0], k[1], k[2]
-        d0 = (k[1]-k[0]) * (k[2]-k[0])
-        d1 = (k[0]-k[1]) * (k[2]-k[1])
-        d2 = (k[0]-k[2]) * (k[1]-k[2])
-        if abs(d0) < 1e-9: d0 = 1e-9
-        if abs(d1) < 1e-9: d1 = 1e-9
-        if abs(d2) < 1e-9: d2 = 1e-9
-        p3 = (k0 * k1) * ( (E[0]/d0) + (E[1]/d1) + (E[2]/d2) )
-        pops.append(p3)
-
-    return pops
-
-
-def eval_sequential_model(x, t, numExp, numWL, t0_choice_str):
-    """
-    Calcula la matriz del modelo SECUENCIAL (A -> B -> C...).
-    
-    Interpretación de los parámetros 'Amps' en x:
-    En modelo paralelo: Amps = DAS (Decay Associated Spectra)
-    En modelo secuencial: Amps = SAS (Species Associated Spectra) o EADS
-    
-    Estructura de x (idéntica a tu modelo global):
-    - Chirp (Yes): [w, tau_1..n, (t0_wl1, SAS1_wl1..SASn_wl1), ...]
-    - Global (No): [w, t0, tau_1..n, (SAS1_wl1..SASn_wl1), (SAS1_wl2...)...]
-    """
-    F = np.zeros((len(t), numWL))
-    
-    # --- MODO CHIRP CORRECTION (t0 varía por WL) ---
-    if t0_choice_str == 'Yes': 
-        w = x[0]
-        taus = x[1:1+numExp]
-        base_idx = 1 + numExp
-        
-        for j in range(numWL):
-            idx = base_idx + j*(numExp+1)
-            t0 = x[idx]
-            # Aquí 'Amps' son los coeficientes espectrales de las especies para esta WL
-            sas_coeffs = x[idx+1 : idx+1+numExp] 
-            
-            # 1. Calcular las poblaciones para este t0 específico
-            # Devuelve una lista [PopA, PopB, PopC...]
-            pops_list = get_sequential_populations(t, t0, w, taus)
-            
-            # 2. Combinación lineal: Suma(Poblacion_i * Espectro_i)
-            kinetics = np.zeros_like(t)
-            for n in range(numExp):
-                kinetics += sas_coeffs[n] * pops_list[n]
-            
-            F[:, j] = kinetics
-
-    # --- MODO GLOBAL STANDARD (t0 fijo)
-    else: 
-        w = x[0]
-        t0 = x[1]
-        taus = x[2:2+numExp]
-        A_base = 2 + numExp
-        
-        # 1. Calcular la base cinética (Poblaciones) UNA SOLA VEZ
-        # get_sequential_populations devuelve lista de arrays 1D.
-        pops_list = get_sequential_populations(t, t0, w, taus)
-        basis_functions = np.column_stack(pops_list) 
-        
-        # 2. Extraer todos los espectros (SAS) en una matriz (NumSpecies x NumWL)
-        # x contiene [S1_wl1, S2_wl1, ..., S1_wl2, S2_wl2...]
-        all_SAS = x[A_base:].reshape(numWL, numExp).T 
-        
-        # 3. Multiplicación matricial:
-        # [T, Species] @ [Species, WL] -> [T, WL]
-        F = basis_functions @ all_SAS
-        
-    return F
-
-
+# -*- coding: utf-8 -*-
+import numpy as np
+import os
+from scipy import special as _special
+from core_analysis import load_results, RESULTS_MANIFEST, resolve_workers
+
+def load_npy(parent=None, normalize_per_wl=True):
+    """
+    Carga los datos tratados (carpeta *_treated_data o .npy antiguo) y devuelve
+    matrices limpias. Con el formato nuevo data_c queda mapeado en memoria.
+    """
+    # Import local: los procesos de run_fit_jobs importan este módulo y no necesitan Qt
+    from PyQt5.QtWidgets import QFileDialog
+
+    file_path, _ = QFileDialog.getOpenFileName(
+        parent, "Select treated data file", "",
+        "Treated data (manifest.json *.npy);;NumPy files (*.npy)")
+    if not file_path:
+        raise ValueError("No file selected")
+    
+    data = load_results(file_path, mmap_mode='r')
+    data_c = data['data_c']
+    if data_c.dtype != np.float64:
+        data_c = data_c.astype(float)
+    
+    WL = np.asarray(data['WL']).flatten()
+    TD = np.asarray(data['TD']).flatten()
+    base_dir = os.path.dirname(file_path)
+    if os.path.basename(file_path) == RESULTS_MANIFEST:
+        base_dir = os.path.dirname(base_dir)
+    
+    return data_c, TD, WL, base_dir
+
+def crop_spectrum(data_c, WL, WLmin, WLmax):
+    mask = (WL >= WLmin) & (WL <= WLmax)
+    return data_c[:, mask], WL[mask] 
+
+def crop_kinetics(data_c, TD, TDmin, TDmax):
+    mask = (TD >= TDmin) & (TD <= TDmax)
+    return data_c[:, mask], TD[mask] 
+
+def binning(data_c, WL, bin_size):
+    numWL = len(WL) // bin_size
+    datacAVG = np.zeros((numWL, data_c.shape[1]))
+    WLAVG = np.zeros(numWL)
+    for i in range(numWL):
+        datacAVG[i, :] = np.mean(data_c[i*bin_size:(i+1)*bin_size, :], axis=0)
+        WLAVG[i] = np.mean(WL[i*bin_size:(i+1)*bin_size])
+    return datacAVG, WLAVG
+
+def convolved_exp(t, t0, tau, w):
+    """
+    Analytical expression for convolution of single-exponential decay
+    with Gaussian IRF.
+    E = 0.5·exp(arg1)·erfc(arg2), evaluada con la erfc escalada
+    erfcx(x) = exp(x²)·erfc(x) para que no haya overflow ni inf·0:
+    - arg2 >= 0: E = 0.5·G·erfcx(arg2)
+    - arg2 < 0:  E = exp(arg1) - 0.5·G·erfcx(-arg2)   (aquí arg1 < 0)
+    con G = exp(arg1 - arg2²) = exp(-(t-t0)²/(2w²)).
+    """
+    t = np.asarray(t)
+    tau = np.maximum(tau, 1e-12) # Evitar división por cero
+    w = np.maximum(w, 1e-12)
+    
+    s = t - t0
+    arg1 = (w**2 - 2 * tau * s) / (2 * tau**2)
+    arg2 = (w**2 - tau * s) / (np.sqrt(2) * w * tau)
+    half_g = 0.5 * np.exp(-s**2 / (2 * w**2)) * _special.erfcx(np.abs(arg2))
+    return np.where(arg2 >= 0, half_g, np.exp(np.minimum(arg1, 0)) - half_g)
+
+def convolved_exp_grad(t, t0, tau, w):
+    """
+    convolved_exp y sus derivadas analíticas respecto a t0, tau y w.
+    Con E = 0.5·exp(arg1)·erfc(arg2) y G = exp(-(t-t0)²/(2w²)) = exp(arg1 - arg2²):
+        dE/dx = E·d(arg1)/dx - G/√π·d(arg2)/dx
+    Devuelve (E, dE_dt0, dE_dtau, dE_dw).
+    """
+    t = np.asarray(t)
+    tau = np.maximum(tau, 1e-12)
+    w = np.maximum(w, 1e-12)
+    s = t - t0
+    E = convolved_exp(t, t0, tau, w)
+    G = np.exp(-s**2 / (2 * w**2)) / np.sqrt(np.pi)
+    
+    dE_dt0 = E / tau - G / (np.sqrt(2) * w)
+    dE_dtau = E * (s / tau**2 - w**2 / tau**3) + G * w / (np.sqrt(2) * tau**2)
+    dE_dw = E * (w / tau**2) - G * (1 / tau + s / w**2) / np.sqrt(2)
+    return E, dE_dt0, dE_dtau, dE_dw
+
+# Memoria máxima de los temporales (T x WL x numExp) al evaluar en modo chirp
+CHIRP_CHUNK_BYTES = 32 * 1024**2
+
+
+def _convolved_exp_chirp(t, t0s, tau, w):
+    """
+    convolved_exp para un t0 por WL: devuelve (numWL, T) con E[j] = convolved_exp(t, t0s[j], tau, w).
+    Con t ordenado sólo se evalúa la fórmula completa en la banda de la IRF de cada WL:
+    - antes de t0 - 8.5w el valor es < exp(-36) y se deja a 0
+    - después de t0 + sqrt(2)·w·(6 + w/(sqrt(2)·tau)) erfc(arg2) = 2 en doble
+      precisión y E = exp(arg1) es separable: exp(-(t - t_ref)/tau)·exp(...t0_j...),
+      un producto exterior en lugar de una erf por punto
+    """
+    t = np.asarray(t, dtype=float)
+    t0s = np.asarray(t0s, dtype=float)
+    tau = max(float(tau), 1e-12)
+    w = max(float(w), 1e-12)
+    thr_right = np.sqrt(2) * w * (6 + w / (np.sqrt(2) * tau))
+    thr_left = 8.5 * w
+    if t0s.size == 0 or np.any(np.diff(t) < 0) or (t0s.max() - t0s.min()) / tau > 600:
+        return convolved_exp(t[None, :], t0s[:, None], tau, w)
+    
+    lo = np.searchsorted(t, t0s - thr_left)
+    hi = np.maximum(np.searchsorted(t, t0s + thr_right), lo)
+    
+    # Cola separable
+    t_ref = t0s.min() + thr_right
+    E = np.outer(np.exp(w**2 / (2 * tau**2) - (t_ref - t0s) / tau),
+                 np.exp(-np.maximum(t - t_ref, 0) / tau))
+    # Antes de la IRF
+    E[np.arange(t.size)[None, :] < lo[:, None]] = 0.0
+    # Banda de la IRF: fórmula completa
+    counts = hi - lo
+    rows = np.repeat(np.arange(t0s.size), counts)
+    cols = lo[rows] + np.arange(rows.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    E[rows, cols] = convolved_exp(t[cols], t0s[rows], tau, w)
+    return E
+
+
+def _chirp_kinetic_basis(t, t0s, w, taus, model):
+    """Como kinetic_basis con un t0 por WL ((numWL, T, numExp)), usando _convolved_exp_chirp."""
+    if model == "Parallel":
+        return np.stack([_convolved_exp_chirp(t, t0s, tau, w) for tau in taus], axis=-1)
+    C, tau_e = kinetic_coefficients(taus, model)
+    return np.stack([_convolved_exp_chirp(t, t0s, tau, w) for tau in tau_e], axis=-1) @ C.T
+
+
+def _eval_chirp_model(x, t, numExp, numWL, model):
+    """
+    Modelo en modo chirp (un t0 por WL) evaluado de una vez sobre la rejilla
+    (WL x T x numExp), por bloques de WL para acotar la memoria.
+    Estructura de x: [w, tau_1..tau_n, (t0_wl1, A1_wl1..An_wl1), (t0_wl2...)...]
+    """
+    t = np.asarray(t, dtype=float)
+    w = x[0]
+    taus = x[1:1 + numExp]
+    t0s = np.asarray(x[1 + numExp::numExp + 1][:numWL], dtype=float)
+    amps = np.asarray(x)[amplitude_indices(numExp, numWL, 'Yes')]
+    
+    F = np.empty((t.size, numWL))
+    # convolved_exp crea ~4 temporales del tamaño de la rejilla por exponencial
+    step = max(1, CHIRP_CHUNK_BYTES // (8 * 4 * t.size * max(numExp, 1)))
+    for a in range(0, numWL, step):
+        b = min(a + step, numWL)
+        basis = _chirp_kinetic_basis(t, t0s[a:b], w, taus, model)
+        F[:, a:b] = np.einsum('jtn,jn->tj', basis, amps[a:b])
+    return F
+
+def eval_global_model(x, t, numExp, numWL, t0_choice_str):
+    """
+    Calcula la matriz del modelo.
+    Estructura de x:
+    - Si t0 variable (Chirp): [w, tau_1..tau_n,  (t0_wl1, A1_wl1..An_wl1), (t0_wl2...)...]
+    - Si t0 fijo (Global):    [w, t0, tau_1..tau_n, (A1_wl1..An_wl1), (A1_wl2...)...]
+    """
+    if t0_choice_str == 'Yes': # CHIRP CORRECTION MODE (t0 varía por WL)
+        return _eval_chirp_model(x, t, numExp, numWL, "Parallel")
+
+    else: # STANDARD GLOBAL FIT (t0 único global) 
+        w = x[0]
+        t0 = x[1]
+        taus = x[2:2+numExp]
+        A_base = 2 + numExp
+        
+        # 1. Pre-calcular las bases cinéticas (Time x NumExp)
+        # Esto se hace una sola vez para todas las WLs
+        basis_functions = np.zeros((len(t), numExp))
+        for n in range(numExp):
+            basis_functions[:, n] = convolved_exp(t, t0, taus[n], w)
+            
+        # 2. Extraer todas las amplitudes en una matriz (NumExp x NumWL)
+        # x tiene [A1_wl1, A2_wl1, ..., A1_wl2, A2_wl2...]
+        all_Amps = x[A_base:].reshape(numWL, numExp).T 
+        
+        # 3. Multiplicación matricial: [T, Exp] @ [Exp, WL] -> [T, WL]
+        F = basis_functions @ all_Amps
+        
+    return F
+
+# =============================================================================
+#  ESQUEMAS CINÉTICOS (MATRIZ DE TASAS K)
+# =============================================================================
+#
+# Cada esquema convierte los taus del ajuste en una matriz de tasas K y un vector
+# de poblaciones iniciales c0, con dc/dt = K·c. Diagonalizando K = V·diag(λ)·V⁻¹
+# las poblaciones convolucionadas con la IRF son combinaciones lineales de
+# convolved_exp con tau = -1/λ:
+#     c(t) = sum_m C[:, m]·E(t; -1/λ_m),   C = V·diag(V⁻¹·c0)
+
+# Tasas con separación relativa menor que esto se tratan como degeneradas
+DEGENERATE_RATE_TOL = 1e-4
+
+
+def build_rate_matrix(n, transfers):
+    """
+    Matriz de tasas (n x n) a partir de las transferencias {(origen, destino): k}.
+    destino = None significa relajación al estado fundamental. Sirve para
+    esquemas secuenciales, ramificados o reversibles.
+    """
+    K = np.zeros((n, n))
+    for (i, j), k in transfers.items():
+        K[i, i] -= k
+        if j is not None:
+            K[j, i] += k
+    return K
+
+
+def parallel_scheme(taus):
+    """Especies independientes, cada una decae con su tau (DAS)."""
+    k = 1.0 / np.asarray(taus, dtype=float)
+    return build_rate_matrix(k.size, {(i, None): k[i] for i in range(k.size)}), np.ones(k.size)
+
+
+def sequential_scheme(taus):
+    """A -> B -> C -> ... -> fundamental; la especie i decae con tau_i (SAS/EADS)."""
+    k = 1.0 / np.asarray(taus, dtype=float)
+    n = k.size
+    K = build_rate_matrix(n, {(i, i + 1 if i + 1 < n else None): k[i] for i in range(n)})
+    c0 = np.zeros(n)
+    c0[0] = 1.0
+    return K, c0
+
+
+# Esquemas disponibles en el ajuste global: nombre -> función taus -> (K, c0)
+KINETIC_MODELS = {
+    "Parallel": parallel_scheme,
+    "Sequential": sequential_scheme,
+}
+
+
+def register_kinetic_model(name, scheme):
+    """Añade un esquema cinético (función taus -> (K, c0)) al ajuste global."""
+    KINETIC_MODELS[name] = scheme
+
+
+def _degenerate_offsets(K):
+    """
+    Desplazamientos de la diagonal de K que separan las tasas (casi) degeneradas
+    en esquemas sin retorno (K triangular, autovalores = diagonal). Con tasas
+    iguales V es singular; se separan en un grupo de m tasas con paso
+    h = max(eps^(1/(m+1)), 2·hueco) y, como las poblaciones son analíticas en K,
+    promediar los desplazamientos +d y -d deja un error O(h²).
+    Devuelve un vector de ceros si no hay degeneración (o K no es triangular).
+    """
+    d = -np.diag(K)
+    offsets = np.zeros(d.size)
+    if not (np.allclose(np.tril(K, -1), 0) or np.allclose(np.triu(K, 1), 0)):
+        return offsets
+    order = np.argsort(d)
+    start = 0
+    for end in range(1, d.size + 1):
+        if end < d.size and d[order[end]] - d[order[end - 1]] <= DEGENERATE_RATE_TOL * abs(d[order[end]]):
+            continue
+        group = order[start:end]
+        if group.size > 1:
+            mean = abs(d[group].mean())
+            gap = np.max(np.diff(d[group])) / mean
+            h = max(np.finfo(float).eps ** (1.0 / (group.size + 1)), 2 * gap)
+            offsets[group] = mean * h * (np.arange(group.size) - (group.size - 1) / 2)
+        start = end
+    return offsets
+
+
+def _eigen_terms(K, c0):
+    lam, V = np.linalg.eig(K)
+    if np.any(np.abs(lam.imag) > 1e-9 * np.maximum(np.abs(lam.real), 1.0)):
+        raise ValueError("El esquema cinético tiene autovalores complejos.")
+    lam, V = lam.real, V.real
+    if np.linalg.cond(V) > 1e13:
+        raise ValueError("El esquema cinético no es diagonalizable (tasas degeneradas).")
+    order = np.argsort(lam)
+    lam, V = lam[order], V[:, order]
+    b = np.linalg.solve(V, np.asarray(c0, dtype=float))
+    return V * b[None, :], 1.0 / np.maximum(-lam, 1e-300)
+
+
+def kinetic_decomposition(K, c0, offsets=None):
+    """
+    Diagonaliza K y devuelve (C, tau_eig): poblaciones = E(tau_eig) @ C.T, con
+    E(tau) = convolved_exp. Los autovalores nulos dan tau = inf efectivo (1e300).
+    Con tasas degeneradas (ver _degenerate_offsets) se promedian las
+    descomposiciones de K - diag(d) y K + diag(d), así que hay 2n términos.
+    """
+    K = np.asarray(K, dtype=float)
+    offsets = _degenerate_offsets(K) if offsets is None else offsets
+    if not np.any(offsets):
+        return _eigen_terms(K, c0)
+    C_p, tau_p = _eigen_terms(K - np.diag(offsets), c0)
+    C_m, tau_m = _eigen_terms(K + np.diag(offsets), c0)
+    return 0.5 * np.concatenate([C_p, C_m], axis=1), np.concatenate([tau_p, tau_m])
+
+
+def kinetic_coefficients(taus, model, offsets=None):
+    """(C, tau_eig) del esquema `model` de KINETIC_MODELS para estos taus."""
+    return kinetic_decomposition(*KINETIC_MODELS[model](taus), offsets=offsets)
+
+
+def _eigen_terms_grad(K, c0, dKs):
+    """
+    _eigen_terms y sus derivadas analíticas para las perturbaciones dK de dKs
+    (perturbación de autovalores y autovectores: con W = V⁻¹ y M = W·dK·V,
+    dλ = diag(M) y dV = V·G, G_ij = M_ij / (λ_j - λ_i)). Las derivadas de C no
+    pasan por diferencias finitas, que con tasas casi degeneradas (C ~ 1/h)
+    perderían toda la precisión.
+    """
+    C, tau_e = _eigen_terms(K, c0)
+    lam, V = np.linalg.eig(K)
+    lam, V = lam.real, V.real
+    order = np.argsort(lam)
+    lam, V = lam[order], V[:, order]
+    W = np.linalg.inv(V)
+    b = W @ np.asarray(c0, dtype=float)
+    diff = lam[None, :] - lam[:, None]
+    np.fill_diagonal(diff, 1.0)
+    dC = np.zeros(C.shape + (len(dKs),))
+    dtau_e = np.zeros((lam.size, len(dKs)))
+    for q, dK in enumerate(dKs):
+        M = W @ dK @ V
+        G = M / diff
+        np.fill_diagonal(G, 0.0)
+        dV = V @ G
+        db = -W @ dV @ b
+        dC[..., q] = dV * b[None, :] + V * db[None, :]
+        dtau_e[:, q] = np.diag(M) / np.maximum(lam**2, 1e-300)
+    return C, tau_e, dC, dtau_e
+
+
+def _kinetic_coefficients_grad(taus, model):
+    """
+    (C, tau_eig) y sus derivadas respecto a los taus del ajuste:
+    dC (n_sp, n_términos, n_taus) y dtau_eig (n_términos, n_taus).
+    dK/dtau sale de diferencias centradas de la matriz de tasas (sin cancelación);
+    el resto es analítico (_eigen_terms_grad), también con tasas degeneradas.
+    """
+    taus = np.asarray(taus, dtype=float)
+    scheme = KINETIC_MODELS[model]
+    K, c0 = scheme(taus)
+    dKs = []
+    for q in range(taus.size):
+        h = np.cbrt(np.finfo(float).eps) * abs(taus[q])
+        tp, tm = taus.copy(), taus.copy()
+        tp[q] += h
+        tm[q] -= h
+        dKs.append((scheme(tp)[0] - scheme(tm)[0]) / (2 * h))
+    offsets = _degenerate_offsets(K)
+    if not np.any(offsets):
+        return _eigen_terms_grad(K, c0, dKs)
+    parts = [_eigen_terms_grad(K - np.diag(offsets), c0, dKs),
+             _eigen_terms_grad(K + np.diag(offsets), c0, dKs)]
+    C, tau_e, dC, dtau_e = (np.concatenate([p[i] for p in parts], axis=1 if i in (0, 2) else 0)
+                            for i in range(4))
+    return 0.5 * C, tau_e, 0.5 * dC, dtau_e
+
+
+def kinetic_populations(t, t0, w, K, c0):
+    """
+    Poblaciones convolucionadas con la IRF para una matriz de tasas K, apiladas
+    en el último eje: (..., T, n_especies). t y t0 se combinan por broadcasting
+    como en convolved_exp.
+    """
+    C, tau_e = kinetic_decomposition(K, c0)
+    E = convolved_exp(np.asarray(t)[..., None], np.asarray(t0)[..., None], tau_e, w)
+    return E @ C.T
+
+
+def get_sequential_populations(t, t0, w, taus):
+    """ Calculates populations for a sequential model A -> B -> C... """
+    P = kinetic_populations(t, t0, w, *sequential_scheme(taus))
+    return [P[..., i] for i in range(P.shape[-1])]
+
+
+def eval_kinetic_model(x, t, numExp, numWL, t0_choice_str, model="Parallel"):
+    """Matriz del modelo (T, numWL) para cualquier esquema de KINETIC_MODELS."""
+    if model == "Parallel":
+        return eval_global_model(x, t, numExp, numWL, t0_choice_str)
+    if t0_choice_str == 'Yes':
+        return _eval_chirp_model(x, t, numExp, numWL, model)
+    basis = kinetic_basis(np.asarray(t), x[1], x[0], x[2:2 + numExp], model)
+    return basis @ x[2 + numExp:].reshape(numWL, numExp).T
+
+
+def eval_sequential_model(x, t, numExp, numWL, t0_choice_str):
+    """
+    Calcula la matriz del modelo SECUENCIAL (A -> B -> C...).
+    
+    Interpretación de los parámetros 'Amps' en x:
+    En modelo paralelo: Amps = DAS (Decay Associated Spectra)
+    En modelo secuencial: Amps = SAS (Species Associated Spectra) o EADS
+    
+    Estructura de x (idéntica a tu modelo global):
+    - Chirp (Yes): [w, tau_1..n, (t0_wl1, SAS1_wl1..SASn_wl1), ...]
+    - Global (No): [w, t0, tau_1..n, (SAS1_wl1..SASn_wl1), (SAS1_wl2...)...]
+    """
+    # --- MODO CHIRP CORRECTION (t0 varía por WL) ---
+    if t0_choice_str == 'Yes': 
+        return _eval_chirp_model(x, t, numExp, numWL, "Sequential")
+
+    # --- MODO GLOBAL STANDARD (t0 fijo)
+    else: 
+        w = x[0]
+        t0 = x[1]
+        taus = x[2:2+numExp]
+        A_base = 2 + numExp
+        
+        # 1. Calcular la base cinética (Poblaciones) UNA SOLA VEZ
+        # get_sequential_populations devuelve lista de arrays 1D.
+        pops_list = get_sequential_populations(t, t0, w, taus)
+        basis_functions = np.column_stack(pops_list) 
+        
+        # 2. Extraer todos los espectros (SAS) en una matriz (NumSpecies x NumWL)
+        # x contiene [S1_wl1, S2_wl1, ..., S1_wl2, S2_wl2...]
+        all_SAS = x[A_base:].reshape(numWL, numExp).T 
+        
+        # 3. Multiplicación matricial:
+        # [T, Species] @ [Species, WL] -> [T, WL]
+        F = basis_functions @ all_SAS
+        
+    return F
+
+
+
+
+# =============================================================================
+#  AJUSTE GLOBAL POR PROYECCIÓN DE VARIABLES (VARPRO)
+# =============================================================================
+
+def kinetic_basis(t, t0, w, taus, model="Parallel"):
+    """
+    Funciones cinéticas del modelo, apiladas en el último eje.
+    - Parallel: exponenciales convolucionadas (DAS)
+    - Sequential u otro esquema de KINETIC_MODELS: poblaciones (SAS)
+    Con t de forma (T,) y t0 escalar devuelve (T, numExp); con t = t[None, :] y
+    t0[:, None] (un t0 por WL) devuelve (numWL, T, numExp).
+    """
+    if model == "Parallel":
+        return np.stack([convolved_exp(t, t0, tau, w) for tau in taus], axis=-1)
+    C, tau_e = kinetic_coefficients(taus, model)
+    return np.stack([convolved_exp(t, t0, tau, w) for tau in tau_e], axis=-1) @ C.T
+
+
+def kinetic_basis_grad(t, t0, w, taus, model="Parallel"):
+    """
+    Base cinética y sus derivadas analíticas (a partir de convolved_exp_grad).
+    Devuelve (B, dB_dw, dB_dt0, dB_dtau); las tres primeras con la forma de
+    kinetic_basis y dB_dtau con un eje más al final: dB_dtau[..., m] = dB/dtau_m.
+    En los esquemas con matriz de tasas, B = E(tau_eig) @ C.T y la dependencia de
+    C y tau_eig con los taus se obtiene con _kinetic_coefficients_grad.
+    """
+    n = len(taus)
+    if model == "Parallel":
+        C, tau_e, dC, dtau_e = np.eye(n), np.asarray(taus, dtype=float), np.zeros((n, n, n)), np.eye(n)
+    else:
+        C, tau_e, dC, dtau_e = _kinetic_coefficients_grad(taus, model)
+    grads = [convolved_exp_grad(t, t0, tau, w) for tau in tau_e]
+    E, dE_dt0, dE_dtau, dE_dw = (np.stack([g[i] for g in grads], axis=-1) for i in range(4))
+    dB_dtau = (np.einsum('...m,imq->...iq', E, dC)
+               + np.einsum('...m,im,mq->...iq', dE_dtau, C, dtau_e))
+    return E @ C.T, dE_dw @ C.T, dE_dt0 @ C.T, dB_dtau
+
+
+def nonlinear_indices(numExp, numWL, t0_choice_str):
+    """Posiciones en x de los parámetros no lineales: [w, t0, taus] o [w, taus, t0_wl1..t0_wlN]."""
+    if t0_choice_str == 'Yes':
+        base_idx = 1 + numExp
+        return np.concatenate([np.arange(1 + numExp), base_idx + np.arange(numWL) * (numExp + 1)])
+    return np.arange(2 + numExp)
+
+
+def amplitude_indices(numExp, numWL, t0_choice_str):
+    """Posiciones en x de las amplitudes, como matriz (numWL, numExp)."""
+    if t0_choice_str == 'Yes':
+        base_idx = 1 + numExp
+        return base_idx + np.arange(numWL)[:, None] * (numExp + 1) + 1 + np.arange(numExp)[None, :]
+    return 2 + numExp + np.arange(numWL * numExp).reshape(numWL, numExp)
+
+
+def _basis_from_x(x, t, numExp, numWL, t0_choice_str, model):
+    """Base cinética para el vector completo x: (T, numExp) o (numWL, T, numExp) en modo chirp."""
+    if t0_choice_str == 'Yes':
+        t0s = x[1 + numExp::numExp + 1][:numWL]
+        return _chirp_kinetic_basis(t, t0s, x[0], x[1:1 + numExp], model)
+    return kinetic_basis(np.asarray(t), x[1], x[0], x[2:2 + numExp], model)
+
+
+def _basis_grad_from_x(x, t, numExp, numWL, t0_choice_str, model):
+    """Como _basis_from_x, pero devuelve también las derivadas (ver kinetic_basis_grad)."""
+    if t0_choice_str == 'Yes':
+        t0s = x[1 + numExp::numExp + 1][:numWL]
+        return kinetic_basis_grad(np.asarray(t)[None, :], t0s[:, None], x[0], x[1:1 + numExp], model)
+    return kinetic_basis_grad(np.asarray(t), x[1], x[0], x[2:2 + numExp], model)
+
+
+def _solve_amplitudes(basis, data_c):
+    """Amplitudes por mínimos cuadrados lineales: data_c (numWL, T) -> (numWL, numExp)."""
+    if basis.ndim == 2:
+        return np.linalg.lstsq(basis, data_c.T, rcond=None)[0].T
+    return (np.linalg.pinv(basis) @ data_c[:, :, None])[..., 0]
+
+
+def _model_from_basis(basis, amps):
+    """Matriz del modelo (T, numWL) a partir de la base y las amplitudes (numWL, numExp)."""
+    if basis.ndim == 2:
+        return basis @ amps.T
+    return np.einsum('jtn,jn->tj', basis, amps)
+
+
+def _nonlinear_model_derivatives(x, t, numExp, numWL, t0_choice_str, model, amps=None):
+    """
+    Derivadas analíticas de la matriz del modelo F (T, numWL) respecto a los
+    parámetros no lineales, con las amplitudes de x (o `amps`) fijas.
+    Devuelve (basis, amps, globales, locales):
+    - globales: lista [(índice en x, dF (T, numWL))] para w, t0 y taus
+    - locales: (índices de los t0 por WL, dF (T, numWL)) en modo chirp; None si no
+    """
+    basis, dB_dw, dB_dt0, dB_dtau = _basis_grad_from_x(x, t, numExp, numWL, t0_choice_str, model)
+    if amps is None:
+        amps = x[amplitude_indices(numExp, numWL, t0_choice_str)]
+    if t0_choice_str == 'Yes':
+        i_tau = 1
+        globales = [(0, _model_from_basis(dB_dw, amps))]
+        t0_idx = nonlinear_indices(numExp, numWL, t0_choice_str)[1 + numExp:]
+        locales = (t0_idx, _model_from_basis(dB_dt0, amps))
+    else:
+        i_tau = 2
+        globales = [(0, _model_from_basis(dB_dw, amps)), (1, _model_from_basis(dB_dt0, amps))]
+        locales = None
+    globales += [(i_tau + m, _model_from_basis(dB_dtau[..., m], amps)) for m in range(numExp)]
+    return basis, amps, globales, locales
+
+
+def global_fit_jacobian(x, t, numExp, numWL, t0_choice_str, model="Parallel", free=None):
+    """
+    Jacobiano analítico del residuo F.flatten() - data (orden [t, wl]) respecto a x,
+    como matriz dispersa (scipy.sparse.csr_matrix) con sólo las columnas `free`.
+    Cada amplitud (y cada t0 local en modo chirp) sólo afecta a la columna de su WL,
+    así que la matriz ocupa ~T·numWL·(nº parámetros globales + numExp) valores en
+    lugar de T·numWL·len(x). Sirve como `jac=` de least_squares para el ajuste
+    de todos los parámetros y como Jacobiano final de fit_global.
+    """
+    from scipy import sparse
+
+    x = np.asarray(x, dtype=float)
+    t = np.asarray(t, dtype=float)
+    T = t.size
+    amp_idx = amplitude_indices(numExp, numWL, t0_choice_str)
+    basis, amps, globales, locales = _nonlinear_model_derivatives(x, t, numExp, numWL, t0_choice_str, model)
+    rows_wl = (np.arange(T)[:, None] * numWL + np.arange(numWL)[None, :]).ravel()   # fila de F[t, j]
+
+    cols, rows, vals = [], [], []
+    for i, dF in globales:
+        cols.append(np.full(T * numWL, i))
+        rows.append(np.arange(T * numWL))
+        vals.append(dF.ravel())
+
+    if locales is not None:
+        t0_idx, dF = locales
+        cols.append(np.broadcast_to(t0_idx[None, :], (T, numWL)).ravel())
+        rows.append(rows_wl)
+        vals.append(dF.ravel())
+
+    # Amplitudes: dF[t, j] / dA[j, k] = base[t, k] (o base_j[t, k] en modo chirp)
+    for k in range(numExp):
+        b_k = basis[..., k] if basis.ndim == 2 else basis[:, :, k].T      # (T,) o (T, numWL)
+        cols.append(np.broadcast_to(amp_idx[None, :, k], (T, numWL)).ravel())
+        rows.append(rows_wl)
+        vals.append(np.broadcast_to(b_k.reshape(T, -1), (T, numWL)).ravel())
+
+    J = sparse.csc_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                          shape=(T * numWL, x.size))
+    if free is not None:
+        J = J[:, np.flatnonzero(free)]
+    return J.tocsr()
+
+
+def _block_layout(numExp, numWL, t0_choice_str):
+    """Número de parámetros globales al principio de x y tamaño de cada bloque por WL."""
+    if t0_choice_str == 'Yes':
+        return 1 + numExp, numExp + 1
+    return 2 + numExp, numExp
+
+
+def global_jac_sparsity(numExp, numWL, T, t0_choice_str, free=None):
+    """
+    Patrón de ceros del Jacobiano del ajuste completo (orden de residuos [t, wl]),
+    para least_squares(jac_sparsity=...) cuando se usan diferencias finitas.
+    Los parámetros globales (w, t0, taus) afectan a todas las filas; los de cada
+    WL (amplitudes y, con chirp, su t0) sólo a las T filas de esa WL.
+    """
+    from scipy import sparse
+
+    n_global, block = _block_layout(numExp, numWL, t0_choice_str)
+    L = n_global + numWL * block
+    cols = np.arange(L) if free is None else np.flatnonzero(free)
+    is_global = cols < n_global
+    wl_of = (cols[~is_global] - n_global) // block
+    rows = [np.repeat(np.arange(T * numWL)[None, :], is_global.sum(), axis=0).ravel(),
+            (np.arange(T)[None, :] * numWL + wl_of[:, None]).ravel()]
+    cc = [np.repeat(np.flatnonzero(is_global), T * numWL),
+          np.repeat(np.flatnonzero(~is_global), T)]
+    rows, cc = np.concatenate(rows), np.concatenate(cc)
+    return sparse.csr_matrix((np.ones(rows.size, dtype=np.int8), (rows, cc)), shape=(T * numWL, cols.size))
+
+
+def jacobian_memory_report(numExp, numWL, T, t0_choice_str, free=None):
+    """
+    Memoria del Jacobiano del ajuste completo: denso (float64) frente a disperso
+    (CSR: valores float64 + índices int32). Devuelve un dict con nnz, dense_bytes,
+    sparse_bytes y saved_bytes.
+    """
+    n_global, block = _block_layout(numExp, numWL, t0_choice_str)
+    n_free = n_global + numWL * block if free is None else int(np.count_nonzero(free))
+    g_free = n_global if free is None else int(np.count_nonzero(np.asarray(free)[:n_global]))
+    nnz = T * numWL * g_free + T * (n_free - g_free)
+    dense = 8 * T * numWL * n_free
+    sparse_bytes = 12 * nnz + 4 * (T * numWL + 1)
+    return {'nnz': nnz, 'dense_bytes': dense, 'sparse_bytes': sparse_bytes,
+            'saved_bytes': dense - sparse_bytes}
+
+
+def covariance_diagonal(J, numExp, numWL, t0_choice_str, free=None):
+    """
+    Diagonal de (JᵀJ)⁻¹ aprovechando la estructura en flecha de JᵀJ: un bloque
+    denso para los parámetros globales y un bloque pequeño por WL, acoplados sólo
+    con los globales. Con el complemento de Schur S = A - Σ C_j B_j⁻¹ C_jᵀ:
+        diag globales = diag(S⁻¹)
+        diag bloque j = diag(B_j⁻¹ + B_j⁻¹ C_jᵀ S⁻¹ C_j B_j⁻¹)
+    Evita formar e invertir la matriz densa (n_libres x n_libres), que en modo
+    chirp con resolución completa no cabe en memoria.
+    J: Jacobiano (disperso o denso) con sólo las columnas libres, en orden de x.
+    """
+    from scipy import sparse
+
+    n_global, block = _block_layout(numExp, numWL, t0_choice_str)
+    L = n_global + numWL * block
+    cols = np.arange(L) if free is None else np.flatnonzero(free)
+    g = int(np.count_nonzero(cols < n_global))
+    wl_of = (cols[g:] - n_global) // block
+    starts = g + np.searchsorted(wl_of, np.arange(numWL + 1))
+
+    J = sparse.csc_matrix(J)
+    JTJ = (J.T @ J).tocsr()
+    A = JTJ[:g, :g].toarray()
+    out = np.empty(cols.size)
+    S = A.copy()
+    parts = []
+    for j in range(numWL):
+        a, b = starts[j], starts[j + 1]
+        if a == b:
+            continue
+        B_inv = np.linalg.inv(JTJ[a:b, a:b].toarray())
+        C = JTJ[:g, a:b].toarray()
+        M = B_inv @ C.T                      # (b - a, g)
+        S -= C @ M
+        parts.append((a, b, B_inv, M))
+    S_inv = np.linalg.inv(S) if g else np.zeros((0, 0))
+    out[:g] = np.diagonal(S_inv)
+    for a, b, B_inv, M in parts:
+        out[a:b] = np.diagonal(B_inv) + np.einsum('ig,gh,ih->i', M, S_inv, M)
+    return out
+
+
+def _varpro_jacobian(x, t, data_c, numExp, numWL, t0_choice_str, model, nl_free):
+    """
+    Jacobiano del residuo proyectado de VARPRO respecto a los parámetros no lineales
+    libres `nl_free` (aproximación de Kaufman): dr/dθ ≈ P⊥·(dΦ/dθ)·a, donde P⊥
+    proyecta sobre el complemento ortogonal de la base cinética de cada WL.
+    Denso en modo global; disperso (CSR) en modo chirp, donde cada t0 local sólo
+    afecta a su WL.
+    """
+    from scipy import sparse
+
+    T = t.size
+    basis = _basis_from_x(x, t, numExp, numWL, t0_choice_str, model)
+    amps = _solve_amplitudes(basis, data_c)
+    _, _, globales, locales = _nonlinear_model_derivatives(x, t, numExp, numWL, t0_choice_str, model, amps)
+    Q = np.linalg.qr(basis)[0]
+
+    def project(D):
+        if Q.ndim == 2:
+            return D - Q @ (Q.T @ D)
+        return D - np.einsum('jtn,jn->tj', Q, np.einsum('jtn,tj->jn', Q, D))
+
+    col_of = {i: c for c, i in enumerate(nl_free)}
+    if locales is None:
+        J = np.zeros((T * numWL, len(nl_free)))
+        for i, dF in globales:
+            if i in col_of:
+                J[:, col_of[i]] = project(dF).ravel()
+        return J
+
+    cols, rows, vals = [], [], []
+    for i, dF in globales:
+        if i in col_of:
+            cols.append(np.full(T * numWL, col_of[i]))
+            rows.append(np.arange(T * numWL))
+            vals.append(project(dF).ravel())
+    t0_idx, dF = locales
+    dF = project(dF)
+    rows_wl = np.arange(T)[:, None] * numWL + np.arange(numWL)[None, :]
+    sel = np.array([i in col_of for i in t0_idx], dtype=bool)
+    if sel.any():
+        cols.append(np.broadcast_to(np.array([col_of.get(i, -1) for i in t0_idx])[None, sel], (T, sel.sum())).ravel())
+        rows.append(rows_wl[:, sel].ravel())
+        vals.append(dF[:, sel].ravel())
+    return sparse.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                             shape=(T * numWL, len(nl_free)))
+
+
+class _FitStopped(Exception):
+    """Señal interna para detener least_squares desde el residuo."""
+
+
+def _tracked_least_squares(residuals, jac, p0, bounds, callback=None, should_stop=None, max_nfev=None):
+    """
+    least_squares (trf) guardando el mejor punto evaluado.
+    - callback(nfev, coste, mejor coste): se llama tras cada evaluación del residuo
+    - should_stop(): si devuelve True se detiene en la siguiente evaluación del
+      residuo o del Jacobiano y se devuelve el mejor punto encontrado (status -2)
+    Devuelve (p, status, message, success).
+    """
+    from scipy.optimize import least_squares
+
+    best = {'cost': np.inf, 'p': np.array(p0, dtype=float)}
+    nfev = [0]
+
+    def _check():
+        if should_stop is not None and should_stop():
+            raise _FitStopped
+
+    def fun(p):
+        _check()
+        r = residuals(p)
+        nfev[0] += 1
+        cost = 0.5 * float(r @ r)
+        if cost < best['cost']:
+            best['cost'], best['p'] = cost, p.copy()
+        if callback is not None:
+            callback(nfev[0], cost, best['cost'])
+        return r
+
+    def jac_fun(p):
+        _check()
+        return jac(p)
+
+    try:
+        res = least_squares(fun, p0, jac=jac_fun, bounds=bounds, method='trf', max_nfev=max_nfev)
+    except _FitStopped:
+        return best['p'], -2, "Cancelled by user.", False
+    return res.x, res.status, res.message, res.success
+
+
+def _global_fit_result(x_opt, data_c, t, numExp, t0_choice_str, model, fixed, status, message, success, nfev):
+    """OptimizeResult común de fit_global y fit_global_full, con el Jacobiano en x_opt."""
+    from scipy.optimize import OptimizeResult
+
+    numWL = data_c.shape[0]
+    fun = eval_kinetic_model(x_opt, t, numExp, numWL, t0_choice_str, model).ravel() - data_c.T.ravel()
+    jac = global_fit_jacobian(x_opt, t, numExp, numWL, t0_choice_str, model, free=~fixed)
+    return OptimizeResult(x=x_opt, fun=fun, cost=0.5 * float(fun @ fun), jac=jac, nfev=nfev,
+                          status=status, message=message, success=success)
+
+
+def fit_global(data_c, t, numExp, x0, lower, upper, fixed=None, model="Parallel", t0_choice_str='No',
+               callback=None, should_stop=None, max_nfev=None):
+    """
+    Ajuste global por proyección de variables (VARPRO).
+
+    Sólo los parámetros no lineales (w, t0 y taus; en modo chirp w, taus y un t0 por
+    WL) se optimizan con least_squares. En cada evaluación las amplitudes (DAS o SAS)
+    se obtienen con un único ajuste lineal por mínimos cuadrados, así que el
+    problema no lineal tiene 2 + numExp parámetros (1 + numExp + numWL con chirp)
+    en vez de los ~numWL·numExp del ajuste completo. El Jacobiano del problema
+    reducido es analítico (ver _varpro_jacobian).
+
+    - data_c: (numWL, T); t: retardos (T,)
+    - x0, lower, upper, fixed: vectores con el mismo formato que eval_global_model.
+      Las amplitudes de x0 se ignoran (se recalculan) y no pueden fijarse ni acotarse.
+    - callback(nfev, coste, mejor coste): se llama en cada evaluación del residuo
+    - should_stop(): si devuelve True el ajuste se detiene y devuelve el mejor
+      punto evaluado hasta entonces (status -2)
+
+    Devuelve un OptimizeResult con x (vector completo, mismo formato que x0), fun,
+    cost, nfev, status, message y jac (Jacobiano completo en la solución, disperso,
+    sólo columnas libres: ver global_fit_jacobian).
+    """
+    data_c = np.asarray(data_c, dtype=float)
+    t = np.asarray(t, dtype=float)
+    numWL = data_c.shape[0]
+    x0 = np.asarray(x0, dtype=float)
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    fixed = np.zeros(x0.size, dtype=bool) if fixed is None else np.asarray(fixed, dtype=bool)
+    amp_idx = amplitude_indices(numExp, numWL, t0_choice_str)
+    if fixed[amp_idx].any():
+        raise ValueError("VARPRO no admite amplitudes fijas.")
+
+    nl_idx = nonlinear_indices(numExp, numWL, t0_choice_str)
+    nl_free = nl_idx[~fixed[nl_idx]]
+    data_flat = data_c.T.ravel()
+    x_work = x0.copy()
+    nfev = [0]
+
+    def _project(p_free):
+        x_work[nl_free] = p_free
+        basis = _basis_from_x(x_work, t, numExp, numWL, t0_choice_str, model)
+        return basis, _solve_amplitudes(basis, data_c)
+
+    def residuals(p_free):
+        nfev[0] += 1
+        basis, amps = _project(p_free)
+        return _model_from_basis(basis, amps).ravel() - data_flat
+
+    def jac(p_free):
+        x_work[nl_free] = p_free
+        return _varpro_jacobian(x_work, t, data_c, numExp, numWL, t0_choice_str, model, nl_free)
+
+    if nl_free.size:
+        p_opt, status, message, success = _tracked_least_squares(
+            residuals, jac, x0[nl_free], (lower[nl_free], upper[nl_free]),
+            callback=callback, should_stop=should_stop, max_nfev=max_nfev)
+    else:
+        p_opt, status, message, success = np.empty(0), 1, "No free nonlinear parameters.", True
+
+    _, amps = _project(p_opt)
+    x_opt = x_work.copy()
+    x_opt[amp_idx] = amps
+    return _global_fit_result(x_opt, data_c, t, numExp, t0_choice_str, model, fixed,
+                              status, message, success, nfev[0])
+
+
+def fit_global_full(data_c, t, numExp, x0, lower, upper, fixed=None, model="Parallel", t0_choice_str='No',
+                    callback=None, should_stop=None, max_nfev=None):
+    """
+    Ajuste global de todos los parámetros libres (amplitudes incluidas) con el
+    Jacobiano analítico disperso. Es el camino que se usa cuando hay amplitudes
+    fijas o acotadas y VARPRO no aplica. Mismos argumentos y resultado que fit_global.
+    """
+    data_c = np.asarray(data_c, dtype=float)
+    t = np.asarray(t, dtype=float)
+    numWL = data_c.shape[0]
+    x0 = np.asarray(x0, dtype=float)
+    fixed = np.zeros(x0.size, dtype=bool) if fixed is None else np.asarray(fixed, dtype=bool)
+    free = np.flatnonzero(~fixed)
+    data_flat = data_c.T.ravel()
+    nfev = [0]
+
+    def _full(p_free):
+        x_full = x0.copy()
+        x_full[free] = p_free
+        return x_full
+
+    def residuals(p_free):
+        nfev[0] += 1
+        return eval_kinetic_model(_full(p_free), t, numExp, numWL, t0_choice_str, model).ravel() - data_flat
+
+    def jac(p_free):
+        return global_fit_jacobian(_full(p_free), t, numExp, numWL, t0_choice_str, model, free=~fixed)
+
+    p_opt, status, message, success = _tracked_least_squares(
+        residuals, jac, x0[free], (np.asarray(lower, dtype=float)[free], np.asarray(upper, dtype=float)[free]),
+        callback=callback, should_stop=should_stop, max_nfev=max_nfev)
+    return _global_fit_result(_full(p_opt), data_c, t, numExp, t0_choice_str, model, fixed,
+                              status, message, success, nfev[0])
+
+
+def tau_indices(numExp, t0_choice_str):
+    """Posiciones en x de las taus."""
+    start = 1 if t0_choice_str == 'Yes' else 2
+    return np.arange(start, start + numExp)
+
+
+def multistart_seeds(x0, lower, upper, numExp, t0_choice_str, n_starts, fixed=None, mode="log-uniform",
+                     spread=1.0, seed=None):
+    """
+    Vectores iniciales del ajuste multi-arranque, (n_starts, len(x0)).
+    La fila 0 es x0; en las demás sólo cambian las taus libres:
+    - "log-uniform": log10(tau) uniforme entre log10(min tau0) - spread y log10(max tau0) + spread
+    - "perturbed": tau0 · 10^(spread·N(0, 1)/2)
+    Las taus de cada semilla se ordenan de menor a mayor y se recortan a sus límites.
+    """
+    x0 = np.asarray(x0, dtype=float)
+    seeds = np.repeat(x0[None, :], max(int(n_starts), 1), axis=0)
+    tau_idx = tau_indices(numExp, t0_choice_str)
+    if fixed is not None:
+        tau_idx = tau_idx[~np.asarray(fixed, dtype=bool)[tau_idx]]
+    if tau_idx.size == 0 or seeds.shape[0] < 2:
+        return seeds
+
+    rng = np.random.default_rng(seed)
+    tau0 = np.abs(x0[tau_idx])
+    shape = (seeds.shape[0] - 1, tau_idx.size)
+    if mode == "log-uniform":
+        lo, hi = np.log10(tau0.min()) - spread, np.log10(tau0.max()) + spread
+        taus = 10.0 ** rng.uniform(lo, hi, size=shape)
+    elif mode == "perturbed":
+        taus = tau0 * 10.0 ** (0.5 * spread * rng.standard_normal(shape))
+    else:
+        raise ValueError(f"Modo de semillas desconocido: {mode}")
+    seeds[1:, tau_idx] = np.clip(np.sort(taus, axis=1),
+                                 np.asarray(lower, dtype=float)[tau_idx], np.asarray(upper, dtype=float)[tau_idx])
+    return seeds
+
+
+def distinct_minima(xs, costs, numExp, t0_choice_str, tau_rtol=1e-2, cost_rtol=1e-4):
+    """
+    Agrupa los resultados de varios arranques en mínimos distintos: dos ajustes
+    son el mismo mínimo si sus taus ordenadas coinciden dentro de tau_rtol y sus
+    costes dentro de cost_rtol. Los arranques con coste no finito se descartan.
+    Devuelve una lista de dicts {'cost', 'taus', 'count', 'starts'} ordenada por
+    coste (el primero es el mejor).
+    """
+    tau_idx = tau_indices(numExp, t0_choice_str)
+    minima = []
+    for i in np.argsort(costs):
+        cost = float(costs[i])
+        if not np.isfinite(cost):
+            continue
+        taus = np.sort(np.asarray(xs[i])[tau_idx])
+        for m in minima:
+            if (abs(cost - m['cost']) <= cost_rtol * max(abs(m['cost']), 1e-300)
+                    and np.all(np.abs(taus - m['taus']) <= tau_rtol * np.abs(m['taus']))):
+                m['count'] += 1
+                m['starts'].append(int(i))
+                break
+        else:
+            minima.append({'cost': cost, 'taus': taus, 'count': 1, 'starts': [int(i)]})
+    return minima
+
+
+# Estado de cada proceso del pool de ajustes (ver _shared_pool_init)
+_SHARED_POOL = {}
+SHARED_POOL_POLL = 0.1
+
+
+def _shared_pool_init(shm_name, shape, stop, counter, models):
+    """Inicializador de los procesos: se conecta a la memoria compartida con los datos."""
+    from multiprocessing import shared_memory
+    KINETIC_MODELS.update(models)
+    _SHARED_POOL.update(shm=shared_memory.SharedMemory(name=shm_name), shape=shape, stop=stop, counter=counter)
+
+
+def _shared_pool_job(fn, kwargs):
+    """Una tarea dentro de un proceso del pool: fn(data_c, callback=, should_stop=, **kwargs)."""
+    state = _SHARED_POOL
+    counter = state['counter']
+
+    def callback(nfev, cost, best_cost):
+        with counter.get_lock():
+            counter[0] += 1
+            counter[1] = min(counter[1], cost)
+
+    # Vista sin copia sobre la memoria compartida; se libera antes de volver
+    data_c = np.ndarray(state['shape'], dtype=float, buffer=state['shm'].buf)
+    try:
+        return fn(data_c, callback=callback, should_stop=state['stop'].is_set, **kwargs)
+    finally:
+        del data_c
+
+
+def _run_shared_pool(data_c, jobs, n_workers, callback, should_stop):
+    """Reparte jobs en un pool de procesos que leen data_c de memoria compartida (ver run_fit_jobs)."""
+    import multiprocessing as mp
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    from multiprocessing import shared_memory
+
+    # spawn: el ajuste suele lanzarse desde un hilo de la interfaz y fork no es seguro ahí
+    ctx = mp.get_context("spawn")
+    stop = ctx.Event()
+    counter = ctx.Array('d', [0.0, np.inf])
+    results = [None] * len(jobs)
+    shm = shared_memory.SharedMemory(create=True, size=max(data_c.nbytes, 1))
+    try:
+        np.ndarray(data_c.shape, dtype=float, buffer=shm.buf)[...] = data_c
+        with ProcessPoolExecutor(n_workers, mp_context=ctx, initializer=_shared_pool_init,
+                                 initargs=(shm.name, data_c.shape, stop, counter, dict(KINETIC_MODELS))) as pool:
+            futures = {pool.submit(_shared_pool_job, fn, kwargs): i for i, (fn, kwargs) in enumerate(jobs)}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=SHARED_POOL_POLL, return_when=FIRST_COMPLETED)
+                for f in done:
+                    if not f.cancelled():
+                        results[futures[f]] = f.exception() or f.result()
+                if should_stop is not None and should_stop() and not stop.is_set():
+                    stop.set()
+                    for f in pending:
+                        f.cancel()
+                if callback is not None:
+                    with counter.get_lock():
+                        nfev, best_cost = int(counter[0]), counter[1]
+                    callback(nfev, best_cost, best_cost)
+    finally:
+        shm.close()
+        shm.unlink()
+    return results
+
+
+def run_fit_jobs(data_c, jobs, workers=None, callback=None, should_stop=None):
+    """
+    Ejecuta tareas de ajuste independientes sobre la misma matriz de datos.
+    - jobs: lista de (fn, kwargs); cada tarea llama fn(data_c, callback=, should_stop=, **kwargs).
+      fn debe ser una función de módulo (se envía por nombre a los procesos).
+    - workers: None/1 = en serie en este proceso; > 1 (0 = todos los núcleos) = pool
+      de procesos (spawn) con data_c en memoria compartida, sin una copia por proceso
+    - callback(nfev, coste, mejor coste): evaluaciones y mejor coste sumados sobre las tareas
+    - should_stop(): detiene todas las tareas en curso y descarta las pendientes
+    Devuelve una lista con el resultado de cada tarea, la excepción si falló o
+    None si no llegó a empezar.
+    """
+    data_c = np.ascontiguousarray(data_c, dtype=float)
+    n_workers = min(resolve_workers(workers), len(jobs))
+    if n_workers > 1:
+        return _run_shared_pool(data_c, jobs, n_workers, callback, should_stop)
+
+    results = [None] * len(jobs)
+    total, best = [0], [np.inf]
+
+    def serial_callback(nfev, cost, best_cost):
+        total[0] += 1
+        best[0] = min(best[0], cost)
+        if callback is not None:
+            callback(total[0], cost, best[0])
+
+    for i, (fn, kwargs) in enumerate(jobs):
+        if should_stop is not None and should_stop():
+            break
+        try:
+            results[i] = fn(data_c, callback=serial_callback, should_stop=should_stop, **kwargs)
+        except Exception as e:
+            results[i] = e
+    return results
+
+
+def _multistart_start(data_c, engine, x0, callback=None, should_stop=None, **kwargs):
+    """Un ajuste suelto (arranque del multi-arranque o semilla del escaneo); devuelve (x, coste, status, nfev)."""
+    res = engine(data_c, x0=x0, callback=callback, should_stop=should_stop, **kwargs)
+    return res.x, res.cost, res.status, res.nfev
+
+
+def fit_global_multistart(data_c, t, numExp, x0, lower, upper, fixed=None, model="Parallel", t0_choice_str='No',
+                          n_starts=8, mode="log-uniform", seed=None, workers=None, engine=None,
+                          callback=None, should_stop=None, max_nfev=None):
+    """
+    Ajuste global desde varias semillas de taus (ver multistart_seeds) para no
+    quedarse en el mínimo local al que lleve una sola semilla.
+
+    Con workers > 1 (0 = todos los núcleos) los arranques corren a la vez en un
+    pool de procesos y la matriz de datos se comparte en memoria compartida en
+    lugar de copiarse a cada proceso, así que el tiempo total se acerca al de un
+    solo ajuste si hay tantos núcleos como arranques. Con workers None/1 corren
+    en serie en este proceso.
+
+    - engine: fit_global (por defecto) o fit_global_full; recibe el resto de argumentos
+    - callback(nfev, coste, mejor coste) y should_stop(): como en fit_global; al
+      cancelar se detienen todos los arranques y se devuelve el mejor punto (status -2)
+
+    Devuelve el OptimizeResult del mejor arranque (Jacobiano recalculado en su x,
+    nfev sumado sobre todos) con además seeds, start_costs (coste final de cada
+    arranque, inf si falló) y minima (ver distinct_minima).
+    """
+    engine = fit_global if engine is None else engine
+    data_c = np.ascontiguousarray(data_c, dtype=float)
+    x0 = np.asarray(x0, dtype=float)
+    fixed = np.zeros(x0.size, dtype=bool) if fixed is None else np.asarray(fixed, dtype=bool)
+    seeds = multistart_seeds(x0, lower, upper, numExp, t0_choice_str, n_starts, fixed=fixed, mode=mode, seed=seed)
+    kwargs = dict(t=np.asarray(t, dtype=float), numExp=numExp, lower=np.asarray(lower, dtype=float),
+                  upper=np.asarray(upper, dtype=float), fixed=fixed, model=model, t0_choice_str=t0_choice_str,
+                  max_nfev=max_nfev)
+
+    jobs = [(_multistart_start, dict(engine=engine, x0=x_start, **kwargs)) for x_start in seeds]
+    runs = run_fit_jobs(data_c, jobs, workers=workers, callback=callback, should_stop=should_stop)
+
+    # Un arranque que falla (p. ej. base singular con taus degeneradas) no anula el resto
+    errors = [r for r in runs if isinstance(r, Exception)]
+    done = [r for r in runs if isinstance(r, tuple)]
+    if not done:
+        if errors:
+            raise errors[0]
+        raise RuntimeError("Multi-start fit cancelled before any start finished.")
+    xs = [r[0] if isinstance(r, tuple) else x0 for r in runs]
+    costs = np.array([r[1] if isinstance(r, tuple) else np.inf for r in runs])
+    best_i = int(np.argmin(costs))
+    _, _, status, _ = runs[best_i]
+    cancelled = should_stop is not None and should_stop()
+    if cancelled:
+        status, message, success = -2, "Cancelled by user.", False
+    else:
+        message, success = f"Best of {len(done)} starts ({len(errors)} failed).", status > 0
+    res = _global_fit_result(xs[best_i], data_c, kwargs['t'], numExp, t0_choice_str, model, fixed,
+                             status, message, success, int(sum(r[3] for r in done)))
+    res.seeds = seeds
+    res.start_costs = costs
+    res.minima = distinct_minima(xs, costs, numExp, t0_choice_str)
+    return res
+
+
+def svd_rank_estimate(data_c):
+    """
+    Nº de componentes significativas de data_c con el umbral óptimo de Gavish y
+    Donoho (2014) para ruido blanco de nivel desconocido: s_k > ω(β)·mediana(s),
+    con β = min(m, n)/max(m, n). Devuelve (rango, valores singulares, umbral).
+    """
+    data_c = np.asarray(data_c, dtype=float)
+    s = np.linalg.svd(data_c, compute_uv=False)
+    beta = min(data_c.shape) / max(data_c.shape)
+    omega = 0.56 * beta**3 - 0.95 * beta**2 + 1.82 * beta + 1.43
+    threshold = omega * np.median(s)
+    return int(np.sum(s > threshold)), s, threshold
+
+
+def information_criteria(cost, n_obs, n_params):
+    """(AIC, BIC) de un ajuste por mínimos cuadrados con ruido gaussiano (cost = RSS/2)."""
+    loglik = n_obs * np.log(max(2.0 * cost, 1e-300) / n_obs)
+    return loglik + 2.0 * n_params, loglik + n_params * np.log(n_obs)
+
+
+# Límites del escaneo de componentes (los mismos que _generate_defaults de la interfaz)
+SCAN_BOUNDS = {'w': (0.05, 2.0), 't0': (-5.0, 5.0), 'tau': (0.001, 1e8)}
+
+
+def _order_vector(numExp, numWL, t0_choice_str, w, t0, taus, bounds):
+    """x, lower, upper para numExp componentes; amplitudes a 0 (VARPRO las resuelve)."""
+    if t0_choice_str == 'Yes':
+        n = 1 + numExp + numWL * (numExp + 1)
+        i_t0 = 1 + numExp + np.arange(numWL) * (numExp + 1)
+    else:
+        n = 2 + numExp + numWL * numExp
+        i_t0 = np.array([1])
+    x = np.zeros(n)
+    lower, upper = np.full(n, -np.inf), np.full(n, np.inf)
+    i_tau = tau_indices(numExp, t0_choice_str)
+    x[0], x[i_t0], x[i_tau] = w, t0, taus
+    (lower[0], upper[0]), (lower[i_t0], upper[i_t0]), (lower[i_tau], upper[i_tau]) = \
+        bounds['w'], bounds['t0'], bounds['tau']
+    x[0] = np.clip(x[0], lower[0], upper[0])
+    x[i_t0] = np.clip(x[i_t0], lower[i_t0], upper[i_t0])
+    x[i_tau] = np.clip(x[i_tau], lower[i_tau], upper[i_tau])
+    return x, lower, upper
+
+
+def _insert_tau_candidates(taus, factor=10.0):
+    """Semillas de orden n+1 desde las taus de orden n: la tau nueva en cada hueco y fuera de los extremos."""
+    taus = np.sort(taus)
+    new = [taus[0] / factor, *np.sqrt(taus[:-1] * taus[1:]), taus[-1] * factor]
+    return [np.sort(np.append(taus, tau)) for tau in new]
+
+
+def scan_model_orders(data_c, t, max_order, models=None, t0_choice_str='No', w0=0.15, t0=0.0,
+                      taus0=(0.5, 5.0, 50.0, 500.0, 2000.0, 5000.0), bounds=None, workers=None,
+                      callback=None, should_stop=None, max_nfev=None):
+    """
+    Escaneo del nº de componentes: ajusta numExp = 1..max_order con cada modelo
+    de `models` (por defecto todos los de KINETIC_MODELS) por VARPRO. Cada orden
+    parte del anterior del mismo modelo (mismas w, t0 y taus más una nueva, ver
+    _insert_tau_candidates) y se queda con la mejor semilla; el orden 1 prueba
+    cada tau de taus0. Las semillas de un orden, de todos los modelos, son tareas
+    independientes de run_fit_jobs: con workers > 1 (0 = todos los núcleos) se
+    reparten entre los núcleos y sólo los órdenes van uno detrás de otro.
+
+    Para las mismas taus, esquemas como Parallel y Sequential generan el mismo
+    subespacio de exponenciales, de modo que su coste sólo difiere si el
+    optimizador acaba en mínimos distintos; lo que cambia es la lectura de las
+    amplitudes (DAS o SAS).
+
+    - bounds: límites (lo, hi) de 'w', 't0' y 'tau' (por defecto SCAN_BOUNDS)
+    - callback, should_stop: como en run_fit_jobs (nfev acumulado sobre todos
+      los órdenes); al cancelar se devuelven los órdenes ya terminados
+
+    Devuelve un dict con rows (una fila por modelo y orden con model, numExp,
+    cost, rmsd, aic, bic, n_params, taus, x, status y nfev), svd_rank,
+    singular_values, svd_threshold, best_aic, best_bic (índices en rows),
+    errors (modelo -> mensaje si fallaron todas las semillas de un orden) y
+    cancelled.
+    """
+    data_c = np.ascontiguousarray(data_c, dtype=float)
+    t = np.asarray(t, dtype=float)
+    models = list(KINETIC_MODELS) if models is None else list(models)
+    bounds = dict(SCAN_BOUNDS, **(bounds or {}))
+    numWL, T = data_c.shape
+    n_obs = numWL * T
+
+    # Estado de cada modelo aún activo: (w, t0, semillas de taus del siguiente orden)
+    state = {model: (w0, t0, [np.array([tau]) for tau in np.asarray(taus0, dtype=float)]) for model in models}
+    rows, errors = [], {}
+    nfev_done = [0]
+
+    def order_callback(nfev, cost, best_cost):
+        if callback is not None:
+            callback(nfev_done[0] + nfev, cost, best_cost)
+
+    for numExp in range(1, int(max_order) + 1):
+        if not state or (should_stop is not None and should_stop()):
+            break
+        jobs, owners = [], []
+        for model, (w, t0_prev, candidates) in state.items():
+            for taus in candidates:
+                x, lower, upper = _order_vector(numExp, numWL, t0_choice_str, w, t0_prev, taus, bounds)
+                jobs.append((_multistart_start, dict(engine=fit_global, t=t, numExp=numExp, x0=x, lower=lower,
+                                                     upper=upper, model=model, t0_choice_str=t0_choice_str,
+                                                     max_nfev=max_nfev)))
+                owners.append(model)
+        results = run_fit_jobs(data_c, jobs, workers=workers, callback=order_callback, should_stop=should_stop)
+
+        best, nfev, failed = {}, {}, {}
+        for model, r in zip(owners, results):
+            if isinstance(r, Exception):
+                failed[model] = r
+                continue
+            if r is None:
+                continue
+            x, cost, status, n = r
+            nfev[model] = nfev.get(model, 0) + n
+            if model not in best or cost < best[model][1]:
+                best[model] = (x, cost, status)
+        nfev_done[0] += sum(nfev.values())
+
+        for model in list(state):
+            if model not in best or best[model][2] == -2:
+                # Sin ajuste válido (o cancelado) el modelo no sigue a órdenes mayores
+                if model not in best and model in failed:
+                    errors[model] = str(failed[model])
+                del state[model]
+                continue
+            x, cost, status = best[model]
+            n_params = nonlinear_indices(numExp, numWL, t0_choice_str).size + numWL * numExp
+            aic, bic = information_criteria(cost, n_obs, n_params)
+            i_tau = tau_indices(numExp, t0_choice_str)
+            rows.append({'model': model, 'numExp': numExp, 'cost': cost,
+                         'rmsd': np.sqrt(2.0 * cost / n_obs), 'aic': aic, 'bic': bic,
+                         'n_params': n_params, 'taus': np.sort(x[i_tau]), 'x': x,
+                         'status': status, 'nfev': nfev[model]})
+            t0_next = x[1 + numExp::numExp + 1][:numWL] if t0_choice_str == 'Yes' else x[1]
+            state[model] = (x[0], t0_next, _insert_tau_candidates(x[i_tau]))
+
+    # Filas agrupadas por modelo y orden, como en la tabla
+    rows.sort(key=lambda r: (models.index(r['model']), r['numExp']))
+    svd_rank, s, threshold = svd_rank_estimate(data_c)
+    return {'rows': rows, 'svd_rank': svd_rank, 'singular_values': s, 'svd_threshold': threshold,
+            'best_aic': int(np.argmin([r['aic'] for r in rows])) if rows else None,
+            'best_bic': int(np.argmin([r['bic'] for r in rows])) if rows else None,
+            'errors': errors, 'cancelled': should_stop is not None and bool(should_stop())}
+
+
+def wavelength_subset_indices(numExp, numWL, t0_choice_str, keep):
+    """Posiciones en x de los parámetros globales y de los locales (t0, amplitudes) de las WL con keep True."""
+    n_global, block = _block_layout(numExp, numWL, t0_choice_str)
+    local = n_global + np.flatnonzero(keep)[:, None] * block + np.arange(block)[None, :]
+    return np.concatenate([np.arange(n_global), local.ravel()])
+
+
+def _resample_replicate(data_c, method, x_best, t, numExp, lower, upper, fixed, model, t0_choice_str, engine,
+                        max_nfev=None, rng_seed=None, drop=None, callback=None, should_stop=None):
+    """
+    Una réplica de resample_uncertainty, arrancando desde x_best.
+    - bootstrap: datos = modelo(x_best) + residuos remuestreados con reemplazo a lo
+      largo de los retardos dentro de cada WL (conserva el nivel de ruido de cada WL)
+    - jackknife: se quitan las WL de `drop`; las amplitudes de todas las WL se
+      recalculan luego sobre los datos completos con los parámetros globales de la réplica
+    Devuelve (x, status).
+    """
+    numWL, T = data_c.shape
+    kw = dict(model=model, t0_choice_str=t0_choice_str, callback=callback, should_stop=should_stop,
+              max_nfev=max_nfev)
+    if method == "bootstrap":
+        F = eval_kinetic_model(x_best, t, numExp, numWL, t0_choice_str, model).T
+        rng = np.random.default_rng(rng_seed)
+        resid = np.take_along_axis(data_c - F, rng.integers(0, T, size=(numWL, T)), axis=1)
+        res = engine(F + resid, t, numExp, x_best, lower, upper, fixed=fixed, **kw)
+        return res.x, res.status
+
+    keep = np.ones(numWL, dtype=bool)
+    keep[drop] = False
+    idx = wavelength_subset_indices(numExp, numWL, t0_choice_str, keep)
+    res = engine(data_c[keep], t, numExp, x_best[idx], lower[idx], upper[idx], fixed=fixed[idx], **kw)
+    x = x_best.copy()
+    x[idx] = res.x
+    amp_idx = amplitude_indices(numExp, numWL, t0_choice_str)
+    amps = _solve_amplitudes(_basis_from_x(x, t, numExp, numWL, t0_choice_str, model), data_c)
+    x[amp_idx] = np.where(fixed[amp_idx], x_best[amp_idx], amps)
+    return x, res.status
+
+
+def resample_uncertainty(data_c, t, numExp, x_best, lower, upper, fixed=None, model="Parallel", t0_choice_str='No',
+                         method="bootstrap", n_replicates=100, level=0.95, seed=None, workers=None, engine=None,
+                         callback=None, should_stop=None, max_nfev=None):
+    """
+    Incertidumbre de todos los parámetros por remuestreo, como alternativa a la
+    covarianza inv(JᵀJ) (singular o demasiado optimista con muchas amplitudes).
+
+    - method: "bootstrap" (de residuos, n_replicates réplicas; intervalo por
+      percentiles) o "jackknife" (por WL: las WL se reparten en
+      min(n_replicates, numWL) grupos contiguos y cada réplica quita uno;
+      intervalo normal x_best ± z·SE). En el jackknife las amplitudes se
+      recalculan con los parámetros globales de cada réplica, así que su
+      intervalo sólo recoge la incertidumbre que les llega de w, t0 y taus.
+    - engine: fit_global (por defecto) o fit_global_full, como en el ajuste original
+    - workers, callback, should_stop: como en run_fit_jobs. Cada réplica arranca
+      desde x_best y es una tarea del pool.
+
+    Devuelve un dict con method, level, replicates (n_ok, len(x)), err
+    (desviación estándar bootstrap o SE jackknife), ci_low, ci_high, n_ok,
+    n_failed (réplicas que fallaron o no terminaron) y cancelled. Los
+    parámetros fijos tienen error 0.
+    """
+    engine = fit_global if engine is None else engine
+    data_c = np.ascontiguousarray(data_c, dtype=float)
+    numWL = data_c.shape[0]
+    x_best = np.asarray(x_best, dtype=float)
+    fixed = np.zeros(x_best.size, dtype=bool) if fixed is None else np.asarray(fixed, dtype=bool)
+    common = dict(method=method, x_best=x_best, t=np.asarray(t, dtype=float), numExp=numExp,
+                  lower=np.asarray(lower, dtype=float), upper=np.asarray(upper, dtype=float), fixed=fixed,
+                  model=model, t0_choice_str=t0_choice_str, engine=engine, max_nfev=max_nfev)
+    if method == "bootstrap":
+        seeds = np.random.SeedSequence(seed).spawn(int(n_replicates))
+        jobs = [(_resample_replicate, dict(common, rng_seed=s)) for s in seeds]
+    elif method == "jackknife":
+        groups = np.array_split(np.arange(numWL), min(int(n_replicates), numWL))
+        jobs = [(_resample_replicate, dict(common, drop=g)) for g in groups]
+    else:
+        raise ValueError(f"Método de remuestreo desconocido: {method}")
+
+    results = run_fit_jobs(data_c, jobs, workers=workers, callback=callback, should_stop=should_stop)
+    ok = [r[0] for r in results if isinstance(r, tuple) and r[1] != -2]
+    if len(ok) < 2:
+        raise RuntimeError(f"Only {len(ok)} of {len(jobs)} replicates finished; cannot estimate errors.")
+    X = np.array(ok)
+
+    alpha = 1.0 - level
+    if method == "bootstrap":
+        err = X.std(axis=0, ddof=1)
+        ci_low, ci_high = np.percentile(X, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    else:
+        from scipy.stats import norm
+        g = X.shape[0]
+        err = np.sqrt((g - 1) / g * np.sum((X - X.mean(axis=0)) ** 2, axis=0))
+        z = norm.ppf(1 - alpha / 2)
+        ci_low, ci_high = x_best - z * err, x_best + z * err
+    err[fixed] = 0.0
+    ci_low[fixed] = ci_high[fixed] = x_best[fixed]
+    return {'method': method, 'level': level, 'replicates': X, 'err': err, 'ci_low': ci_low, 'ci_high': ci_high,
+            'n_ok': X.shape[0], 'n_failed': len(jobs) - X.shape[0],
+            'cancelled': should_stop is not None and bool(should_stop())}
+
+
+def lifetime_grid(tau_min, tau_max, n_taus):
+    """Rejilla logarítmica de taus para el análisis de densidad de tiempos de vida."""
+    return np.logspace(np.log10(tau_min), np.log10(tau_max), int(n_taus))
+
+
+def lifetime_kernel(t, taus, w, t0):
+    """Núcleo (T, n_taus) del LDA: columna k = convolved_exp(t, t0, taus[k], w)."""
+    return convolved_exp(np.asarray(t, dtype=float)[:, None], t0, np.asarray(taus, dtype=float)[None, :], w)
+
+
+def tikhonov_gcv(s, beta, resid_perp, n_rows, lambdas):
+    """
+    Validación cruzada generalizada de Tikhonov para cada λ de `lambdas`,
+    sumada sobre todas las WL, a partir de la SVD del núcleo:
+    - s: valores singulares; beta = Uᵀ·D (r, numWL)
+    - resid_perp: ||D||² fuera del rango de U; n_rows: nº de retardos
+    """
+    f = s[None, :]**2 / (s[None, :]**2 + np.asarray(lambdas, dtype=float)[:, None]**2)
+    rss = (1.0 - f)**2 @ np.sum(beta**2, axis=1) + resid_perp
+    return rss / (n_rows - f.sum(axis=1))**2
+
+
+def lifetime_density(data_c, t, taus, w, t0, method="tikhonov", lam=None, lambdas=None):
+    """
+    Análisis de densidad de tiempos de vida (LDA): amplitudes de una rejilla fija
+    de taus (ver lifetime_grid) en lugar de unas pocas taus discretas ajustadas.
+
+    El núcleo convolucionado con el IRF (w, t0 escalares) se calcula una vez y
+    se descompone por SVD; con eso el mapa de todas las WL sale de productos de
+    matrices, sin ajuste no lineal.
+    - method "tikhonov": min ||K·a - d||² + λ²||a||², amplitudes con signo,
+      todas las WL en una sola operación
+    - method "nnls": el mismo problema con a >= 0 (señales de un solo signo, p. ej.
+      fluorescencia). [K; λI] se factoriza una vez por QR y cada WL resuelve un
+      NNLS pequeño (n_taus × n_taus).
+    - lam: regularización; None la elige por GCV (tikhonov_gcv) sobre `lambdas`
+      (por defecto 61 valores entre s_max·1e-6 y s_max)
+
+    Devuelve un dict con taus, amplitudes (numWL, n_taus), fitres (numWL, T),
+    rmsd, lam, lambdas y gcv (None si lam se dio), method.
+    """
+    from scipy.optimize import nnls
+
+    data_c = np.asarray(data_c, dtype=float)
+    taus = np.asarray(taus, dtype=float)
+    K = lifetime_kernel(t, taus, w, t0)
+    D = data_c.T
+    U, s, Vt = np.linalg.svd(K, full_matrices=False)
+    beta = U.T @ D
+
+    gcv = None
+    if lam is None:
+        if lambdas is None:
+            lambdas = s[0] * np.logspace(-6, 0, 61)
+        gcv = tikhonov_gcv(s, beta, max(float(np.sum(D**2) - np.sum(beta**2)), 0.0), K.shape[0], lambdas)
+        lam = float(lambdas[np.argmin(gcv)])
+
+    if method == "tikhonov":
+        A = Vt.T @ ((s / (s**2 + lam**2))[:, None] * beta)
+    elif method == "nnls":
+        n = taus.size
+        Q, R = np.linalg.qr(np.vstack([K, lam * np.eye(n)]))
+        rhs = Q[:K.shape[0]].T @ D
+        A = np.column_stack([nnls(R, rhs[:, j], maxiter=50 * n)[0] for j in range(D.shape[1])])
+    else:
+        raise ValueError(f"Método de LDA desconocido: {method}")
+
+    fitres = (K @ A).T
+    return {'taus': taus, 'amplitudes': A.T, 'fitres': fitres, 'rmsd': float(np.sqrt(np.mean((data_c - fitres)**2))),
+            'lam': lam, 'lambdas': None if gcv is None else np.asarray(lambdas), 'gcv': gcv, 'method': method}
+
+
+def svd_compress(data_c, k):
+    """Las k primeras componentes de data_c ≈ U·diag(s)·Vt: (U (numWL, k), s (k,), Vt (k, T))."""
+    U, s, Vt = np.linalg.svd(np.asarray(data_c, dtype=float), full_matrices=False)
+    return U[:, :k], s[:k], Vt[:k]
+
+
+def fit_global_svd(data_c, t, numExp, x0, lower, upper, fixed=None, model="Parallel", t0_choice_str='No',
+                   k=None, callback=None, should_stop=None, max_nfev=None):
+    """
+    Ajuste global (VARPRO) sobre las k componentes temporales de la SVD en vez
+    de sobre las numWL cinéticas.
+
+    Con data_c ≈ U_k·diag(s_k)·V_kᵀ, el modelo A·E(t)ᵀ proyectado es U_kᵀA·E(t)ᵀ,
+    así que se ajustan las k filas diag(s_k)·V_kᵀ con amplitudes A' = U_kᵀA y
+    luego A = U_k·A'. Ponderar cada fila por su s_k hace que el residuo sea el
+    del ajuste completo restringido al subespacio retenido. El vector de
+    residuos y el Jacobiano son numWL/k veces más pequeños.
+
+    - k: nº de componentes; None = svd_rank_estimate(data_c)
+    - sólo con t0 común (sin chirp) y sin amplitudes fijas (VARPRO)
+    - resto de argumentos y resultado como fit_global. fun, cost y jac se
+      recalculan sobre los datos completos en la solución; además svd_k,
+      compressed_cost y discarded_cost (½‖data - U_kU_kᵀdata‖², el mínimo
+      coste alcanzable fuera del subespacio).
+    """
+    if t0_choice_str == 'Yes':
+        raise ValueError("El ajuste comprimido por SVD necesita un t0 común (sin chirp).")
+    data_c = np.asarray(data_c, dtype=float)
+    numWL = data_c.shape[0]
+    x0 = np.asarray(x0, dtype=float)
+    fixed = np.zeros(x0.size, dtype=bool) if fixed is None else np.asarray(fixed, dtype=bool)
+    amp_idx = amplitude_indices(numExp, numWL, t0_choice_str)
+    if fixed[amp_idx].any():
+        raise ValueError("VARPRO no admite amplitudes fijas.")
+    if k is None:
+        k = svd_rank_estimate(data_c)[0]
+    k = int(min(max(k, 1), min(data_c.shape)))
+
+    U, s, Vt = svd_compress(data_c, k)
+    compressed = s[:, None] * Vt
+    nl_idx = nonlinear_indices(numExp, numWL, t0_choice_str)
+    n_c = nl_idx.size + k * numExp
+    x0_c, lower_c, upper_c, fixed_c = np.zeros(n_c), np.full(n_c, -np.inf), np.full(n_c, np.inf), np.zeros(n_c, bool)
+    x0_c[nl_idx], fixed_c[nl_idx] = x0[nl_idx], fixed[nl_idx]
+    lower_c[nl_idx], upper_c[nl_idx] = np.asarray(lower, dtype=float)[nl_idx], np.asarray(upper, dtype=float)[nl_idx]
+    res_c = fit_global(compressed, t, numExp, x0_c, lower_c, upper_c, fixed=fixed_c, model=model,
+                       t0_choice_str=t0_choice_str, callback=callback, should_stop=should_stop, max_nfev=max_nfev)
+
+    x_opt = x0.copy()
+    x_opt[nl_idx] = res_c.x[nl_idx]
+    x_opt[amp_idx] = U @ res_c.x[amplitude_indices(numExp, k, t0_choice_str)]
+    res = _global_fit_result(x_opt, data_c, t, numExp, t0_choice_str, model, fixed,
+                             res_c.status, res_c.message, res_c.success, res_c.nfev)
+    res.svd_k = k
+    res.compressed_cost = res_c.cost
+    res.discarded_cost = 0.5 * max(float(np.sum(data_c**2) - np.sum(s**2)), 0.0)
+    return res
+
+
+def compare_svd_fit(data_c, t, numExp, x0, lower, upper, fixed=None, model="Parallel", t0_choice_str='No',
+                    k=None, callback=None, should_stop=None, max_nfev=None):
+    """
+    Diagnóstico del ajuste comprimido: ajusta con fit_global (todas las WL) y con
+    fit_global_svd (k componentes) desde el mismo x0 y compara tiempo, nº de
+    evaluaciones, coste sobre los datos completos, taus y DAS.
+    Devuelve un dict con full y svd (los OptimizeResult), time_full, time_svd,
+    k, taus_full, taus_svd (ordenadas), cost_rel_diff, tau_rel_diff (máxima), das_rel_diff (‖A_svd - A‖/‖A‖),
+    discarded_cost y jac_size_ratio (filas del residuo completo / comprimido).
+    """
+    import time
+
+    kw = dict(fixed=fixed, model=model, t0_choice_str=t0_choice_str, callback=callback,
+              should_stop=should_stop, max_nfev=max_nfev)
+    tic = time.perf_counter()
+    res_full = fit_global(data_c, t, numExp, x0, lower, upper, **kw)
+    time_full = time.perf_counter() - tic
+    tic = time.perf_counter()
+    res_svd = fit_global_svd(data_c, t, numExp, x0, lower, upper, k=k, **kw)
+    time_svd = time.perf_counter() - tic
+
+    numWL = np.asarray(data_c).shape[0]
+    i_tau = tau_indices(numExp, t0_choice_str)
+    amp_idx = amplitude_indices(numExp, numWL, t0_choice_str)
+    # Los dos ajustes pueden devolver las componentes en distinto orden: se comparan
+    # ordenadas por tau, permutando las columnas de los DAS igual
+    order_full, order_svd = np.argsort(res_full.x[i_tau]), np.argsort(res_svd.x[i_tau])
+    taus_full, taus_svd = res_full.x[i_tau][order_full], res_svd.x[i_tau][order_svd]
+    A_full, A_svd = res_full.x[amp_idx][:, order_full], res_svd.x[amp_idx][:, order_svd]
+    return {'full': res_full, 'svd': res_svd, 'time_full': time_full, 'time_svd': time_svd, 'k': res_svd.svd_k,
+            'taus_full': taus_full, 'taus_svd': taus_svd,
+            'cost_rel_diff': (res_svd.cost - res_full.cost) / max(res_full.cost, 1e-300),
+            'tau_rel_diff': float(np.max(np.abs(taus_svd / taus_full - 1.0))),
+            'das_rel_diff': float(np.linalg.norm(A_svd - A_full) / max(np.linalg.norm(A_full), 1e-300)),
+            'discarded_cost': res_svd.discarded_cost, 'jac_size_ratio': numWL / res_svd.svd_k}
+
+
+def format_svd_comparison(cmp):
+    """Texto con el resultado de compare_svd_fit."""
+    full, svd = cmp['full'], cmp['svd']
+    taus = {name: ", ".join(f"{tau:.4g}" for tau in cmp[f'taus_{name}']) for name in ('full', 'svd')}
+    lines = [f"SVD-compressed fit with k = {cmp['k']} (residual/Jacobian {cmp['jac_size_ratio']:.1f}x smaller)",
+             f"{'':<6} {'time (s)':>9} {'nfev':>6} {'cost':>12}  taus",
+             f"{'full':<6} {cmp['time_full']:>9.3f} {full.nfev:>6} {full.cost:>12.6g}  {taus['full']}",
+             f"{'SVD':<6} {cmp['time_svd']:>9.3f} {svd.nfev:>6} {svd.cost:>12.6g}  {taus['svd']}",
+             f"cost difference {100 * cmp['cost_rel_diff']:.3g} % "
+             f"(cost outside the subspace {cmp['discarded_cost']:.6g})",
+             f"max tau difference {100 * cmp['tau_rel_diff']:.3g} %, DAS difference {100 * cmp['das_rel_diff']:.3g} %"]
+    return "\n".join(lines)
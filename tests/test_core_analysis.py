@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""Regresiones y comportamiento de core_analysis frente a implementaciones de referencia."""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.interpolate import RegularGridInterpolator, interp1d
+from scipy.special import erf
+
+from core_analysis import (CorrectionCache, LazyCorrectedData, SolventShifter, apply_t0_correction,
+                           detect_t0_onset, extract_t0_from_solvent, load_results, read_matrix_file,
+                           save_results, shift_rows_cubic)
+
+
+def pandas_matrix(path):
+    """El lector original con pandas (read_csv_file antes de read_matrix_file)."""
+    df = pd.read_csv(path)
+    WL_raw = pd.to_numeric(df.iloc[:, 0], errors='coerce')
+    valid_rows = WL_raw.notna()
+    valid_cols, TD = [], []
+    for col in df.columns[1:]:
+        try:
+            TD.append(float(col))
+            valid_cols.append(col)
+        except ValueError:
+            continue
+    data = df.loc[valid_rows, valid_cols].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy()
+    return WL_raw[valid_rows].to_numpy(), np.array(TD), data
+
+
+def test_read_matrix_file_matches_pandas(tmp_path):
+    rng = np.random.default_rng(0)
+    TD = np.linspace(-1.0, 10.0, 25)
+    WL = np.linspace(400.0, 700.0, 40)
+    data = rng.normal(size=(WL.size, TD.size))
+    lines = ["WL/TD," + ",".join(f"{t:.6g}" for t in TD[:10]) + ",comment," + ",".join(f"{t:.6g}" for t in TD[10:])]
+    for i, wl in enumerate(WL):
+        row = [f"{v:.10e}" for v in data[i]]
+        row.insert(10, "x")
+        if i == 5:
+            row[3] = ""       # campo vacío
+        if i == 8:
+            row[12] = "n/a"   # campo no numérico
+        lines.append(f"{wl:.4f}," + ",".join(row))
+    lines.insert(20, "notes," + ",".join(["0"] * (TD.size + 1)))   # fila sin WL válida
+    path = tmp_path / "matrix.csv"
+    path.write_text("\n".join(lines) + "\n")
+
+    WL_ref, TD_ref, data_ref = pandas_matrix(path)
+    WL_new, TD_new, data_new = read_matrix_file(str(path))
+    np.testing.assert_array_equal(WL_new, WL_ref)
+    np.testing.assert_array_equal(TD_new, TD_ref)
+    np.testing.assert_array_equal(data_new, data_ref)
+    assert data_new.shape == (WL.size, TD.size) and data_new[5, 3] == 0.0
+
+
+def reference_shift(TD, data, shifts):
+    """La implementación original: un interp1d cúbico por fila."""
+    out = np.array(data, dtype=float, copy=True)
+    for i, s in enumerate(shifts):
+        if np.isfinite(s):
+            out[i] = interp1d(TD - s, data[i], kind='cubic', fill_value='extrapolate')(TD)
+    return out
+
+
+@pytest.fixture
+def rows():
+    rng = np.random.default_rng(0)
+    TD = np.concatenate([np.linspace(-2.0, 2.0, 60), np.logspace(np.log10(2.2), 3.0, 40)])
+    taus = rng.uniform(1, 50, size=(150, 1))
+    data = np.exp(-np.maximum(TD, 0)[None, :] / taus) + rng.normal(scale=0.01, size=(150, TD.size))
+    shifts = rng.uniform(-0.5, 0.5, size=150)
+    return TD, data, shifts
+
+
+def test_shift_rows_cubic_matches_interp1d(rows):
+    TD, data, shifts = rows
+    np.testing.assert_allclose(shift_rows_cubic(TD, data, shifts, chunk_rows=64),
+                               reference_shift(TD, data, shifts), rtol=1e-9, atol=1e-12)
+
+
+def test_shift_rows_cubic_unsorted_td_and_nan_shifts(rows):
+    TD, data, shifts = rows
+    shifts = shifts.copy()
+    shifts[[3, 70]] = np.nan
+    perm = np.random.default_rng(1).permutation(TD.size)
+    out = shift_rows_cubic(TD[perm], data[:, perm], shifts)
+    np.testing.assert_allclose(out, reference_shift(TD, data, shifts)[:, perm], rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(out[3], data[3, perm])
+
+
+def test_shift_rows_cubic_threads_and_float32(rows):
+    TD, data, shifts = rows
+    serial = shift_rows_cubic(TD, data, shifts, chunk_rows=16)
+    np.testing.assert_array_equal(shift_rows_cubic(TD, data, shifts, chunk_rows=16, workers=4), serial)
+    single = shift_rows_cubic(TD, data, shifts, dtype=np.float32)
+    assert single.dtype == np.float32
+    np.testing.assert_allclose(single, serial, atol=1e-4)
+
+
+POPT = [0.0, 0.0, 1e-6, -1e-3, 0.3]
+
+
+def test_lazy_correction_shares_input_read_only(rows):
+    TD, data, _ = rows
+    WL = np.linspace(400.0, 700.0, data.shape[0])
+    lazy = LazyCorrectedData('poly4', POPT, WL, TD, data)
+    # Vista sin copia: el hilo de la interfaz no duplica la matriz
+    assert np.shares_memory(lazy._data, data)
+    assert not lazy._data.flags.writeable and data.flags.writeable
+    expected, _ = apply_t0_correction('poly4', POPT, WL, TD, data)
+    np.testing.assert_allclose(lazy[10:20], expected[10:20])
+    np.testing.assert_allclose(np.asarray(lazy), expected)
+
+
+def test_lazy_correction_done_callback(rows):
+    TD, data, _ = rows
+    WL = np.linspace(400.0, 700.0, data.shape[0])
+    lazy = LazyCorrectedData('poly4', POPT, WL, TD, data, chunk_rows=16)
+    fired = threading.Event()
+    threads = []
+    lazy.add_done_callback(lambda c: (threads.append(threading.current_thread()), fired.set()))
+    lazy.ensure_rows(0, 16)
+    assert not fired.is_set()
+    lazy.start_background()
+    assert fired.wait(10)
+    assert lazy.is_complete and threads == [lazy._thread]
+    # Ya completa: la llamada es inmediata
+    late = []
+    lazy.add_done_callback(late.append)
+    assert late == [lazy]
+
+
+def test_correction_cache_counts_lazy_input(rows):
+    TD, data, _ = rows
+    WL = np.linspace(400.0, 700.0, data.shape[0])
+    cache = CorrectionCache()
+    corrected, t0_lambda = cache.correct(0, 'poly4', POPT, WL, TD, data, lazy=True)
+    assert cache.nbytes == corrected.nbytes + data.nbytes + t0_lambda.nbytes
+    # Sin sitio para salida + entrada: no se guarda
+    small = CorrectionCache(max_bytes=corrected.nbytes + t0_lambda.nbytes)
+    small.correct(0, 'poly4', POPT, WL, TD, data, lazy=True)
+    assert len(small) == 0
+
+
+def solvent_grid(rng):
+    """Solvente (WLSol x TDSol) con un artefacto coherente gaussiano y su rejilla."""
+    WLSol = np.linspace(380.0, 720.0, 90)
+    TDSol = np.concatenate([np.linspace(-3.0, 3.0, 121), np.linspace(3.2, 20.0, 30)])
+    artifact = np.exp(-((TDSol[None, :] - 0.002 * (WLSol[:, None] - 550.0)) / 0.15)**2)
+    return WLSol, TDSol, artifact * (1 + 0.3 * np.sin(WLSol / 30.0))[:, None] + 0.01 * rng.normal(size=(90, 151))
+
+
+def reference_solvent(WLSol, TDSol, solvent, WL, TD, sf):
+    """El cálculo original: RegularGridInterpolator 2-D evaluado en (WL, TD - sf)."""
+    interp = RegularGridInterpolator((WLSol, TDSol), solvent, bounds_error=False, fill_value=0)
+    WW, TT = np.meshgrid(WL, TD - sf, indexing='ij')
+    return interp(np.column_stack([WW.ravel(), TT.ravel()])).reshape(WW.shape)
+
+
+@pytest.mark.parametrize("same_grid", [True, False])
+def test_solvent_shifter_matches_2d_interpolation(same_grid):
+    WLSol, TDSol, solvent = solvent_grid(np.random.default_rng(0))
+    WL = WLSol if same_grid else np.linspace(370.0, 730.0, 70)
+    TD = np.linspace(-4.0, 25.0, 200)
+    shifter = SolventShifter(WLSol, TDSol, solvent, WL, TD)
+    for sf in (0.0, 0.137, -0.8):
+        np.testing.assert_allclose(shifter.shifted(sf), reference_solvent(WLSol, TDSol, solvent, WL, TD, sf),
+                                   rtol=1e-12, atol=1e-12)
+    medida = np.random.default_rng(1).normal(size=(WL.size, TD.size))
+    np.testing.assert_allclose(shifter.subtract(medida, 0.7, 0.2),
+                               medida - 0.7 * reference_solvent(WLSol, TDSol, solvent, WL, TD, 0.2),
+                               rtol=1e-12, atol=1e-12)
+
+
+def test_solvent_fit_scaling_recovers_amplitude_and_shift():
+    WLSol, TDSol, solvent = solvent_grid(np.random.default_rng(2))
+    WL, TD = WLSol, np.linspace(-2.0, 10.0, 300)
+    shifter = SolventShifter(WLSol, TDSol, solvent, WL, TD)
+    medida = 0.65 * reference_solvent(WLSol, TDSol, solvent, WL, TD, 0.23)
+    am, sf, rss = shifter.fit_scaling(medida, (-1.0, 1.0))
+    assert am == pytest.approx(0.65, rel=1e-3)
+    assert sf == pytest.approx(0.23, abs=1e-3)
+    assert rss < 1e-6 * np.sum(medida**2)
+
+
+def test_solvent_fit_scaling_amplitude_is_least_squares():
+    # Para el sf devuelto, am es la amplitud de mínimos cuadrados sobre la ventana
+    rng = np.random.default_rng(3)
+    WLSol, TDSol, solvent = solvent_grid(rng)
+    WL, TD = np.linspace(400.0, 700.0, 50), np.linspace(-2.0, 10.0, 200)
+    shifter = SolventShifter(WLSol, TDSol, solvent, WL, TD)
+    medida = 1.4 * shifter.shifted(-0.31) + 0.05 * rng.normal(size=(WL.size, TD.size))
+    rows = np.arange(5, 45)
+    am, sf, rss = shifter.fit_scaling(medida, (-1.5, 1.5), rows=rows)
+    cols = (TD >= -1.5) & (TD <= 1.5)
+    S, M = shifter.shifted(sf)[rows][:, cols], medida[rows][:, cols]
+    assert am == pytest.approx(np.sum(S * M) / np.sum(S * S), rel=1e-10)
+    assert rss == pytest.approx(np.sum((M - am * S)**2), rel=1e-8)
+    # Ningún sf de una rejilla fina mejora el residuo
+    brute = [np.sum((M - np.sum(Sk * M) / np.sum(Sk * Sk) * Sk)**2)
+             for Sk in (shifter.shifted(x)[rows][:, cols] for x in np.linspace(-1.0, 1.0, 401))]
+    assert rss <= min(brute) * (1 + 1e-9)
+
+
+def test_results_round_trip_without_pickle(tmp_path):
+    path = str(tmp_path / "run_treated_data")
+    arrays = {'data_c': np.arange(12.0).reshape(3, 4), 'WL': np.array([400.0, 500.0, 600.0]),
+              'TD': np.arange(4, dtype=np.float32), 'errors': None}
+    save_results(path, arrays, meta={'method': 'poly4'})
+    loaded = load_results(path)
+    assert set(loaded) == {'data_c', 'WL', 'TD'}
+    for name, arr in loaded.items():
+        np.testing.assert_array_equal(arr, arrays[name])
+        assert arr.dtype == arrays[name].dtype and isinstance(arr, np.memmap)
+    # Todos los .npy se leen sin pickle
+    for fname in os.listdir(path):
+        if fname.endswith('.npy'):
+            np.load(os.path.join(path, fname), allow_pickle=False)
+    with pytest.raises(TypeError):
+        save_results(str(tmp_path / "bad"), {'obj': np.array([{}, 1], dtype=object)})
+
+    # Un segundo guardado sin 'TD' borra el archivo obsoleto
+    del loaded
+    save_results(path, {'data_c': np.zeros((2, 2)), 'WL': np.ones(2)})
+    assert sorted(os.listdir(path)) == ['WL.npy', 'data_c.npy', 'manifest.json']
+    assert set(load_results(os.path.join(path, 'manifest.json'))) == {'data_c', 'WL'}
+
+
+def test_load_results_reads_legacy_pickled_dict(tmp_path):
+    path = str(tmp_path / "legacy.npy")
+    np.save(path, {'data_c': np.ones((2, 3)), 'WL': np.arange(2.0)}, allow_pickle=True)
+    loaded = load_results(path)
+    np.testing.assert_array_equal(loaded['data_c'], np.ones((2, 3)))
+    np.testing.assert_array_equal(loaded['WL'], np.arange(2.0))
+
+
+@pytest.fixture
+def chirp():
+    """Rejilla con un t0(λ) cuadrático, como el chirp de un experimento real."""
+    WL = np.linspace(420.0, 720.0, 60)
+    TD = np.linspace(-3.0, 5.0, 400)
+    return WL, TD, 0.3 + 1.5e-5 * (WL - 570.0)**2 - 0.002 * (WL - 570.0)
+
+
+@pytest.mark.parametrize("method, tol", [("half_rise", 0.01), ("max_derivative", 0.04)])
+def test_detect_t0_onset_follows_chirp(chirp, method, tol):
+    WL, TD, t0 = chirp
+    rng = np.random.default_rng(0)
+    s = TD[None, :] - t0[:, None]
+    rise = 0.5 * (1 + erf(s / (np.sqrt(2) * 0.1))) * np.exp(-np.maximum(s, 0) / 200.0)
+    sign = np.where(np.arange(WL.size) % 2, -1.0, 1.0)[:, None]   # señales de ambos signos
+    data = sign * rise + 0.005 * rng.normal(size=rise.shape)
+    data[7] = 0.005 * rng.normal(size=TD.size)                    # fila sólo con ruido
+
+    w, t, weights = detect_t0_onset(WL, TD, data, method=method)
+    assert WL[7] not in w and w.size == WL.size - 1
+    assert np.max(np.abs(t - np.interp(w, WL, t0))) < tol
+    assert np.all((weights > 0) & (weights <= 1))
+
+
+def test_extract_t0_from_solvent_follows_chirp(chirp):
+    WL, TD, t0 = chirp
+    rng = np.random.default_rng(1)
+    s = (TD[None, :] - t0[:, None]) / 0.08
+    G = np.exp(-0.5 * s**2)
+    # Artefacto coherente: gaussiana más su derivada, con amplitud dependiente de λ
+    solvent = G * (1 + 0.2 * np.sin(WL / 40.0))[:, None] - 0.5 * s * G + 0.003 * rng.normal(size=G.shape)
+    solvent[7] = 0.003 * rng.normal(size=TD.size)
+
+    w, t, weights = extract_t0_from_solvent(WL, TD, solvent)
+    assert WL[7] not in w and w.size == WL.size - 1
+    assert np.max(np.abs(t - np.interp(w, WL, t0))) < 0.01
+    assert np.all((weights > 0) & (weights <= 1))
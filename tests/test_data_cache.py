@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Caché binaria de datasets parseados: aciertos memory-mapped, índice de hashes y expulsión LRU."""
+import os
+
+import numpy as np
+import pytest
+
+import data_cache
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "matrix.csv"
+    path.write_text("0,1,2,3\n400,0.1,0.2,0.3\n500,0.4,0.5,0.6\n")
+    return str(path)
+
+
+def counting_loader(calls, scale=1.0):
+    def loader():
+        calls.append(1)
+        return np.arange(6.0).reshape(2, 3) * scale, np.array([400.0, 500.0]), np.array([1.0, 2.0, 3.0])
+    return loader
+
+
+def test_hit_returns_read_only_memmaps(tmp_path, source):
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+    first = data_cache.cached_load([source], counting_loader(calls), cache_dir=cache_dir)
+    second = data_cache.cached_load([source], counting_loader(calls), cache_dir=cache_dir)
+    assert len(calls) == 1
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+        assert isinstance(b, np.memmap) and not b.flags.writeable
+
+
+def test_hit_does_not_rehash_unchanged_files(tmp_path, source, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+    data_cache.cached_load([source], counting_loader(calls), cache_dir=cache_dir)
+    assert os.path.isfile(os.path.join(cache_dir, "hashes.json"))
+
+    opened = []
+    real_open = open
+    def tracking_open(path, *args, **kwargs):
+        opened.append(os.path.abspath(path))
+        return real_open(path, *args, **kwargs)
+    monkeypatch.setattr(data_cache, "open", tracking_open, raising=False)
+    data_cache.cached_load([source], counting_loader(calls), cache_dir=cache_dir)
+    assert len(calls) == 1
+    assert os.path.abspath(source) not in opened
+
+
+def test_modified_source_misses(tmp_path, source):
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+    data_cache.cached_load([source], counting_loader(calls), cache_dir=cache_dir)
+    with open(source, "a") as f:
+        f.write("600,0.7,0.8,0.9\n")
+    os.utime(source, ns=(os.stat(source).st_atime_ns, os.stat(source).st_mtime_ns + 10**9))
+    data, _, _ = data_cache.cached_load([source], counting_loader(calls, scale=2.0), cache_dir=cache_dir)
+    assert len(calls) == 2
+    np.testing.assert_array_equal(data, np.arange(6.0).reshape(2, 3) * 2.0)
+
+
+def test_evict_skips_busy_entries_and_retries(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"m{i}.csv"
+        p.write_text(f"0,1\n400,{i}\n")
+        paths.append(str(p))
+        data_cache.cached_load([paths[-1]], counting_loader([]), cache_dir=cache_dir)
+    keys = sorted(k for k in os.listdir(cache_dir) if os.path.isdir(os.path.join(cache_dir, k)))
+    assert len(keys) == 3
+    busy_key = keys[0]
+
+    # Como en Windows con un .npy aún mapeado: no se puede borrar
+    real_remove = os.remove
+    def locked_remove(path):
+        if busy_key in path and path.endswith(".npy"):
+            raise PermissionError(path)
+        real_remove(path)
+    monkeypatch.setattr(data_cache.os, "remove", locked_remove)
+    assert data_cache.evict(cache_dir, max_bytes=0) == [busy_key]
+    assert os.path.isfile(os.path.join(cache_dir, busy_key, "meta.json"))
+
+    monkeypatch.setattr(data_cache.os, "remove", real_remove)
+    assert data_cache.evict(cache_dir, max_bytes=0) == []
+    assert not os.path.exists(os.path.join(cache_dir, busy_key))
+
+
+def test_loader_errors_propagate(tmp_path, source):
+    def broken():
+        raise ValueError("formato no reconocido")
+    with pytest.raises(ValueError, match="formato"):
+        data_cache.cached_load([source], broken, cache_dir=str(tmp_path / "cache"))
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""Regresiones y comportamiento de fit frente a implementaciones de referencia."""
+import numpy as np
+import pytest
+from scipy import special
+from scipy.linalg import expm
+
+import fit
+
+
+def naive_convolved_exp(t, t0, tau, w):
+    """Fórmula directa 0.5·exp(arg1)·erfc(arg2), la anterior a erfcx."""
+    s = t - t0
+    arg1 = (w**2 - 2 * tau * s) / (2 * tau**2)
+    arg2 = (w**2 - tau * s) / (np.sqrt(2) * w * tau)
+    with np.errstate(over='ignore', invalid='ignore'):
+        return 0.5 * np.exp(arg1) * special.erfc(arg2)
+
+
+@pytest.mark.parametrize("w", [1e-3, 0.05, 0.5, 2.0])
+@pytest.mark.parametrize("tau", [1e-3, 0.02, 1.0, 1e4])
+def test_convolved_exp_finite_and_bounded(w, tau):
+    # Con tau << w la fórmula directa da inf·0 = nan antes de t0
+    t = np.linspace(-50.0, 5000.0, 4001)
+    E = fit.convolved_exp(t, 0.0, tau, w)
+    assert np.all(np.isfinite(E))
+    assert np.all(E >= -1e-15) and np.all(E <= 1.0 + 1e-12)
+
+
+def test_convolved_exp_matches_direct_formula():
+    t = np.linspace(-2.0, 50.0, 500)
+    for tau, w in ((0.5, 0.1), (5.0, 0.3), (100.0, 0.05)):
+        direct = naive_convolved_exp(t, 0.2, tau, w)
+        ok = np.isfinite(direct)
+        assert ok.sum() > 400
+        np.testing.assert_allclose(fit.convolved_exp(t, 0.2, tau, w)[ok], direct[ok], rtol=1e-10, atol=1e-300)
+
+
+def test_convolved_exp_tails():
+    tau, w = 0.01, 0.3
+    # Mucho después de la IRF: exponencial pura con el desplazamiento w²/(2tau²)
+    s = np.array([20.0, 25.0])
+    np.testing.assert_allclose(fit.convolved_exp(s, 0.0, tau, w),
+                               np.exp(w**2 / (2 * tau**2) - s / tau), rtol=1e-8)
+    # Mucho antes: prácticamente cero
+    assert np.all(fit.convolved_exp(np.array([-20.0, -5.0]), 0.0, tau, w) < 1e-40)
+
+
+T_CHIRP = np.concatenate([np.linspace(-1.0, 2.0, 90), np.logspace(np.log10(2.1), 3.0, 50)])
+
+
+@pytest.mark.parametrize("tau, w", [(0.002, 0.05), (0.05, 0.1), (1.0, 0.12), (500.0, 0.3)])
+def test_convolved_exp_chirp_matches_per_wavelength_loop(tau, w):
+    t0s = np.linspace(-0.3, 0.8, 40)
+    loop = np.array([fit.convolved_exp(T_CHIRP, t0, tau, w) for t0 in t0s])
+    # Antes de la IRF los valores < exp(-36) se dejan a 0 a propósito
+    np.testing.assert_allclose(fit._convolved_exp_chirp(T_CHIRP, t0s, tau, w), loop, rtol=1e-12, atol=1e-15)
+    # Retardos desordenados: camino general, mismo resultado
+    perm = np.random.default_rng(0).permutation(T_CHIRP.size)
+    np.testing.assert_allclose(fit._convolved_exp_chirp(T_CHIRP[perm], t0s, tau, w), loop[:, perm],
+                               rtol=1e-12, atol=1e-15)
+
+
+@pytest.mark.parametrize("model", ["Parallel", "Sequential"])
+def test_chirp_model_matches_per_wavelength_loop(model, monkeypatch):
+    numWL, numExp = 9, 3
+    rng = np.random.default_rng(1)
+    taus = np.array([0.4, 8.0, 200.0])
+    x = [0.11, *taus]
+    for j in range(numWL):
+        x += [-0.2 + 0.1 * j, *rng.normal(size=numExp)]
+    x = np.asarray(x)
+    # Bloques de WL pequeños para recorrer también la partición en trozos
+    monkeypatch.setattr(fit, "CHIRP_CHUNK_BYTES", 8 * 4 * T_CHIRP.size * numExp * 2)
+    F = fit.eval_kinetic_model(x, T_CHIRP, numExp, numWL, 'Yes', model)
+
+    blocks = x[1 + numExp:].reshape(numWL, numExp + 1)   # (t0, amplitudes) de cada WL
+    loop = np.column_stack([fit.kinetic_basis(T_CHIRP, b[0], x[0], taus, model) @ b[1:] for b in blocks])
+    np.testing.assert_allclose(F, loop, rtol=1e-10, atol=1e-12)
+
+
+def branched_scheme(taus):
+    """A -> B (60 %) y A -> C (40 %), B -> D, C -> D, D -> fundamental."""
+    k = 1.0 / np.asarray(taus, dtype=float)
+    K = fit.build_rate_matrix(4, {(0, 1): 0.6 * k[0], (0, 2): 0.4 * k[0], (1, 3): k[1], (2, 3): k[2],
+                                  (3, None): k[3]})
+    c0 = np.zeros(4)
+    c0[0] = 1.0
+    return K, c0
+
+
+@pytest.mark.parametrize("taus", [(0.8, 6.0, 40.0, 300.0),     # tasas distintas
+                                  (0.8, 6.0, 6.0, 300.0),      # ramas B y C con la misma tasa
+                                  (5.0, 5.0, 40.0, 300.0),     # A y B degeneradas
+                                  (5.0, 5.0, 5.0, 5.0)])       # todas iguales
+def test_kinetic_model_matches_matrix_exponential(taus, monkeypatch):
+    monkeypatch.setitem(fit.KINETIC_MODELS, "Branched", branched_scheme)
+    # IRF muy estrecha y t > 0: las poblaciones son expm(K·t)·c0
+    t = np.concatenate([np.linspace(0.05, 5.0, 100), np.logspace(np.log10(5.1), 3.0, 60)])
+    x = np.concatenate([[1e-3, 0.0], taus, np.eye(4).ravel()])   # WL j = especie j
+    F = fit.eval_kinetic_model(x, t, 4, 4, 'No', model="Branched")
+    K, c0 = branched_scheme(taus)
+    reference = np.array([expm(K * ti) @ c0 for ti in t])
+    assert np.all(np.isfinite(F))
+    np.testing.assert_allclose(F, reference, atol=1e-5)
+
+
+def synthetic(numWL, numExp, rng, model="Parallel"):
+    t = np.concatenate([np.linspace(-1.0, 2.0, 80), np.logspace(np.log10(2.1), 3.0, 80)])
+    taus = np.logspace(0, 2.5, numExp)
+    x = np.asarray([0.12, 0.1, *taus, *rng.normal(size=numWL * numExp)], dtype=float)
+    F = fit.eval_kinetic_model(x, t, numExp, numWL, 'No', model)
+    return F.T + rng.normal(scale=0.01, size=(numWL, t.size)), t, x
+
+
+def start(x, numExp, numWL):
+    lower, upper = np.full(x.size, -np.inf), np.full(x.size, np.inf)
+    lower[0], upper[0] = 0.05, 2.0
+    lower[2:2 + numExp], upper[2:2 + numExp] = 0.001, 1e8
+    x0 = x.copy()
+    x0[fit.nonlinear_indices(numExp, numWL, 'No')] *= 1.3
+    return np.clip(x0, lower + 1e-9, upper - 1e-9), lower, upper
+
+
+@pytest.mark.parametrize("model", ["Parallel", "Sequential"])
+def test_varpro_matches_full_least_squares(model):
+    numWL, numExp = 30, 3
+    data, t, x = synthetic(numWL, numExp, np.random.default_rng(4), model)
+    x0, lower, upper = start(x, numExp, numWL)
+    x0[fit.amplitude_indices(numExp, numWL, 'No')] = 0.0
+    varpro = fit.fit_global(data, t, numExp, x0, lower, upper, model=model)
+    full = fit.fit_global_full(data, t, numExp, x0, lower, upper, model=model)
+
+    # Mismo mínimo: VARPRO llega al menos tan abajo y las taus coinciden
+    assert varpro.cost <= full.cost * (1 + 1e-6)
+    i_tau = fit.tau_indices(numExp, 'No')
+    np.testing.assert_allclose(varpro.x[i_tau], full.x[i_tau], rtol=2e-3)
+    np.testing.assert_allclose(varpro.x[i_tau], x[i_tau], rtol=2e-2)
+    # Las amplitudes son las de mínimos cuadrados para las taus encontradas
+    basis = fit._basis_from_x(varpro.x, t, numExp, numWL, 'No', model)
+    amp = fit.amplitude_indices(numExp, numWL, 'No')
+    np.testing.assert_allclose(varpro.x[amp], fit._solve_amplitudes(basis, data), rtol=1e-8, atol=1e-10)
+
+
+@pytest.mark.parametrize("model", ["Parallel", "Sequential"])
+def test_fit_global_svd_matches_full_fit(model):
+    numWL, numExp = 40, 3
+    data, t, x = synthetic(numWL, numExp, np.random.default_rng(0))
+    x0, lower, upper = start(x, numExp, numWL)
+    full = fit.fit_global(data, t, numExp, x0, lower, upper, model=model)
+    svd = fit.fit_global_svd(data, t, numExp, x0, lower, upper, model=model)
+
+    assert svd.svd_k >= numExp
+    i_tau = fit.tau_indices(numExp, 'No')
+    np.testing.assert_allclose(np.sort(svd.x[i_tau]), np.sort(full.x[i_tau]), rtol=1e-4)
+    # cost de fit_global_svd se recalcula sobre los datos completos: el ajuste
+    # completo es el óptimo ahí y el comprimido sólo pierde el ruido descartado
+    assert full.cost <= svd.cost * (1 + 1e-9)
+    assert svd.cost == pytest.approx(full.cost, rel=1e-5)
+    assert svd.fun.size == full.fun.size
+    amp = fit.amplitude_indices(numExp, numWL, 'No')
+    assert np.linalg.norm(svd.x[amp] - full.x[amp]) / np.linalg.norm(full.x[amp]) < 1e-3
+
+
+def test_fit_global_svd_rejects_chirp_and_fixed_amplitudes():
+    numWL, numExp = 10, 2
+    data, t, x = synthetic(numWL, numExp, np.random.default_rng(1))
+    x0, lower, upper = start(x, numExp, numWL)
+    fixed = np.zeros(x.size, dtype=bool)
+    fixed[fit.amplitude_indices(numExp, numWL, 'No')[0, 0]] = True
+    with pytest.raises(ValueError):
+        fit.fit_global_svd(data, t, numExp, x0, lower, upper, fixed=fixed)
+    chirp_x0 = np.zeros(1 + numExp + numWL * (numExp + 1))
+    with pytest.raises(ValueError):
+        fit.fit_global_svd(data, t, numExp, chirp_x0, -np.inf * np.ones(chirp_x0.size),
+                           np.inf * np.ones(chirp_x0.size), t0_choice_str='Yes')
+
+
+def test_compare_svd_fit_ignores_component_order(monkeypatch):
+    # El modelo paralelo no depende del orden de las componentes: si el ajuste
+    # comprimido las devuelve al revés, la comparación debe seguir dando ~0
+    numWL, numExp = 20, 3
+    data, t, x = synthetic(numWL, numExp, np.random.default_rng(2))
+    x0, lower, upper = start(x, numExp, numWL)
+    i_tau = fit.tau_indices(numExp, 'No')
+    amp = fit.amplitude_indices(numExp, numWL, 'No')
+    fit_global_svd = fit.fit_global_svd
+
+    def reversed_svd(*args, **kwargs):
+        res = fit_global_svd(*args, **kwargs)
+        x_rev = res.x.copy()
+        x_rev[i_tau] = res.x[i_tau][::-1]
+        x_rev[amp] = res.x[amp][:, ::-1]
+        res.x = x_rev
+        return res
+
+    monkeypatch.setattr(fit, "fit_global_svd", reversed_svd)
+    cmp = fit.compare_svd_fit(data, t, numExp, x0, lower, upper)
+    assert np.all(np.diff(cmp['taus_svd']) > 0)
+    np.testing.assert_allclose(cmp['taus_svd'], cmp['taus_full'], rtol=1e-4)
+    assert cmp['tau_rel_diff'] < 1e-4
+    assert cmp['das_rel_diff'] < 1e-3
+
+
+def test_distinct_minima_groups_equivalent_starts():
+    # Mismas taus en otro orden y coste dentro de cost_rtol: el mismo mínimo
+    taus = [(1.0, 10.0), (10.05, 1.002), (3.0, 30.0), (1.0, 10.001), (5.0, 5.0)]
+    costs = np.array([1.0, 1.00001, 2.0, 1.0, np.inf])
+    xs = [np.array([0.1, 0.0, *tt]) for tt in taus]
+    minima = fit.distinct_minima(xs, costs, 2, 'No')
+    assert [m['count'] for m in minima] == [3, 1]
+    assert sorted(minima[0]['starts']) == [0, 1, 3] and minima[1]['starts'] == [2]
+    np.testing.assert_allclose(minima[1]['taus'], [3.0, 30.0])
+    assert minima[0]['cost'] == 1.0
+
+
+def test_multistart_reports_its_starts():
+    numWL, numExp = 15, 2
+    data, t, x = synthetic(numWL, numExp, np.random.default_rng(5))
+    x0, lower, upper = start(x, numExp, numWL)
+    single = fit.fit_global(data, t, numExp, x0, lower, upper)
+    res = fit.fit_global_multistart(data, t, numExp, x0, lower, upper, n_starts=4, seed=0)
+    assert len(res.seeds) == 4 and res.start_costs.shape == (4,)
+    assert res.cost == pytest.approx(np.min(res.start_costs))
+    assert res.cost <= single.cost * (1 + 1e-6)
+    assert res.minima[0]['cost'] == pytest.approx(res.cost)
+    assert sum(m['count'] for m in res.minima) == np.isfinite(res.start_costs).sum()
+
+
+def test_scan_model_orders_finds_known_rank():
+    numWL = 15
+    rng = np.random.default_rng(6)
+    t = np.concatenate([np.linspace(-1.0, 2.0, 80), np.logspace(np.log10(2.1), 3.0, 80)])
+    x = np.asarray([0.12, 0.1, 1.0, 30.0, *rng.normal(size=numWL * 2)])
+    data = fit.eval_global_model(x, t, 2, numWL, 'No').T + rng.normal(scale=0.005, size=(numWL, t.size))
+
+    scan = fit.scan_model_orders(data, t, 3, models=["Parallel"], w0=0.12)
+    rows = scan['rows']
+    assert not scan['errors'] and not scan['cancelled']
+    assert [r['numExp'] for r in rows] == [1, 2, 3]
+    assert scan['svd_rank'] == 2
+    assert rows[scan['best_bic']]['numExp'] == 2
+    # Más componentes nunca empeoran el coste, pero la tercera apenas lo mejora
+    assert rows[0]['cost'] > 100 * rows[1]['cost'] and rows[2]['cost'] <= rows[1]['cost'] * (1 + 1e-6)
+    np.testing.assert_allclose(np.sort(rows[1]['taus']), [1.0, 30.0], rtol=2e-2)
+
+
+@pytest.fixture
+def noisy_two_exp():
+    numWL, numExp = 12, 2
+    rng = np.random.default_rng(7)
+    t = np.concatenate([np.linspace(-1.0, 2.0, 60), np.logspace(np.log10(2.1), 3.0, 60)])
+    x = np.asarray([0.12, 0.1, 2.0, 50.0, *rng.normal(size=numWL * numExp)])
+    data = fit.eval_global_model(x, t, numExp, numWL, 'No').T + rng.normal(scale=0.02, size=(numWL, t.size))
+    lower, upper = np.full(x.size, -np.inf), np.full(x.size, np.inf)
+    lower[0], upper[0] = 0.05, 2.0
+    lower[2:4], upper[2:4] = 1e-3, 1e8
+    return data, t, x, lower, upper
+
+
+def test_bootstrap_matches_linear_standard_errors(noisy_two_exp):
+    # Con w, t0 y taus fijos el problema es lineal en las amplitudes: el bootstrap
+    # de residuos debe reproducir el error estándar de mínimos cuadrados
+    data, t, x, lower, upper = noisy_two_exp
+    numWL, numExp = data.shape[0], 2
+    fixed = np.zeros(x.size, dtype=bool)
+    fixed[:2 + numExp] = True
+    best = fit.fit_global_full(data, t, numExp, x, lower, upper, fixed=fixed)
+    B = fit.kinetic_basis(t, x[1], x[0], x[2:2 + numExp])
+    amp = fit.amplitude_indices(numExp, numWL, 'No')
+    resid = data - best.x[amp] @ B.T
+    s2 = np.sum(resid**2) / (resid.size - amp.size)
+    ols = np.sqrt(s2 * np.diag(np.linalg.inv(B.T @ B)))
+
+    rs = fit.resample_uncertainty(data, t, numExp, best.x, lower, upper, fixed=fixed,
+                                  engine=fit.fit_global_full, n_replicates=200, seed=0)
+    assert rs['n_ok'] == 200 and rs['n_failed'] == 0
+    np.testing.assert_array_equal(rs['err'][fixed], 0.0)
+    ratio = rs['err'][amp] / ols[None, :]
+    assert np.all((ratio > 0.75) & (ratio < 1.3))
+    assert abs(np.median(ratio) - 1.0) < 0.1
+    assert np.all((rs['ci_low'] <= best.x) & (best.x <= rs['ci_high']))
+
+
+def test_jackknife_matches_delete_group_loop(noisy_two_exp):
+    data, t, x, lower, upper = noisy_two_exp
+    numWL, numExp = data.shape[0], 2
+    best = fit.fit_global(data, t, numExp, x, lower, upper)
+    jk = fit.resample_uncertainty(data, t, numExp, best.x, lower, upper, method="jackknife", n_replicates=6)
+    assert jk['n_ok'] == 6
+
+    # Referencia: quitar cada pareja de WL contiguas y reajustar desde best.x
+    i_nl = fit.nonlinear_indices(numExp, numWL, 'No')
+    thetas = []
+    for g in range(6):
+        keep = np.ones(numWL, dtype=bool)
+        keep[2 * g:2 * g + 2] = False
+        idx = fit.wavelength_subset_indices(numExp, numWL, 'No', keep)
+        res = fit.fit_global(data[keep], t, numExp, best.x[idx], lower[idx], upper[idx])
+        thetas.append(res.x[i_nl])
+    thetas = np.array(thetas)
+    se = np.sqrt(5 / 6 * np.sum((thetas - thetas.mean(axis=0))**2, axis=0))
+    np.testing.assert_allclose(jk['err'][i_nl], se, rtol=1e-6)
+
+    # Mismo orden de magnitud que la covarianza linealizada
+    var = fit.covariance_diagonal(best.jac, numExp, numWL, 'No')
+    cov_err = np.sqrt(var * np.sum(best.fun**2) / (best.fun.size - x.size))
+    ratio = jk['err'][i_nl] / cov_err[i_nl]
+    assert np.all((ratio > 0.25) & (ratio < 4.0))
+    np.testing.assert_allclose(jk['ci_high'] - best.x, best.x - jk['ci_low'])
+
+
+@pytest.mark.parametrize("method", ["tikhonov", "nnls"])
+def test_lifetime_density_recovers_two_lifetimes(method):
+    from scipy.signal import find_peaks
+
+    numWL = 8
+    rng = np.random.default_rng(8)
+    t = np.concatenate([np.linspace(-1.0, 2.0, 60), np.logspace(np.log10(2.1), 3.0, 100)])
+    x = np.asarray([0.12, 0.1, 2.0, 80.0, *(0.5 + np.abs(rng.normal(size=numWL * 2)))])
+    data = fit.eval_global_model(x, t, 2, numWL, 'No').T + rng.normal(scale=0.002, size=(numWL, t.size))
+    taus = fit.lifetime_grid(0.1, 2000.0, 80)
+
+    r = fit.lifetime_density(data, t, taus, 0.12, 0.1, method=method)
+    assert r['amplitudes'].shape == (numWL, taus.size) and r['gcv'] is not None
+    assert r['rmsd'] < 0.003
+    if method == "nnls":
+        assert np.all(r['amplitudes'] >= 0)
+    density = np.abs(r['amplitudes']).sum(axis=0)
+    peaks, _ = find_peaks(density)
+    found = np.sort(taus[peaks[np.argsort(density[peaks])[-2:]]])
+    np.testing.assert_allclose(found, [2.0, 80.0], rtol=0.2)
+
+    # Con λ dado no se calcula la GCV
+    fixed_lam = fit.lifetime_density(data, t, taus, 0.12, 0.1, method=method, lam=r['lam'])
+    assert fixed_lam['gcv'] is None
+    np.testing.assert_allclose(fixed_lam['amplitudes'], r['amplitudes'])
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Derivadas analíticas frente a diferencias finitas centradas:
+convolved_exp_grad, global_fit_jacobian (paralelo y secuencial, con y sin
+chirp), el Jacobiano reducido de VARPRO y t0_model_jac. También la estructura
+por bloques del Jacobiano (patrón disperso y diagonal de la covarianza).
+"""
+import numpy as np
+import pytest
+
+import fit
+from core_analysis import fit_t0_model, t0_model, t0_model_jac
+
+RTOL = 1e-6
+T = np.concatenate([np.linspace(-1.0, 3.0, 80), np.logspace(np.log10(3.1), 3.0, 40)])
+MODELS = {"Parallel": fit.eval_global_model, "Sequential": fit.eval_sequential_model}
+
+
+def rel_err(a, b):
+    return np.max(np.abs(a - b)) / max(np.max(np.abs(b)), 1e-300)
+
+
+def central_diff(f, x, step=1e-6):
+    """Jacobiano numérico de f (vector) respecto a x; paso relativo a cada |x_i|."""
+    x = np.asarray(x, dtype=float)
+    cols = []
+    for i in range(x.size):
+        h = step * (abs(x[i]) or 1.0)
+        xp, xm = x.copy(), x.copy()
+        xp[i] += h
+        xm[i] -= h
+        cols.append((np.ravel(f(xp)) - np.ravel(f(xm))) / (2 * h))
+    return np.column_stack(cols)
+
+
+def model_x(numExp, numWL, t0_choice, rng):
+    taus = np.array([0.7, 6.0, 45.0, 300.0])[:numExp]
+    if t0_choice == "Yes":
+        x = [0.12, *taus]
+        for j in range(numWL):
+            x += [0.05 + 0.01 * j, *rng.normal(size=numExp)]
+    else:
+        x = [0.12, 0.1, *taus, *rng.normal(size=numWL * numExp)]
+    return np.asarray(x, dtype=float)
+
+
+@pytest.mark.parametrize("w", [0.03, 0.12, 0.5])
+@pytest.mark.parametrize("tau", [0.05, 0.3, 30.0, 2000.0])
+def test_convolved_exp_grad(w, tau):
+    t0 = 0.1
+    E, d_t0, d_tau, d_w = fit.convolved_exp_grad(T, t0, tau, w)
+    J = central_diff(lambda p: fit.convolved_exp(T, *p), [t0, tau, w])
+    np.testing.assert_allclose(E, fit.convolved_exp(T, t0, tau, w))
+    for col, d in enumerate((d_t0, d_tau, d_w)):
+        assert rel_err(d, J[:, col]) < RTOL
+
+
+@pytest.mark.parametrize("model", list(MODELS))
+@pytest.mark.parametrize("t0_choice", ["No", "Yes"])
+@pytest.mark.parametrize("numExp", [1, 2, 3])
+def test_global_fit_jacobian(model, t0_choice, numExp):
+    numWL = 5
+    x = model_x(numExp, numWL, t0_choice, np.random.default_rng(numExp))
+    J = fit.global_fit_jacobian(x, T, numExp, numWL, t0_choice, model).toarray()
+    Jn = central_diff(lambda p: MODELS[model](p, T, numExp, numWL, t0_choice), x)
+    assert J.shape == Jn.shape
+    assert rel_err(J, Jn) < RTOL
+
+
+@pytest.mark.parametrize("t0_choice", ["No", "Yes"])
+@pytest.mark.parametrize("fix_tau", [False, True])
+def test_block_structure_of_jacobian(t0_choice, fix_tau):
+    numWL, numExp = 6, 3
+    x = model_x(numExp, numWL, t0_choice, np.random.default_rng(5))
+    free = np.ones(x.size, dtype=bool)
+    free[fit.tau_indices(numExp, t0_choice)[0]] = not fix_tau
+    J = fit.global_fit_jacobian(x, T, numExp, numWL, t0_choice, "Parallel", free=free)
+    Jd = J.toarray()
+
+    # Fuera del patrón de global_jac_sparsity no hay derivadas
+    pattern = fit.global_jac_sparsity(numExp, numWL, T.size, t0_choice, free=free).toarray()
+    assert not np.any(Jd[pattern == 0])
+    assert fit.jacobian_memory_report(numExp, numWL, T.size, t0_choice, free=free)['nnz'] == pattern.sum()
+
+    reference = np.diagonal(np.linalg.inv(Jd.T @ Jd))
+    np.testing.assert_allclose(fit.covariance_diagonal(J, numExp, numWL, t0_choice, free=free), reference,
+                               rtol=1e-9)
+
+
+def test_equal_rates_do_not_blow_up():
+    # Tasas iguales: los denominadores 1/(k_i - k_j) se regularizan y el
+    # Jacobiano sigue siendo el de las diferencias finitas (con paso mayor)
+    numWL, numExp = 4, 3
+    x = model_x(numExp, numWL, "No", np.random.default_rng(7))
+    x[2:2 + numExp] = (5.0, 5.0, 40.0)
+    J = fit.global_fit_jacobian(x, T, numExp, numWL, "No", "Sequential").toarray()
+    Jn = central_diff(lambda p: fit.eval_sequential_model(p, T, numExp, numWL, "No"), x, step=1e-4)
+    assert np.all(np.isfinite(J))
+    assert rel_err(J, Jn) < 1e-5
+
+
+@pytest.mark.parametrize("model", list(MODELS))
+@pytest.mark.parametrize("t0_choice", ["No", "Yes"])
+def test_varpro_reduced_jacobian(model, t0_choice):
+    # En la solución exacta (datos sin ruido) el término que Kaufman desprecia es nulo
+    numWL, numExp = 5, 2
+    x = model_x(numExp, numWL, t0_choice, np.random.default_rng(3))
+    data = MODELS[model](x, T, numExp, numWL, t0_choice).T
+    nl = fit.nonlinear_indices(numExp, numWL, t0_choice)
+    Jv = fit._varpro_jacobian(x, T, data, numExp, numWL, t0_choice, model, nl)
+    Jv = Jv.toarray() if hasattr(Jv, "toarray") else Jv
+
+    def reduced(p):
+        xx = x.copy()
+        xx[nl] = p
+        basis = fit._basis_from_x(xx, T, numExp, numWL, t0_choice, model)
+        return fit._model_from_basis(basis, fit._solve_amplitudes(basis, data))
+
+    assert rel_err(Jv, central_diff(reduced, x[nl])) < RTOL
+
+
+T0_PARAMS = np.array([1.2, 1.05 / 400.0**2, 1.6 / 400.0**2, -0.8])
+
+
+def test_t0_model_jac():
+    w = np.linspace(420.0, 720.0, 25)
+    J = t0_model_jac(w, *T0_PARAMS)
+    Jn = central_diff(lambda q: t0_model(w, *q), T0_PARAMS)
+    assert np.all(np.isfinite(t0_model(w, *T0_PARAMS)))
+    for col in range(4):
+        assert rel_err(J[:, col], Jn[:, col]) < RTOL
+
+
+def test_t0_model_jac_invalid_points_are_zero():
+    # Con b < 1/w² < c el cociente es negativo: modelo no válido, derivadas nulas
+    w = np.array([500.0])
+    J = t0_model_jac(w, 1.0, 0.5 / 500.0**2, 2.0 / 500.0**2, 0.0)
+    assert np.isnan(t0_model(w, 1.0, 0.5 / 500.0**2, 2.0 / 500.0**2, 0.0)).all()
+    np.testing.assert_array_equal(J[:, :3], 0.0)
+
+
+@pytest.mark.parametrize("n_starts", [1, 4])
+def test_fit_t0_model_recovers_curve(n_starts):
+    w = np.linspace(420.0, 720.0, 25)
+    t0 = t0_model(w, *T0_PARAMS)
+    popt = fit_t0_model(w, t0, n_starts=n_starts)
+    np.testing.assert_allclose(t0_model(w, *popt), t0, atol=1e-8)